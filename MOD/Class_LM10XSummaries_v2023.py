@@ -8,13 +8,33 @@
   Each line is converted into the variables contained in the file.
   The __main__ section below provides a simple example of usage.
 
+  For whole-file work use load_summaries(), which reads the CSV in chunks into a typed
+  DataFrame (nullable integers for missing values, optional column projection) and keeps a
+  Parquet copy in CACHE_DIR so later loads skip the CSV parse.
+
   https://sraf.nd.edu
   Bill McDonald 2017 : 2022 : 2024
 """
 
+import os
 import time
 
 
+# Column names (same as the cl_LM10XSummaries attributes) and types, in file order
+FIELDS = ('cik', 'filing_date', 'acc_num', 'conformed_period_of_report', 'form_type', 'company_name',
+          'sic', 'ff_ind', 'n_words', 'n_unique', 'n_negative', 'n_positive', 'n_uncertainty',
+          'n_litigious', 'n_strong_modal', 'n_weak_modal', 'n_constraining', 'n_complexity',
+          'n_negation', 'grossfilesize', 'netfilesize', 'non_text_doc_type_chars', 'html_chars',
+          'xbrl_chars', 'xml_chars', 'n_exhibits')
+DTYPES = {field: 'Int32' for field in FIELDS}
+DTYPES.update({'cik': 'Int64', 'acc_num': 'string', 'form_type': 'category', 'company_name': 'string',
+               'sic': 'Int16', 'ff_ind': 'Int8', 'grossfilesize': 'Int64', 'netfilesize': 'Int64',
+               'non_text_doc_type_chars': 'Int64', 'html_chars': 'Int64', 'xbrl_chars': 'Int64',
+               'xml_chars': 'Int64'})
+# Directory for Parquet copies of Summaries files (set to None to disable caching)
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'LM_10X_Summaries')
+
+
 class cl_LM10XSummaries:
     def __init__(self, _line, missing_values=''):
 
@@ -47,6 +67,52 @@ class cl_LM10XSummaries:
         self.n_exhibits = converter(parts[25], "int", missing_values)
 
 
+def load_summaries(source_file, columns=None, chunksize=500000, use_cache=True):
+    # Load the Summaries CSV into a typed DataFrame with one column per FIELDS entry
+    import pandas as pd  # only needed here; the per-line class stays light to import
+
+    columns = list(columns) if columns else list(FIELDS)
+    unknown = set(columns) - set(FIELDS)
+    if unknown:
+        raise ValueError(f'Unknown Summaries columns: {sorted(unknown)}')
+
+    cache_file = _cache_file(source_file) if use_cache else None
+    if cache_file and os.path.exists(cache_file):
+        return pd.read_parquet(cache_file, columns=columns)
+
+    # Caching stores every column, so project only when the result is not cached
+    usecols = list(FIELDS) if cache_file else columns
+    # Categories are set after the concat; per-chunk categoricals would not combine
+    dtypes = {field: 'string' if DTYPES[field] == 'category' else DTYPES[field] for field in usecols}
+    reader = pd.read_csv(source_file, header=0, names=list(FIELDS), usecols=usecols, dtype=dtypes,
+                         keep_default_na=False, na_values={field: [''] for field in usecols},
+                         chunksize=chunksize)
+    df = pd.concat(reader, ignore_index=True)
+    for field in usecols:
+        if DTYPES[field] == 'category':
+            df[field] = df[field].astype('category')
+
+    if cache_file:
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            df.to_parquet(cache_file, index=False)
+        except (ImportError, OSError) as e:
+            print(f'Summaries cache not written: {e}')
+    return df[columns]
+
+
+def _cache_file(source_file):
+    # Cache file name carries the source size and mtime, so a changed source misses the cache
+    if not CACHE_DIR:
+        return None
+    try:
+        import pyarrow  # Parquet support is optional
+    except ImportError:
+        return None
+    stat = os.stat(source_file)
+    return os.path.join(CACHE_DIR, f'{os.path.basename(source_file)}.{stat.st_size}.{stat.st_mtime_ns}.parquet')
+
+
 def converter(_var, _ctype, missing_values):
     # missing_values should be passed as a string variable
     _attr = missing_values
@@ -9,27 +9,43 @@ import sys
 import datetime as dt
 import MOD_Load_MasterDictionary_v2023 as md
 import MOD_Read_DocDict as rd
+import MOD_DocDict_Index as di
 
 IN_MASTER = r'G:\My Drive\SRAF\LM_Master_Dictionary\Loughran-McDonald_MasterDictionary_1993-2024.csv'
 IN_DD = r'G:\My Drive\SRAF\EDGAR_Data\Loughran-McDonald_10X_DocumentDictionaries_1993-2024.txt'
 OUT_FILE = 'D:\Temp\word_counts'
 TARGETS = ["AND", "LIABILITIES", "DEPRECIATION", "ACCRUALS", "GOVERNANCE", "ETHICS"]
 N_LIMIT = 20
+# Optional filing selection; when any is set only the matching filings are read (via the index)
+TARGET_CIKS = None  # e.g., [320193, 789019]
+TARGET_BGN_DATE = None  # YYYYMMDD
+TARGET_END_DATE = None
+TARGET_FORMS = None  # e.g., MOD_EDGAR_Forms.f_10K
 
 def main():
 
     # Load master dictionary
     master_dictionary = md.load_masterdictionary(IN_MASTER, print_flag=True, get_other=False)
     lookup = rd.create_lookup_dictionary(master_dictionary)
-    with open(IN_DD) as f_in:
-        for count, line in enumerate(f_in):
-            header, docdict = rd.read_docdict(line, lookup)
-            print(f'\nWord counts for: {header.company_name} : Form {header.form_type} :', \
-                  f'Total words = {header.total_words:,}')
-            for word in TARGETS:
-                if word in docdict:
-                    print(f'  {word:15} = {docdict[word]:,}')
-            if count == N_LIMIT: break
+    if TARGET_CIKS or TARGET_BGN_DATE or TARGET_END_DATE or TARGET_FORMS:
+        index = di.load_docdict_index(IN_DD, print_flag=True)
+        filings = index.query(lookup, ciks=TARGET_CIKS, bgn_date=TARGET_BGN_DATE,
+                              end_date=TARGET_END_DATE, form_types=TARGET_FORMS)
+    else:
+        filings = read_all(IN_DD, lookup)
+    for count, (header, docdict) in enumerate(filings):
+        print(f'\nWord counts for: {header.company_name} : Form {header.form_type} :', \
+              f'Total words = {header.total_words:,}')
+        for word in TARGETS:
+            if word in docdict:
+                print(f'  {word:15} = {docdict[word]:,}')
+        if count == N_LIMIT: break
+
+
+def read_all(dd_file, lookup):
+    with open(dd_file) as f_in:
+        for line in f_in:
+            yield rd.read_docdict(line, lookup)
 
 
 if __name__ == '__main__':
@@ -11,12 +11,12 @@ https://sraf.nd.edu
 
 import datetime as dt
 import os
-import requests
 import sys
 import time
 # These modules must be in the same folder as this code (or use a sys.path.append())
 import MOD_EDGAR_Forms  # This module contains some predefined form groups
 import MOD_Download_Utilities as du
+import MOD_EDGAR_Downloader as ed
 
 
 # * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * +
@@ -60,12 +60,14 @@ PARM_PATH = r'D:\Temp\EDGAR\\'
 #    (directory must already exist)
 PARM_LOGFILE = (r'D:\Temp\EDGAR_Download_FORM-X_LogFile_' +
                 str(PARM_BGNYEAR) + '-' + str(PARM_ENDYEAR) + '.txt')
+# Download engine: total requests per second (SEC fair access allows 10) and concurrent downloads
+PARM_MAX_RPS = 8
+PARM_WORKERS = 8
 # EDGAR parameter
 PARM_FORM_PREFIX = 'https://www.sec.gov/Archives/'
 PARM_MASTERIDX_PREFIX = 'https://www.sec.gov/Archives/edgar/full-index/'
 # Server parms
-HEADER = {'Host': 'www.sec.gov', 'Connection': 'close',
-         'Accept': 'application/json, text/javascript, */*; q=0.01', 'X-Requested-With': 'XMLHttpRequest',
+HEADER = {'Accept': 'application/json, text/javascript, */*; q=0.01', 'X-Requested-With': 'XMLHttpRequest',
          'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/80.0.3987.163 Safari/537.36',
          }
 #
@@ -79,11 +81,14 @@ def download_forms():
     f_log.write('BEGIN LOOPS:  {0}\n'.format(time.strftime('%c')))
     n_tot = 0
     n_errs = 0
+    downloader = ed.EDGARDownloader(max_rps=PARM_MAX_RPS, max_workers=PARM_WORKERS, headers=HEADER,
+                                    f_log=f_log)
     for year in range(PARM_BGNYEAR, PARM_ENDYEAR + 1):
         for qtr in range(PARM_BGNQTR, PARM_ENDQTR + 1):
             startloop = dt.datetime.now()
             n_qtr = 0
             file_count = dict()
+            jobs = []
             # Setup output path
             path = '{0}{1}\\QTR{2}\\'.format(PARM_PATH, str(year), str(qtr))
             if not os.path.exists(path):
@@ -94,13 +99,13 @@ def download_forms():
             masterindex = du.download_to_doc(sec_url)
         
             if masterindex:
-                masterindex = masterindex[11:]  # Remove header lines
+                masterindex = masterindex.splitlines()[11:]  # Remove header lines
                 for line in masterindex:
                     item = MasterIndexRecord(line)
                     # Include the next two lines if you're getting errors during business hours
                     #while du.edgar_server_not_available(True):  # kill time when server not available
                     #    pass
-                    if item.form in PARM_FORMS:
+                    if not item.err and item.form in PARM_FORMS:
                         n_qtr += 1
                         # Keep track of filings and identify duplicates
                         fid = str(item.cik) + str(item.filingdate) + item.form
@@ -113,12 +118,11 @@ def download_forms():
                         fname = (path + str(item.filingdate) + '_' + item.form.replace('/', '-') + '_' +
                                  item.path.replace('/', '_'))
                         fname = fname.replace('.txt', '_' + str(file_count[fid]) + '.txt')
-                        return_url = du.download_to_file(url, fname, f_log=f_log)
-                        if return_url:
-                            n_errs += 1
-                        n_tot += 1
-                        if n_tot % 100 == 0: print(f'  Total files: {n_tot:,}', end="\r")
-                        time.sleep(1)  # Space out requests
+                        jobs.append((url, fname))
+                # Requests are spaced out by the downloader's rate limiter
+                failed = downloader.download_all(jobs)
+                n_errs += len(failed)
+                n_tot += len(jobs)
             print(f'{year} : {qtr} -> {n_qtr:,} downloads completed.  Time = ' + \
                   f'{(dt.datetime.now() - startloop)}' + \
                   f' | {dt.datetime.now()}')
@@ -126,6 +130,7 @@ def download_forms():
                         f'{dt.datetime.now()}')
             f_log.flush()
 
+    downloader.close()
     print('{0:,} total forms downloaded.'.format(n_tot))
     f_log.write('\n{0:,} total forms downloaded.'.format(n_tot))
 
@@ -2,10 +2,12 @@
 Program to provide generic parsing for all files in a user-specified directory.
 The program assumes the input files have been scrubbed,
   i.e., HTML, ASCII-encoded binary, and any other embedded document structures that are not
-  intended to be analyzed have been deleted from the file.
+  intended to be analyzed have been deleted from the file (MOD_EDGAR_Scrubber.py does this for
+  raw EDGAR submissions).
 
 Dependencies:
     Python:  MOD_Load_MasterDictionary_vxxxx.py
+             MOD_LM_ScoringEngine.py
     Data:    LoughranMcDonald_MasterDictionary_XXXX.csv
 
 The program outputs:
@@ -26,17 +28,32 @@ The program outputs:
   15.  Average word length
   16.  Vocabulary (see Loughran-McDonald, JF, 2015)
 
+Files are parsed by N_WORKERS processes in size-balanced chunks and rows are written in sorted
+file order.  MANIFEST_FILE records each finished file while a run is in progress and is removed
+when the run completes, so rerunning main() after an interruption resumes where the previous run
+stopped, while a rerun after a complete run parses every file again (main(resume=False) always
+starts over).
+
+main(incremental=True) re-parses only stale files and merges their rows into the existing
+OUTPUT_FILE.  HASH_MANIFEST_FILE records each file's size, mtime and SHA-1 together with the
+dictionary version (SNAPSHOT_VERSION + SHA-1 of the dictionary file) and PARSER_VERSION it was
+parsed with; a file is stale when it is new, its content hash changed, or either version changed.
+Rows of files that no longer match TARGET_FILES are kept.
+
   ND-SRAF
   McDonald 201606 : updated 201803; 202107; 202201; 202504
 """
 
 import csv
 import glob
+import hashlib
+import os
 import re
-import string
 import sys
 import datetime as dt
+from concurrent.futures import ProcessPoolExecutor
 import MOD_Load_MasterDictionary_v2023 as LM
+import MOD_LM_ScoringEngine as SE
 
 # User defined directory for files to be parsed
 TARGET_FILES = r'D:\EDGAR_Test\10-X_C\2023\QTR1\*.*'
@@ -45,77 +62,268 @@ MASTER_DICTIONARY_FILE = r'G:\My Drive\SRAF\LM_Master_Dictionary\\' + \
                          r'Loughran-McDonald_MasterDictionary_1993-2024.csv'
 # User defined output file
 OUTPUT_FILE = r'D:/Temp/Parser.csv'
+# Checkpoint of parsed files (file name <tab> output offset) used to resume an interrupted run
+MANIFEST_FILE = OUTPUT_FILE + '.manifest'
+# Content hashes and versions of parsed files, used by incremental runs
+HASH_MANIFEST_FILE = OUTPUT_FILE + '.hashes'
+# Bump when parse_file or the scoring engine changes; incremental runs then re-parse every file
+PARSER_VERSION = 1
+# Number of worker processes (1 = parse serially in this process)
+N_WORKERS = os.cpu_count()
+# Upper bound on the bytes of input handed to a worker at a time
+CHUNK_BYTES = 64 * 1024 * 1024
 # Setup output
 OUTPUT_FIELDS = ['file name', 'file size', 'number of words', '% negative', '% positive',
                  '% uncertainty', '% litigious', '% strong modal', '% weak modal',
                  '% constraining', '# of alphabetic', '# of digits',
                  '# of numbers', 'avg # of syllables per word', 'average word length', 'vocabulary']
 
-lm_dictionary = LM.load_masterdictionary(MASTER_DICTIONARY_FILE, print_flag=True)
+lm_dictionary = None
+lm_engine = None
+
+
+def load_dictionary(file_path=None, print_flag=True):
+    # Load the master dictionary (default MASTER_DICTIONARY_FILE) and compile the scoring engine
+    global lm_dictionary, lm_engine
+    lm_dictionary = LM.load_masterdictionary(file_path or MASTER_DICTIONARY_FILE, print_flag=print_flag)
+    lm_engine = SE.LMScoringEngine(lm_dictionary)
+
 
+def get_engine():
+    # The master dictionary is loaded on first use rather than at import
+    if lm_engine is None:
+        load_dictionary()
+    return lm_engine
 
-def main():
 
-    f_out = open(OUTPUT_FILE, 'w')
-    wr = csv.writer(f_out, lineterminator='\n')
-    wr.writerow(OUTPUT_FIELDS)
+def main(n_workers=N_WORKERS, resume=True, incremental=False):
 
-    file_list = glob.glob(TARGET_FILES)
-    n_files = 0
+    if incremental and os.path.exists(OUTPUT_FILE) and not os.path.exists(MANIFEST_FILE):
+        return update(n_workers)  # an interrupted full run is finished first
+    file_list = sorted(glob.glob(TARGET_FILES))
+    versions = parse_versions()
+    finished, offset = set(), 0
+    if resume and os.path.exists(OUTPUT_FILE):
+        finished, offset = read_manifest(MANIFEST_FILE)
+    if offset:
+        os.truncate(OUTPUT_FILE, offset)  # drop rows written after the last checkpoint
+        drop_partial_line(MANIFEST_FILE)  # so appended records do not join a half-written one
+        f_out = open(OUTPUT_FILE, 'a')
+        f_manifest = open(MANIFEST_FILE, 'a')
+    else:
+        f_out = open(OUTPUT_FILE, 'w')
+        f_manifest = open(MANIFEST_FILE, 'w')
+    file_list = [file for file in file_list if file not in finished]
+    print(f'{len(finished):,} files already parsed | {len(file_list):,} files to parse')
+
+    with f_out, f_manifest:
+        wr = csv.writer(f_out, lineterminator='\n')
+        if not offset:
+            wr.writerow(OUTPUT_FIELDS)
+        n_files = len(finished)
+        parsed = []
+        for rows in parse_files(file_list, n_workers):
+            for row in rows:
+                wr.writerow(row)
+                f_manifest.write(f'{row[0]}\t{f_out.tell()}\n')
+            f_out.flush()
+            f_manifest.flush()
+            n_files += len(rows)
+            parsed.extend(row[0] for row in rows)
+            print(f'{n_files:,} : {rows[-1][0]}')
+
+    # Record what this output was built from, so later incremental runs can skip unchanged files.
+    # Files parsed by an interrupted earlier run keep their previous entry (or none), so update()
+    # re-parses them unless that entry still matches their content and versions.
+    old = read_hash_manifest(HASH_MANIFEST_FILE) if finished else dict()
+    manifest = {file: old[file] for file in finished if file in old}
+    for file in parsed:
+        manifest[file] = file_state(file) + list(versions)
+    write_hash_manifest(HASH_MANIFEST_FILE, manifest)
+    os.remove(MANIFEST_FILE)  # the run is complete; a later run starts over
+
+
+def update(n_workers=N_WORKERS):
+    # Incremental run: parse only stale files and merge their rows into OUTPUT_FILE
+    file_list = sorted(glob.glob(TARGET_FILES))
+    versions = parse_versions()
+    manifest = read_hash_manifest(HASH_MANIFEST_FILE)
+    stale = []
     for file in file_list:
-        n_files += 1
-        print(f'{n_files:,} : {file}')
-        with open(file, 'r', encoding='UTF-8', errors='ignore') as f_in:
-            doc = f_in.read()
-        doc = re.sub('(May|MAY)', ' ', doc)  # drop all May month references
-        doc = doc.upper()  # for this parse caps aren't informative so shift
+        old = manifest.get(file)
+        state = file_state(file, old)
+        if old is None or old[2] != state[2] or tuple(old[3:]) != versions:
+            stale.append(file)
+        else:
+            manifest[file] = state + list(versions)  # content unchanged; refresh size/mtime only
+    print(f'{len(file_list) - len(stale):,} files up to date | {len(stale):,} files to parse')
+    if not stale:
+        write_hash_manifest(HASH_MANIFEST_FILE, manifest)
+        return
+
+    fresh_file = OUTPUT_FILE + '.fresh'
+    with open(fresh_file, 'w') as f_fresh:
+        wr = csv.writer(f_fresh, lineterminator='\n')
+        n_files = 0
+        for rows in parse_files(stale, n_workers):
+            wr.writerows(rows)
+            n_files += len(rows)
+            print(f'{n_files:,} : {rows[-1][0]}')
+
+    merge_output(OUTPUT_FILE, fresh_file, set(stale))
+    for file in stale:
+        manifest[file] = file_state(file) + list(versions)
+    write_hash_manifest(HASH_MANIFEST_FILE, manifest)
+
+
+def merge_output(output_file, fresh_file, replaced):
+    # Stream-merge the rows of fresh_file (sorted by file name) into output_file, dropping the old
+    # rows of replaced files
+    tmp_file = output_file + '.tmp'
+    with open(output_file, newline='') as f_old, open(fresh_file, newline='') as f_fresh, \
+            open(tmp_file, 'w') as f_out:
+        old_rows = csv.reader(f_old)
+        header = next(old_rows, None)
+        old_rows = (row for row in old_rows if row and row[0] not in replaced)
+        fresh_rows = csv.reader(f_fresh)
+        wr = csv.writer(f_out, lineterminator='\n')
+        wr.writerow(header or OUTPUT_FIELDS)
+        old_row, fresh_row = next(old_rows, None), next(fresh_rows, None)
+        while old_row is not None or fresh_row is not None:
+            if fresh_row is None or (old_row is not None and old_row[0] <= fresh_row[0]):
+                row, old_row = old_row, next(old_rows, None)
+            else:
+                row, fresh_row = fresh_row, next(fresh_rows, None)
+            wr.writerow(row)
+    os.replace(tmp_file, output_file)
+    os.remove(fresh_file)
+
+
+def parse_files(file_list, n_workers=N_WORKERS):
+    # Yield the output rows chunk by chunk, in file_list order
+    chunks = size_balanced_chunks(file_list, n_workers)
+    if n_workers is None or n_workers <= 1:
+        for chunk in chunks:
+            yield parse_chunk(chunk)
+    else:
+        with ProcessPoolExecutor(n_workers, initializer=_init_worker,
+                                 initargs=(MASTER_DICTIONARY_FILE,)) as pool:
+            yield from pool.map(parse_chunk, chunks)
+
+
+def size_balanced_chunks(file_list, n_workers=N_WORKERS, chunks_per_worker=4):
+    # Split file_list into contiguous chunks holding roughly the same number of bytes
+    sizes = [os.path.getsize(file) for file in file_list]
+    target = min(CHUNK_BYTES, sum(sizes) / (max(n_workers or 1, 1) * chunks_per_worker))
+    chunks = []
+    chunk = []
+    chunk_bytes = 0
+    for file, size in zip(file_list, sizes):
+        chunk.append(file)
+        chunk_bytes += size
+        if chunk_bytes >= target:
+            chunks.append(chunk)
+            chunk = []
+            chunk_bytes = 0
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def parse_chunk(files):
+    return [parse_file(file) for file in files]
 
-        output_data = get_data(doc)
-        output_data[0] = file
-        output_data[1] = len(doc)
-        wr.writerow(output_data)
-        if n_files == 3: break
+
+def parse_file(file):
+    with open(file, 'r', encoding='UTF-8', errors='ignore') as f_in:
+        doc = f_in.read()
+    doc = re.sub('(May|MAY)', ' ', doc)  # drop all May month references
+    doc = doc.upper()  # for this parse caps aren't informative so shift
+
+    output_data = get_data(doc)
+    output_data[0] = file
+    output_data[1] = len(doc)
+    return output_data
+
+
+def read_manifest(file_path):
+    # Return the set of parsed files and the output offset after the last checkpoint
+    finished = set()
+    offset = 0
+    if os.path.exists(file_path):
+        with open(file_path) as f:
+            for line in f:
+                if not line.endswith('\n'):
+                    break  # cut off by a crash mid-write; the file was not checkpointed
+                parts = line.rstrip('\n').split('\t')
+                if len(parts) == 2:
+                    finished.add(parts[0])
+                    offset = int(parts[1])
+    return finished, offset
+
+
+def drop_partial_line(file_path):
+    # Truncate file_path after its last complete line
+    with open(file_path, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+
+
+def parse_versions():
+    # (dictionary version, parser version) recorded with every parsed file
+    return f'{LM.SNAPSHOT_VERSION}:{file_sha1(MASTER_DICTIONARY_FILE)}', str(PARSER_VERSION)
+
+
+def file_state(file, old=None):
+    # [size, mtime_ns, sha1]; the hash is reused from old when size and mtime are unchanged
+    stat = os.stat(file)
+    if old is not None and old[0] == str(stat.st_size) and old[1] == str(stat.st_mtime_ns):
+        return [old[0], old[1], old[2]]
+    return [str(stat.st_size), str(stat.st_mtime_ns), file_sha1(file)]
+
+
+def file_sha1(file):
+    sha = hashlib.sha1()
+    with open(file, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def read_hash_manifest(file_path):
+    # {file: [size, mtime_ns, sha1, dictionary version, parser version]}
+    manifest = dict()
+    if os.path.exists(file_path):
+        with open(file_path) as f:
+            for line in f:
+                parts = line.rstrip('\n').split('\t')
+                if len(parts) == 6:
+                    manifest[parts[0]] = parts[1:]
+    return manifest
+
+
+def write_hash_manifest(file_path, manifest):
+    with open(file_path + '.tmp', 'w') as f:
+        for file in sorted(manifest):
+            f.write('\t'.join([file] + list(manifest[file])) + '\n')
+    os.replace(file_path + '.tmp', file_path)
+
+
+def _init_worker(master_dictionary_file):
+    # Runs once in each worker process; fork-started workers may inherit a loaded dictionary
+    if lm_engine is None:
+        load_dictionary(master_dictionary_file, print_flag=False)
 
 
 def get_data(doc):
+    # Counts are computed by the compiled engine; see MOD_LM_ScoringEngine for the layout
+    return get_engine().score(doc)
+
 
-    vdictionary = dict()
-    _odata = [0] * 16
-    total_syllables = 0
-    word_length = 0
-    
-    tokens = re.findall('\w+', doc)  # Note that \w+ splits hyphenated words
-    for token in tokens:
-        if not token.isdigit() and len(token) > 1 and token in lm_dictionary:
-            _odata[2] += 1  # word count
-            word_length += len(token)
-            if token not in vdictionary:
-                vdictionary[token] = 1
-            if lm_dictionary[token].negative: _odata[3] += 1
-            if lm_dictionary[token].positive: _odata[4] += 1
-            if lm_dictionary[token].uncertainty: _odata[5] += 1
-            if lm_dictionary[token].litigious: _odata[6] += 1
-            if lm_dictionary[token].strong_modal: _odata[7] += 1
-            if lm_dictionary[token].weak_modal: _odata[8] += 1
-            if lm_dictionary[token].constraining: _odata[9] += 1
-            total_syllables += lm_dictionary[token].syllables
-
-    _odata[10] = len(re.findall('[A-Z]', doc))
-    _odata[11] = len(re.findall('[0-9]', doc))
-    # drop punctuation within numbers for number count
-    doc = re.sub('(?!=[0-9])(\.|,)(?=[0-9])', '', doc)
-    doc = doc.translate(str.maketrans(string.punctuation, " " * len(string.punctuation)))
-    _odata[12] = len(re.findall(r'\b[-+\(]?[$€£]?[-+(]?\d+\)?\b', doc))
-    _odata[13] = total_syllables / _odata[2]
-    _odata[14] = word_length / _odata[2]
-    _odata[15] = len(vdictionary)
-    
-    # Convert counts to %
-    for i in range(3, 9 + 1):
-        _odata[i] = (_odata[i] / _odata[2]) * 100
-    # Vocabulary
-        
-    return _odata
+def get_data_batch(docs):
+    # Score a list of documents with one reduction across the batch
+    return get_engine().score_documents(docs)
 
 
 if __name__ == '__main__':
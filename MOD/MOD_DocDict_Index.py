@@ -0,0 +1,150 @@
+"""
+Byte-offset index for random access into a Document Dictionary file (Doc_Dict_10X_YYYY.txt).
+
+build_docdict_index() scans the file once and records, for every filing, the byte offset and
+length of its line together with the CIK, filing date, accession number and form type.  Queries
+then seek straight to the selected lines and parse only those with read_docdict().
+
+load_docdict_index():
+    Arguments:
+      dd_file - the Document Dictionary file.
+      index_file - where the index is stored (default: dd_file + '.index.npz').  The index is
+                   rebuilt when missing or when the file's size or mtime has changed.
+
+    Returns:
+      DocDictIndex
+
+DocDictIndex.query(lookup, ciks=None, bgn_date=None, end_date=None, form_types=None,
+                   accession_numbers=None):
+    Yields (header, doc_dict) exactly as read_docdict() returns them, in file order, for the
+    filings matching every filter given (dates are YYYYMMDD integers, inclusive).
+"""
+
+import datetime as dt
+import os
+import sys
+import numpy as np
+import MOD_Read_DocDict as rd
+
+
+INDEX_VERSION = 1
+# Encoding used to decode lines read by offset
+DD_ENCODING = 'utf-8'
+
+
+def build_docdict_index(dd_file, index_file=None, print_flag=False):
+    start_local = dt.datetime.now()
+    index_file = index_file or dd_file + '.index.npz'
+    cik = []
+    filing_date = []
+    accession_number = []
+    form_type = []
+    offset = []
+    length = []
+    position = 0
+    with open(dd_file, 'rb') as f_in:
+        for line in f_in:
+            if not line.strip():  # blank or trailing empty line
+                position += len(line)
+                continue
+            parts = line[:line.find(b'|')].split(b',', 5)
+            cik.append(int(parts[0]))
+            filing_date.append(int(parts[1]))
+            accession_number.append(parts[2].decode(DD_ENCODING, errors='replace'))
+            form_type.append(parts[4].decode(DD_ENCODING, errors='replace'))
+            offset.append(position)
+            length.append(len(line))
+            position += len(line)
+            if print_flag and len(offset) % 100000 == 0:
+                print(f'\r ...Indexing {len(offset):,} filings', end='', flush=True)
+
+    # Sorted by CIK then filing date so CIK lookups are binary searches
+    columns = {'cik': np.array(cik, dtype=np.int64),
+               'filing_date': np.array(filing_date, dtype=np.int32),
+               'accession_number': np.array(accession_number, dtype=str),
+               'form_type': np.array(form_type, dtype=str),
+               'offset': np.array(offset, dtype=np.int64),
+               'length': np.array(length, dtype=np.int64)}
+    order = np.lexsort((columns['offset'], columns['filing_date'], columns['cik']))
+    columns = {name: values[order] for name, values in columns.items()}
+
+    stat = os.stat(dd_file)
+    key = np.array([INDEX_VERSION, stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+    with open(index_file, 'wb') as f_out:
+        np.savez(f_out, key=key, **columns)
+
+    if print_flag:
+        print(f'\nDocument Dictionary index: {len(offset):,} filings written to {index_file}' +
+              f' | Time = {dt.datetime.now() - start_local}')
+
+    return DocDictIndex(dd_file, columns)
+
+
+def load_docdict_index(dd_file, index_file=None, print_flag=False):
+    index_file = index_file or dd_file + '.index.npz'
+    if os.path.exists(index_file):
+        stat = os.stat(dd_file)
+        with np.load(index_file) as npz:
+            key = npz['key'].tolist()
+            if key == [INDEX_VERSION, stat.st_size, stat.st_mtime_ns]:
+                return DocDictIndex(dd_file, {name: npz[name] for name in npz.files if name != 'key'})
+    return build_docdict_index(dd_file, index_file, print_flag)
+
+
+class DocDictIndex:
+
+    def __init__(self, dd_file, columns):
+        self.dd_file = dd_file
+        self.cik = columns['cik']
+        self.filing_date = columns['filing_date']
+        self.accession_number = columns['accession_number']
+        self.form_type = columns['form_type']
+        self.offset = columns['offset']
+        self.length = columns['length']
+
+    def __len__(self):
+        return len(self.offset)
+
+    def select(self, ciks=None, bgn_date=None, end_date=None, form_types=None, accession_numbers=None):
+        # Return index rows matching all filters, ordered by position in the file
+        if ciks is not None:
+            ciks = np.unique(np.asarray(list(ciks), dtype=np.int64))
+            lo = np.searchsorted(self.cik, ciks, side='left')
+            hi = np.searchsorted(self.cik, ciks, side='right')
+            rows = np.concatenate([np.arange(a, b) for a, b in zip(lo, hi)] or
+                                  [np.zeros(0, dtype=np.int64)])
+        else:
+            rows = np.arange(len(self.offset))
+        keep = np.ones(len(rows), dtype=bool)
+        if bgn_date is not None:
+            keep &= self.filing_date[rows] >= bgn_date
+        if end_date is not None:
+            keep &= self.filing_date[rows] <= end_date
+        if form_types is not None:
+            keep &= np.isin(self.form_type[rows], list(form_types))
+        if accession_numbers is not None:
+            keep &= np.isin(self.accession_number[rows], list(accession_numbers))
+        rows = rows[keep]
+        return rows[np.argsort(self.offset[rows], kind='stable')]
+
+    def read_lines(self, rows):
+        # Yield the raw Document Dictionary line for each index row
+        with open(self.dd_file, 'rb') as f_in:
+            for row in rows:
+                f_in.seek(self.offset[row])
+                yield f_in.read(self.length[row]).decode(DD_ENCODING, errors='replace').rstrip('\r\n')
+
+    def query(self, lookup, **filters):
+        for line in self.read_lines(self.select(**filters)):
+            yield rd.read_docdict(line, lookup)
+
+
+if __name__ == '__main__':
+    start = dt.datetime.now()
+    print(f'\n\n{start.strftime("%c")}\nPROGRAM NAME: {sys.argv[0]}\n')
+    IN_DD = r'G:\My Drive\SRAF\EDGAR_Data\Loughran-McDonald_10X_DocumentDictionaries_1993-2024.txt'
+    index = load_docdict_index(IN_DD, print_flag=True)
+    rows = index.select(ciks=[320193, 789019], bgn_date=20200101)
+    print(f'{len(index):,} filings indexed | {len(rows):,} selected')
+    print(f'\n\nRuntime: {(dt.datetime.now()-start)}')
+    print(f'\nNormal termination.\n{dt.datetime.now().strftime("%c")}\n')
@@ -0,0 +1,222 @@
+"""
+Convert a Document Dictionary file (Doc_Dict_10X_YYYY.txt) into a sparse document-term matrix.
+
+The file is streamed once, in blocks of lines, into CSR arrays whose column ids are the master
+dictionary sequence numbers used in the file.  Each array is saved as a .npy file in an output
+directory so later jobs can open it with np.load(mmap_mode='r') and slice rows or columns
+without reparsing the text file.
+
+build_docdict_matrix():
+    Arguments:
+      dd_file - the Document Dictionary file.
+      out_dir - directory that receives the matrix (created if needed).
+      master_dictionary - optional; sets the number of columns and saves the word for each
+                          sequence number (words.npy).
+
+    Output directory:
+      indptr.npy, indices.npy, data.npy - CSR arrays (row i spans indptr[i]:indptr[i+1]).
+      header_<field>.npy - one array per HeaderCls field, plus total_words.
+      meta.json - shape, nnz and the source file's path, size and mtime.
+
+load_docdict_matrix():
+    Arguments:
+      out_dir - directory written by build_docdict_matrix().
+
+    Returns:
+      DocDictMatrix - memory-mapped view of the arrays (see the class methods).
+"""
+
+import datetime as dt
+import json
+import os
+import shutil
+import sys
+import numpy as np
+
+
+MATRIX_VERSION = 1
+HEADER_FIELDS = ('cik', 'filing_date', 'accession_number', 'cpr', 'form_type', 'company_name')
+_INT_FIELDS = {'cik': np.int64, 'filing_date': np.int32, 'cpr': np.int32}
+_INDEX_DTYPE = np.int32
+_COUNT_DTYPE = np.int32
+
+
+def build_docdict_matrix(dd_file, out_dir, master_dictionary=None, chunk_lines=20000, print_flag=False):
+    start_local = dt.datetime.now()
+    os.makedirs(out_dir, exist_ok=True)
+    raw_indices = os.path.join(out_dir, 'indices.bin')
+    raw_data = os.path.join(out_dir, 'data.bin')
+
+    header_columns = {field: [] for field in HEADER_FIELDS}
+    row_nnz = []
+    total_words = []
+    n_rows = 0
+    nnz = 0
+    max_column = -1
+    with open(dd_file) as f_in, open(raw_indices, 'wb') as f_indices, open(raw_data, 'wb') as f_data:
+        while True:
+            lines = [line for _, line in zip(range(chunk_lines), f_in)]
+            if not lines:
+                break
+            nnz_block, indices, counts = _parse_block(lines, header_columns)
+            indices.tofile(f_indices)
+            counts.tofile(f_data)
+            row_nnz.append(nnz_block)
+            bounds = np.concatenate(([0], np.cumsum(nnz_block)))
+            running = np.concatenate(([0], np.cumsum(counts, dtype=np.int64)))
+            total_words.append(running[bounds[1:]] - running[bounds[:-1]])
+            if len(indices):
+                max_column = max(max_column, int(indices.max()))
+            n_rows += len(lines)
+            nnz += len(indices)
+            if print_flag:
+                print(f'\r ...{n_rows:,} filings | {nnz:,} nonzeros', end='', flush=True)
+
+    if master_dictionary:
+        sequence_numbers = [entry.sequence_number for entry in master_dictionary.values()]
+        n_cols = max(max(sequence_numbers), max_column) + 1
+        words = np.full(n_cols, '', dtype=f'U{max(len(word) for word in master_dictionary)}')
+        for word, entry in master_dictionary.items():
+            words[entry.sequence_number] = word
+        np.save(os.path.join(out_dir, 'words.npy'), words)
+    else:
+        n_cols = max_column + 1
+
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    if row_nnz:
+        np.cumsum(np.concatenate(row_nnz), out=indptr[1:])
+    np.save(os.path.join(out_dir, 'indptr.npy'), indptr)
+    _raw_to_npy(raw_indices, os.path.join(out_dir, 'indices.npy'), _INDEX_DTYPE, nnz)
+    _raw_to_npy(raw_data, os.path.join(out_dir, 'data.npy'), _COUNT_DTYPE, nnz)
+
+    for field, values in header_columns.items():
+        if field in _INT_FIELDS:
+            column = np.array(values, dtype=_INT_FIELDS[field])
+        else:
+            column = np.array(values, dtype=str)
+        np.save(os.path.join(out_dir, f'header_{field}.npy'), column)
+    total_words = np.concatenate(total_words) if total_words else np.zeros(0, dtype=np.int64)
+    np.save(os.path.join(out_dir, 'header_total_words.npy'), total_words)
+
+    stat = os.stat(dd_file)
+    meta = {'version': MATRIX_VERSION, 'source': os.path.abspath(dd_file), 'source_size': stat.st_size,
+            'source_mtime_ns': stat.st_mtime_ns, 'n_rows': n_rows, 'n_cols': n_cols, 'nnz': nnz}
+    with open(os.path.join(out_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    if print_flag:
+        print(f'\nDocument-term matrix: {n_rows:,} x {n_cols:,} with {nnz:,} nonzeros written to {out_dir}' +
+              f' | Time = {dt.datetime.now() - start_local}')
+
+    return meta
+
+
+def _parse_block(lines, header_columns):
+    # Parse a block of lines: headers go to header_columns, the word counts are parsed in one call
+    bodies = []
+    nnz = np.zeros(len(lines), dtype=np.int64)
+    for i, line in enumerate(lines):
+        head, _, body = line.rstrip('\n').partition('|')
+        parts = head.split(',', 5)
+        for field, value in zip(HEADER_FIELDS, parts):
+            header_columns[field].append(value)
+        if body:
+            bodies.append(body)
+            nnz[i] = body.count(',') + 1
+    if bodies:
+        pairs = np.fromstring(','.join(bodies).replace(':', ','), sep=',', dtype=np.int64)
+    else:
+        pairs = np.zeros(0, dtype=np.int64)
+    return nnz, pairs[0::2].astype(_INDEX_DTYPE), pairs[1::2].astype(_COUNT_DTYPE)
+
+
+def _raw_to_npy(raw_path, npy_path, dtype, n):
+    # Prepend a .npy header to a raw binary file written in pieces
+    header = {'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)), 'fortran_order': False, 'shape': (n,)}
+    with open(raw_path, 'rb') as f_in, open(npy_path, 'wb') as f_out:
+        np.lib.format.write_array_header_1_0(f_out, header)
+        shutil.copyfileobj(f_in, f_out, 16 * 1024 * 1024)
+    os.remove(raw_path)
+
+
+def load_docdict_matrix(out_dir, mmap_mode='r'):
+    return DocDictMatrix(out_dir, mmap_mode)
+
+
+class DocDictMatrix:
+
+    def __init__(self, out_dir, mmap_mode='r'):
+        with open(os.path.join(out_dir, 'meta.json')) as f:
+            self.meta = json.load(f)
+        if self.meta['version'] != MATRIX_VERSION:
+            raise ValueError(f'{out_dir} was written by matrix version {self.meta["version"]}, ' +
+                             f'expected {MATRIX_VERSION}; rebuild it with build_docdict_matrix()')
+        self.n_rows = self.meta['n_rows']
+        self.n_cols = self.meta['n_cols']
+        self.indptr = np.load(os.path.join(out_dir, 'indptr.npy'), mmap_mode=mmap_mode)
+        self.indices = np.load(os.path.join(out_dir, 'indices.npy'), mmap_mode=mmap_mode)
+        self.data = np.load(os.path.join(out_dir, 'data.npy'), mmap_mode=mmap_mode)
+        self.header = dict()
+        for field in HEADER_FIELDS + ('total_words',):
+            self.header[field] = np.load(os.path.join(out_dir, f'header_{field}.npy'), mmap_mode=mmap_mode)
+        words_file = os.path.join(out_dir, 'words.npy')
+        self.words = np.load(words_file, mmap_mode=mmap_mode) if os.path.exists(words_file) else None
+
+    @property
+    def shape(self):
+        return self.n_rows, self.n_cols
+
+    def row(self, i):
+        # Return (sequence_numbers, counts) for filing i
+        lo, hi = self.indptr[i], self.indptr[i + 1]
+        return np.asarray(self.indices[lo:hi]), np.asarray(self.data[lo:hi])
+
+    def docdict(self, i, lookup):
+        # Same word -> count dictionary read_docdict() returns (lookup from create_lookup_dictionary)
+        sequence_numbers, counts = self.row(i)
+        return {lookup[s]: c for s, c in zip(sequence_numbers.tolist(), counts.tolist())}
+
+    def rows(self, row_ids):
+        # Return (indptr, indices, data) of a CSR matrix holding only the selected rows
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        starts = self.indptr[row_ids]
+        lengths = self.indptr[row_ids + 1] - starts
+        indptr = np.zeros(len(row_ids) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        positions = np.repeat(starts - indptr[:-1], lengths) + np.arange(indptr[-1])
+        return indptr, np.asarray(self.indices[positions]), np.asarray(self.data[positions])
+
+    def columns(self, sequence_numbers, block_rows=100000):
+        # Dense (n_rows x len(sequence_numbers)) counts, scanning the matrix in blocks of rows
+        sequence_numbers = np.asarray(sequence_numbers, dtype=np.int64)
+        position = np.full(self.n_cols, -1, dtype=np.int64)
+        position[sequence_numbers] = np.arange(len(sequence_numbers))
+        out = np.zeros((self.n_rows, len(sequence_numbers)), dtype=np.int64)
+        for bgn in range(0, self.n_rows, block_rows):
+            end = min(bgn + block_rows, self.n_rows)
+            lo, hi = self.indptr[bgn], self.indptr[end]
+            col = position[self.indices[lo:hi]]
+            keep = col >= 0
+            row = np.repeat(np.arange(bgn, end), np.diff(self.indptr[bgn:end + 1]))
+            out[row[keep], col[keep]] = self.data[lo:hi][keep]
+        return out
+
+    def to_scipy(self):
+        # Optional: requires scipy
+        import scipy.sparse
+        return scipy.sparse.csr_matrix((self.data, self.indices, self.indptr), shape=self.shape)
+
+
+if __name__ == '__main__':
+    import MOD_Load_MasterDictionary_v2023 as md
+    start = dt.datetime.now()
+    print(f'\n\n{start.strftime("%c")}\nPROGRAM NAME: {sys.argv[0]}\n')
+    IN_MASTER = r'G:\My Drive\SRAF\LM_Master_Dictionary\Loughran-McDonald_MasterDictionary_1993-2024.csv'
+    IN_DD = r'G:\My Drive\SRAF\EDGAR_Data\Loughran-McDonald_10X_DocumentDictionaries_1993-2024.txt'
+    OUT_DIR = r'D:\Temp\DocDict_Matrix'
+    master_dictionary = md.load_masterdictionary(IN_MASTER, print_flag=True)
+    build_docdict_matrix(IN_DD, OUT_DIR, master_dictionary, print_flag=True)
+    dtm = load_docdict_matrix(OUT_DIR)
+    print(f'{dtm.shape} | first filing: {dtm.header["company_name"][0]}')
+    print(f'\n\nRuntime: {(dt.datetime.now()-start)}')
+    print(f'\nNormal termination.\n{dt.datetime.now().strftime("%c")}\n')
@@ -1,7 +1,13 @@
 """
 Download url to doc-string or file
-  download_to_file(url, fname, f_log)
+  download_to_file(url, fname, f_log, compress=False, manifest=None)
   doc = download_to_doc(url, f_log)
+  for line in download_to_lines(url, f_log): ...
+
+download_to_file streams the body to fname + '.part' in chunks (optionally gzip-compressed to
+fname + '.gz') and renames it when complete.  If a transfer is interrupted, the next try (or
+the next call) resumes from the .part file with an HTTP Range request.  When manifest is a
+file path, a line with the output file, url, size and SHA-256 of the content is appended.
 
 ND-SRAF / McDonald : 201606 | Last update: 202201
 https://sraf.nd.edu
@@ -9,40 +15,63 @@ https://sraf.nd.edu
 
 
 import datetime as dt
+import gzip
+import hashlib
+import os
 import requests
 import sys
 import time
 from urllib.request import urlopen
 
 
-HEADER = {'Host': 'www.sec.gov', 'Connection': 'close',
-         'Accept': 'application/json, text/javascript, */*; q=0.01', 'X-Requested-With': 'XMLHttpRequest',
+HEADER = {'Accept': 'application/json, text/javascript, */*; q=0.01', 'X-Requested-With': 'XMLHttpRequest',
          'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/80.0.3987.163 Safari/537.36',
          }
+CHUNK_SIZE = 1024 * 1024
+# Compressed downloads close a gzip member (a resumable checkpoint) every CHECKPOINT_BYTES
+CHECKPOINT_BYTES = 16 * 1024 * 1024
 
-def download_to_file(url, fname, f_log=None, number_of_tries=5, sleep_time=5):
-    # download file from '_url' and write to 'fname'
-    # Loop accounts for temporary server/ISP issues
+def download_to_file(url, fname, f_log=None, number_of_tries=5, sleep_time=5, compress=False, manifest=None):
+    # download file from '_url' and write to 'fname' (or fname + '.gz' if compress)
+    # Loop accounts for temporary server/ISP issues; each try resumes from the partial file
 
-    for i in range(1, number_of_tries):
+    out_name = fname + '.gz' if compress else fname
+    part_name = out_name + '.part'
+    for i in range(1, number_of_tries + 1):
         try:
-            response = requests.get(url, headers=HEADER)
-            if response.status_code == 200:
-                with open(fname, 'wb') as f:
-                    f.write(response.content)
-                return True
-            else:
-                print(f'  Error in try #{i} download_to_file: URL = {url} | status_code = {response.status_code}')
-                if i == number_of_tries + 1:
-                    print(f'  Failed download: URL = {url}')
-                    if f_log: f_log.write(f'  Failed download: URL = {url}\n')
-                
-        except Exception as exc:
+            received, sha = _resume_part(part_name, compress)
+            headers = dict(HEADER)
+            if received:
+                headers['Range'] = f'bytes={received}-'
+            with requests.get(url, headers=headers, stream=True, timeout=60) as response:
+                status = response.status_code
+                if status == 416 and received:
+                    pass  # nothing left to fetch: the previous transfer ended just before the rename
+                elif status in (200, 206):
+                    content_range = response.headers.get('Content-Range', '')
+                    if status == 200 or not content_range.startswith(f'bytes {received}-'):
+                        received, sha = _resume_part(part_name, compress, restart=True)
+                    received = _stream_to_part(response, part_name, received, sha, compress)
+                else:
+                    print(f'  Error in try #{i} download_to_file: URL = {url} | status_code = {status}')
+                    if status == 404:
+                        break
+                    time.sleep(sleep_time)
+                    sleep_time += sleep_time
+                    continue
+            os.replace(part_name, out_name)
+            if os.path.exists(part_name + '.progress'):
+                os.remove(part_name + '.progress')
+            if manifest:
+                with open(manifest, 'a') as f_manifest:
+                    f_manifest.write(f'{out_name}\t{url}\t{received}\t{sha.hexdigest()}\t' +
+                                     f'{dt.datetime.now().strftime("%Y%m%d %H:%M:%S")}\n')
+            return True
+
+        except (requests.RequestException, OSError) as exc:
             if i == 1:
                 print('\n==>urlretrieve error in download_to_file.py')
             print(f'  {i}.url  : {url} \n  fname: {fname} \n  exc:  {exc}')
-            if '404' in str(exc):
-                break
             print(f'     Retry in {sleep_time} seconds')
             time.sleep(sleep_time)
             sleep_time += sleep_time
@@ -59,6 +88,60 @@ def download_to_file(url, fname, f_log=None, number_of_tries=5, sleep_time=5):
     return False
 
 
+def _resume_part(part_name, compress, restart=False):
+    # Return (bytes already received, sha256 of them) for a partial download, trimming any
+    #   compressed data written after the last checkpoint
+    sha = hashlib.sha256()
+    if restart or not os.path.exists(part_name):
+        open(part_name, 'wb').close()
+        _write_progress(part_name, 0, 0)
+        return 0, sha
+    if compress:
+        received, offset = 0, 0
+        if os.path.exists(part_name + '.progress'):
+            with open(part_name + '.progress') as f:
+                received, offset = (int(x) for x in f.read().split())
+        os.truncate(part_name, offset)
+        f_in = gzip.open(part_name, 'rb')
+    else:
+        received = os.path.getsize(part_name)
+        f_in = open(part_name, 'rb')
+    with f_in:
+        for block in iter(lambda: f_in.read(CHUNK_SIZE), b''):
+            sha.update(block)
+    return received, sha
+
+
+def _stream_to_part(response, part_name, received, sha, compress):
+    with open(part_name, 'ab') as f_out:
+        if not compress:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                f_out.write(chunk)
+                sha.update(chunk)
+                received += len(chunk)
+            return received
+        gz = gzip.GzipFile(fileobj=f_out, mode='wb')
+        since_checkpoint = 0
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            gz.write(chunk)
+            sha.update(chunk)
+            received += len(chunk)
+            since_checkpoint += len(chunk)
+            if since_checkpoint >= CHECKPOINT_BYTES:
+                gz.close()  # completes a gzip member; f_out stays open
+                f_out.flush()
+                _write_progress(part_name, received, f_out.tell())
+                gz = gzip.GzipFile(fileobj=f_out, mode='wb')
+                since_checkpoint = 0
+        gz.close()
+    return received
+
+
+def _write_progress(part_name, received, offset):
+    with open(part_name + '.progress', 'w') as f:
+        f.write(f'{received} {offset}')
+
+
 def download_to_doc(url, f_log=None, number_of_tries=5, sleep_time=5):
     # Download url content to string doc
     # Loop accounts for temporary server/ISP issues
@@ -92,6 +175,53 @@ def download_to_doc(url, f_log=None, number_of_tries=5, sleep_time=5):
     return None
 
 
+def download_to_lines(url, f_log=None, number_of_tries=5, sleep_time=5):
+    # Generator version of download_to_doc: yields decoded lines without holding the whole body
+    # A dropped connection is resumed with a Range request from the last byte received
+
+    received = 0
+    pending = b''
+    for i in range(1, number_of_tries + 1):
+        try:
+            headers = dict(HEADER)
+            if received:
+                headers['Range'] = f'bytes={received}-'
+            with requests.get(url, headers=headers, stream=True, timeout=60) as response:
+                if response.status_code not in (200, 206):
+                    print(f'  Error in try #{i} download_to_lines: URL = {url} | status_code = {response.status_code}')
+                    if response.status_code == 404:
+                        break
+                    time.sleep(sleep_time)
+                    sleep_time += sleep_time
+                    continue
+                skip = received if response.status_code == 200 else 0  # server ignored the Range
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    if skip:
+                        n = min(skip, len(chunk))
+                        chunk = chunk[n:]
+                        skip -= n
+                    received += len(chunk)
+                    lines = (pending + chunk).split(b'\n')
+                    pending = lines.pop()
+                    for line in lines:
+                        yield line.rstrip(b'\r').decode('utf-8', errors='ignore')
+            if pending:
+                yield pending.rstrip(b'\r').decode('utf-8', errors='ignore')
+            return
+        except requests.RequestException as exc:
+            if i == 1:
+                print('\n==>error in download_to_lines')
+            print(f'  {i}. _url:  {url}')
+            print(f'     Warning: {exc}  [{dt.datetime.now().strftime("%c")}]')
+            print(f'     Retry in {sleep_time} seconds')
+            time.sleep(sleep_time)
+            sleep_time += sleep_time
+
+    print(f'  ERROR:  Download failed for url: {url}')
+    if f_log:
+        f_log.write(f'\nERROR:  Download failed=>  _url: {url} |  {dt.datetime.now().strftime("%c")}')
+
+
 # Test routine
 if __name__ == '__main__':
     
@@ -0,0 +1,194 @@
+"""
+Concurrent, rate-limited download engine for EDGAR files.
+
+  downloader = EDGARDownloader(max_rps=8, max_workers=8, f_log=f_log)
+  failed = downloader.download_all([(url, fname), ...])
+
+All requests share one pooled requests.Session (keep-alive connections) and pass through a
+token bucket, so the total request rate never exceeds max_rps no matter how many threads are
+running.  At most per_host requests are in flight to any one host.  Responses with status
+429/500/502/503/504 and connection errors are retried with exponential backoff (honoring
+Retry-After); other status codes fail immediately.  Files are streamed to fname + '.part' and
+renamed when complete.
+
+The SEC asks for no more than 10 requests per second and a User-Agent that identifies you;
+edit HEADER accordingly.  URLs are used as given, so the engine can be pointed at a local HTTP
+server for testing.
+"""
+
+import datetime as dt
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+
+
+HEADER = {'Accept': 'application/json, text/javascript, */*; q=0.01', 'X-Requested-With': 'XMLHttpRequest',
+          'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/80.0.3987.163 Safari/537.36',
+          }
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    # Thread-safe token bucket: acquire() blocks until a token is available.
+    # capacity is the largest allowed burst; the default of 1 spaces requests evenly at 1/rate.
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class EDGARDownloader:
+    def __init__(self, max_rps=8, max_workers=8, per_host=8, number_of_tries=5, backoff=2.0,
+                 timeout=60, headers=HEADER, f_log=None):
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.number_of_tries = number_of_tries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.f_log = f_log
+        self.limiter = TokenBucket(max_rps)
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._host_slots = dict()
+        self._lock = threading.Lock()
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _host_slot(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_slots[host]
+
+    def download(self, url, fname):
+        # Download url to fname; returns True on success
+        sleep_time = self.backoff
+        for i in range(1, self.number_of_tries + 1):
+            retry_after = None
+            try:
+                self.limiter.acquire()
+                with self._host_slot(url):
+                    with self.session.get(url, stream=True, timeout=self.timeout) as response:
+                        if response.status_code == 200:
+                            tmp_name = fname + '.part'
+                            with open(tmp_name, 'wb') as f:
+                                for chunk in response.iter_content(chunk_size=1024 * 1024):
+                                    f.write(chunk)
+                            os.replace(tmp_name, fname)
+                            return True
+                        status = response.status_code
+                        retry_after = response.headers.get('Retry-After')
+                if status not in RETRY_STATUS:
+                    self._log(f'  Failed download: URL = {url} | status_code = {status}')
+                    return False
+                print(f'  Error in try #{i} download: URL = {url} | status_code = {status}')
+            except (requests.RequestException, OSError) as exc:
+                print(f'  Error in try #{i} download: URL = {url} | {exc}')
+            if i < self.number_of_tries:
+                wait = float(retry_after) if retry_after and retry_after.isdigit() else sleep_time
+                time.sleep(wait)
+                sleep_time *= 2
+
+        self._log(f'  Failed download after {self.number_of_tries} tries: URL = {url} | fname = {fname}')
+        return False
+
+    def head(self, url):
+        # Return [Last-Modified, Content-Length] for url, or None if it is not available
+        try:
+            self.limiter.acquire()
+            with self._host_slot(url):
+                response = self.session.head(url, timeout=self.timeout, allow_redirects=True)
+        except requests.RequestException as exc:
+            self._log(f'  HEAD failed: URL = {url} | {exc}')
+            return None
+        if response.status_code != 200:
+            return None
+        return [response.headers.get('Last-Modified'), response.headers.get('Content-Length')]
+
+    def download_all(self, jobs):
+        # jobs: iterable of (url, fname).  Returns the list of URLs that failed.
+        jobs = list(jobs)
+        with ThreadPoolExecutor(self.max_workers) as pool:
+            results = pool.map(lambda job: self.download(*job), jobs)
+            return [url for (url, _), ok in zip(jobs, results) if not ok]
+
+    def _log(self, message):
+        print(message)
+        if self.f_log:
+            with self._lock:
+                self.f_log.write(f'{message} | {dt.datetime.now().strftime("%c")}\n')
+
+
+# Test routine against a local stand-in server (no requests reach the SEC)
+if __name__ == '__main__':
+    import sys
+    import tempfile
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class StandInHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        hits = dict()
+
+        def do_GET(self):
+            n = self.hits[self.path] = self.hits.get(self.path, 0) + 1
+            if self.path.endswith('missing'):
+                code = 404
+            elif self.path.endswith('busy') and n < 3:
+                code = 503
+            else:
+                code = 200
+            body = (self.path * 100).encode()
+            self.send_response(code)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    start = dt.datetime.now()
+    print(f"\n\n{start.strftime('%c')}\nPROGRAM NAME: {sys.argv[0]}\n")
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.handle_error = lambda request, client_address: None  # keep-alive sockets closed by the client
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+    out_dir = tempfile.mkdtemp()
+    test_jobs = [(f'{base_url}/file{i}', os.path.join(out_dir, f'file{i}.txt')) for i in range(20)]
+    test_jobs += [(f'{base_url}/busy', os.path.join(out_dir, 'busy.txt')),
+                  (f'{base_url}/missing', os.path.join(out_dir, 'missing.txt'))]
+    with EDGARDownloader(max_rps=10, max_workers=4, backoff=0.1) as downloader:
+        failed_urls = downloader.download_all(test_jobs)
+    server.shutdown()
+    print(f'{len(test_jobs) - len(failed_urls)} of {len(test_jobs)} downloaded | failed: {failed_urls}')
+
+    print(f"\n\nRuntime: {(dt.datetime.now()-start)}")
+    print(f"\nNormal termination.\n{dt.datetime.now().strftime('%c')}\n")
@@ -1,5 +1,7 @@
 """
     Utility programs for accessing SEC/EDGAR
+    For repeated queries over many quarters see MOD_MasterIndex_Store, which keeps the master
+    indexes locally in typed columns and only fetches quarters that changed.
     ND-SRAF / McDonald : 201606
     https.//sraf.nd.edu
 """
@@ -24,13 +26,13 @@ def download_masterindex(year, qtr, flag=False):
     start = dt.datetime.now()  # Note: using clock time not CPU
     masterindex = list()
     #  using the zip file is a little more complicated but orders of magnitude faster
-    append_path = str(year) + '/QTR' + str(qtr) + '/master.idx'  
-    sec_url = PARM_ROOT_PATH + append_path
+    append_path = str(year) + '/QTR' + str(qtr) + '/master.zip'
+    sec_url = PARM_EDGARPREFIX + append_path
 
     for i in range(1, number_of_tries + 1):
         try:
-            
-            records = urlopen(sec_url).read().decode('utf-8').splitlines()[10:] #  => nonzip version
+            zipfile = ZipFile(BytesIO(urlopen(sec_url).read()))
+            records = zipfile.read('master.idx').decode('utf-8', errors='ignore').splitlines()[10:]
             break
         except Exception as exc:
             if i == 1:
@@ -54,8 +56,8 @@ def download_masterindex(year, qtr, flag=False):
             masterindex.append(mir)
 
     if flag:
-        print(f'download_masterindex:  {year} : {qtr} | lne() = {len(masterindex),:}' +
-              f' | Time = {(dt.datetime.now() - start),.4} seconds') 
+        print(f'download_masterindex:  {year} : {qtr} | len() = {len(masterindex):,}' +
+              f' | Time = {(dt.datetime.now() - start).total_seconds():.4} seconds')
 
     return masterindex
 
@@ -0,0 +1,284 @@
+"""
+Streaming scrubber for raw EDGAR full-submission files (the .txt files EDGAR_DownloadForms writes).
+
+  stats = scrub_submission(in_file, out_file)
+
+The submission is read in pieces of at most CHUNK_SIZE characters, so memory use stays flat no
+matter how large the file or how long its lines are.  In one pass the scrubber
+  - drops <DOCUMENT> blocks of non-text types (NON_TEXT_TYPES) and uuencoded binaries,
+  - drops <XBRL> and <XML> segments (inline XBRL documents are kept as HTML text, minus the
+    hidden <ix:header> facts), and <PDF> segments,
+  - strips HTML markup, <script>/<style> contents and comments, and decodes character entities,
+and writes the clean text of each remaining document as <TYPE> ... </TYPE> after a header in the
+LM Stage One layout (<Header><FileStats> ... </FileStats><SEC-Header> ... </SEC-Header></Header>).
+
+Returns a dict with the cl_LM10XSummaries file statistics, all counted in characters:
+  grossfilesize - the whole submission
+  netfilesize - clean text written after the header
+  non_text_doc_type_chars - non-text and uuencoded documents, plus <PDF> segments
+  html_chars - HTML tags, comments and <script>/<style> contents removed from text documents
+  xbrl_chars - <XBRL> segments and inline <ix:header> contents
+  xml_chars - <XML> segments
+  n_exhibits - documents whose type starts with EX-
+SGML structure lines (<DOCUMENT>, <TYPE>, <TEXT>, ...) are not counted in any of the categories.
+"""
+
+import codecs
+import datetime as dt
+import glob
+import html
+import os
+import re
+import shutil
+import sys
+
+
+CHUNK_SIZE = 1024 * 1024
+# A tag or entity still open after MAX_CARRY characters is treated as text
+MAX_CARRY = 64 * 1024
+NON_TEXT_TYPES = ('GRAPHIC', 'ZIP', 'EXCEL', 'PDF', 'JSON')
+FILESTATS = (('GrossFileSize', 'grossfilesize'), ('NetFileSize', 'netfilesize'),
+             ('NonText_DocumentType_Chars', 'non_text_doc_type_chars'), ('HTML_Chars', 'html_chars'),
+             ('XBRL_Chars', 'xbrl_chars'), ('XML_Chars', 'xml_chars'), ('N_Exhibits', 'n_exhibits'))
+
+SGML_LINE = re.compile(r'<(/?)(SEC-DOCUMENT|SEC-HEADER|IMS-HEADER|DOCUMENT|TYPE|SEQUENCE|FILENAME|DESCRIPTION|'
+                       r'TEXT|XBRL|XML|PDF)>(.*)', re.S)
+MARKUP = re.compile(r'<!--.*?-->|<![^>]*>|<\?[^>]*>|</?([A-Za-z][\w:.\-]*)[^>]*>', re.S)
+BLOCK_TAGS = {'p', 'div', 'br', 'tr', 'li', 'table', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+CELL_TAGS = {'td', 'th'}
+# Tags whose contents are dropped, and the tally the dropped characters go to
+SKIP_TAGS = {'script': 'html_chars', 'style': 'html_chars', 'ix:header': 'xbrl_chars'}
+SKIP_END = {name: re.compile(rf'</{re.escape(name)}\s*>', re.I) for name in SKIP_TAGS}
+UUENCODE_BEGIN = re.compile(r'begin [0-7]{3} ')
+HTML_HINT = re.compile(r'<(html|body|div|p|table)\b', re.I)
+PARTIAL_ENTITY = re.compile(r'&#?\w{0,10}$')
+BLANK_LINES = re.compile(r'\n[ \t]*\n(?:[ \t]*\n)+')
+
+
+class HTMLStripper:
+    # Incremental tag stripper: feed() pieces of one document, then close()
+    def __init__(self, stats):
+        self.stats = stats
+        self.carry = ''
+        self.skip = None  # name of the tag whose contents are being dropped
+
+    def feed(self, piece):
+        text = self.carry + piece
+        self.carry = ''
+        out = []
+        pos = 0
+        while pos < len(text):
+            if self.skip:
+                m = SKIP_END[self.skip].search(text, pos)
+                end = m.end() if m else self._safe_end(text, pos)
+                self.stats[SKIP_TAGS[self.skip]] += end - pos
+                pos = end
+                if not m:
+                    break
+                self.skip = None
+                continue
+            lt = text.find('<', pos)
+            if lt < 0:
+                out.append(self._text(text[pos:], final=False))
+                break
+            out.append(self._text(text[pos:lt], final=True))
+            m = MARKUP.match(text, lt)
+            if m is None:
+                if '>' not in text[lt:] and len(text) - lt < MAX_CARRY:
+                    self.carry = text[lt:]  # tag continues in the next piece
+                    break
+                out.append(self._text('<', final=True))  # a stray '<' in the text
+                pos = lt + 1
+                continue
+            if text.startswith('<!--', lt) and not m.group(0).endswith('-->'):
+                end = text.find('-->', lt)
+                if end < 0:
+                    if len(text) - lt < MAX_CARRY:
+                        self.carry = text[lt:]
+                        break
+                    end = len(text) - 3
+                m_end = end + 3
+            else:
+                m_end = m.end()
+            self.stats['html_chars'] += m_end - lt
+            name = (m.group(1) or '').lower()
+            if name in SKIP_TAGS and not text[lt + 1] == '/' and not text[m_end - 2] == '/':
+                self.stats['html_chars'] -= m_end - lt
+                self.stats[SKIP_TAGS[name]] += m_end - lt
+                self.skip = name
+            elif name in BLOCK_TAGS:
+                out.append('\n')
+            elif name in CELL_TAGS:
+                out.append(' ')
+            pos = m_end
+        return ''.join(out)
+
+    def close(self):
+        text, self.carry = self.carry, ''
+        if self.skip:
+            self.stats[SKIP_TAGS[self.skip]] += len(text)
+            return ''
+        return html.unescape(text)
+
+    def _text(self, text, final):
+        # Decode entities; keep a trailing partial entity for the next piece
+        if not final:
+            m = PARTIAL_ENTITY.search(text)
+            if m:
+                self.carry = text[m.start():]
+                text = text[:m.start()]
+        return html.unescape(text) if '&' in text else text
+
+    def _safe_end(self, text, pos):
+        # While skipping, keep a short tail in case the closing tag is split across pieces
+        end = max(pos, len(text) - 32)
+        self.carry = text[end:]
+        return end
+
+
+def scrub_submission(in_file, out_file, chunk_size=CHUNK_SIZE):
+    stats = {field: 0 for _, field in FILESTATS}
+    sec_header = []
+    part_file = out_file + '.part'
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    with open(in_file, 'rb') as f_in, open(part_file, 'w', encoding='utf-8', newline='\n') as f_body:
+        section = None  # None, 'header', 'meta', 'text', 'xbrl', 'xml' or 'pdf'
+        doc = None
+        at_line_start = True
+        while True:
+            raw = f_in.readline(chunk_size)
+            piece = decoder.decode(raw, final=not raw)
+            if not raw and not piece:
+                break
+            line_start = at_line_start
+            while line_start and not piece.endswith('\n') and len(piece) < 256:
+                raw = f_in.readline(256)  # complete a short line (SGML tag, uuencode start) cut by chunk_size
+                if not raw:
+                    break
+                piece += decoder.decode(raw)
+            stats['grossfilesize'] += len(piece)
+            at_line_start = piece.endswith('\n')
+            tag = SGML_LINE.match(piece) if line_start and piece.startswith('<') else None
+
+            if tag:
+                closing, name, value = tag.group(1), tag.group(2), tag.group(3).strip()
+                if name in ('SEC-HEADER', 'IMS-HEADER'):
+                    section = None if closing else 'header'
+                    if not closing and value:
+                        sec_header.append(value + '\n')  # e.g. '0001234567-24-000001.hdr.sgml : 20240101'
+                elif name == 'DOCUMENT':
+                    if closing and doc:
+                        _close_document(doc, f_body, stats)
+                        doc = None
+                    elif not closing:
+                        doc = {'type': '', 'filename': '', 'chars': 0, 'non_text': False, 'opened': False,
+                               'stripper': None, 'tail': ''}
+                    section = None if closing else 'meta'
+                elif doc is None:
+                    pass
+                elif name == 'TYPE' and not closing:
+                    doc['type'] = value
+                    doc['non_text'] = value.upper() in NON_TEXT_TYPES
+                    if value.upper().startswith('EX-'):
+                        stats['n_exhibits'] += 1
+                elif name == 'FILENAME' and not closing:
+                    doc['filename'] = value
+                elif name == 'TEXT':
+                    section = 'meta' if closing else 'text'
+                    if not closing:
+                        doc['first_line'] = True
+                elif name in ('XBRL', 'XML', 'PDF'):
+                    if closing:
+                        section = 'text'
+                    elif name == 'XBRL' and doc['filename'].lower().endswith(('.htm', '.html')):
+                        section = 'text'  # inline XBRL: an HTML document with ix: tags
+                    else:
+                        section = name.lower()
+                continue
+
+            if doc is not None:
+                doc['chars'] += len(piece)
+                if doc['non_text']:
+                    continue  # counted as a whole when the document closes
+            if section == 'header':
+                sec_header.append(piece)
+            elif section in ('xbrl', 'xml'):
+                stats[f'{section}_chars'] += len(piece)
+            elif section == 'pdf':
+                stats['non_text_doc_type_chars'] += len(piece)
+            elif section == 'text':
+                if doc['first_line'] and piece.strip():
+                    doc['first_line'] = False
+                    if line_start and UUENCODE_BEGIN.match(piece):
+                        doc['non_text'] = True  # uuencoded binary
+                        continue
+                    if doc['filename'].lower().endswith(('.htm', '.html', '.xml')) or \
+                            HTML_HINT.search(piece, 0, 4096):
+                        doc['stripper'] = HTMLStripper(stats)
+                text = doc['stripper'].feed(piece) if doc['stripper'] else piece
+                _write_text(doc, text, f_body, stats)
+
+        if doc:
+            _close_document(doc, f_body, stats)
+
+    _write_output(in_file, out_file, part_file, sec_header, stats)
+    return stats
+
+
+def _write_text(doc, text, f_body, stats, final=False):
+    # Trailing whitespace is held back so blank lines collapse the same way across piece boundaries
+    text = doc['tail'] + text.replace('\xa0', ' ')
+    if not final:
+        body = text.rstrip()
+        text, doc['tail'] = body, text[len(body):]
+    if not doc['opened']:
+        text = text.lstrip()
+        if not text:
+            return
+        doc['opened'] = True
+        text = f'<{doc["type"]}>\n' + text
+    text = BLANK_LINES.sub('\n\n', text)
+    f_body.write(text)
+    stats['netfilesize'] += len(text)
+
+
+def _close_document(doc, f_body, stats):
+    if doc['non_text']:
+        stats['non_text_doc_type_chars'] += doc['chars']
+        return
+    text = doc['stripper'].close() if doc['stripper'] else ''
+    _write_text(doc, text.rstrip(), f_body, stats)
+    if doc['opened']:
+        text = f'\n</{doc["type"]}>\n\n'
+        f_body.write(text)
+        stats['netfilesize'] += len(text)
+
+
+def _write_output(in_file, out_file, part_file, sec_header, stats):
+    # Header first (the tallies are only known at the end), then the streamed body
+    with open(out_file, 'w', encoding='utf-8', newline='\n') as f_out:
+        f_out.write('<Header>\n<FileStats>\n')
+        f_out.write(f'    <FileName>{os.path.basename(in_file)}</FileName>\n')
+        for tag, field in FILESTATS:
+            f_out.write(f'    <{tag}>{stats[field]}</{tag}>\n')
+        f_out.write('</FileStats>\n<SEC-Header>\n')
+        f_out.write(''.join(sec_header))
+        f_out.write('</SEC-Header>\n</Header>\n\n')
+        with open(part_file, encoding='utf-8', newline='\n') as f_body:
+            shutil.copyfileobj(f_body, f_out, CHUNK_SIZE)
+    os.remove(part_file)
+
+
+if __name__ == '__main__':
+    start = dt.datetime.now()
+    print(f'\n\n{start.strftime("%c")}\nPROGRAM NAME: {sys.argv[0]}\n')
+    IN_DIR = r'D:\Temp\EDGAR_raw'
+    OUT_DIR = r'D:\Temp\EDGAR_scrubbed'
+    os.makedirs(OUT_DIR, exist_ok=True)
+    for file in sorted(glob.glob(os.path.join(IN_DIR, '*.txt'))):
+        file_stats = scrub_submission(file, os.path.join(OUT_DIR, os.path.basename(file)))
+        print(f'{os.path.basename(file)}: {file_stats["grossfilesize"]:,} -> {file_stats["netfilesize"]:,} chars'
+              f' | {file_stats["n_exhibits"]} exhibits')
+    print(f'\n\nRuntime: {(dt.datetime.now()-start)}')
+    print(f'\nNormal termination.\n{dt.datetime.now().strftime("%c")}\n')
@@ -0,0 +1,122 @@
+"""
+Compiled scoring engine for the LM master dictionary.
+
+The master dictionary is compiled once into integer word ids.  Each id indexes NumPy arrays
+holding a packed category bitmask (bit k set => word is in CATEGORIES[k]), the syllable count
+and the word length.  A document is then reduced to the ids and counts of its unique matching
+tokens, and all categories are counted with one vectorized reduction instead of per-token
+attribute lookups.
+
+LMScoringEngine(master_dictionary):
+    Arguments:
+      master_dictionary - the LM master dictionary preloaded in the calling routine.
+
+    score(doc) -> list
+      Returns the 16 element row produced by Generic_Parser.get_data for an upper-cased doc
+      (elements 0 and 1, file name and file size, are left for the caller).
+
+    score_documents(docs) -> list of lists
+      Same as score() for a list of documents, with one reduction across the whole batch.
+"""
+
+import collections
+import re
+import string
+import numpy as np
+
+
+# Bit order of the packed category mask.  The first seven are the Generic_Parser output columns.
+CATEGORIES = ('negative', 'positive', 'uncertainty', 'litigious', 'strong_modal', 'weak_modal',
+              'constraining', 'complexity')
+N_OUTPUT_CATEGORIES = 7
+
+_TOKEN_RE = re.compile(r'\w+')  # Note that \w+ splits hyphenated words
+_NUMBER_PUNCT_RE = re.compile(r'(?!=[0-9])(\.|,)(?=[0-9])')
+_NUMBER_RE = re.compile(r'\b[-+\(]?[$€£]?[-+(]?\d+\)?\b')
+_PUNCT_TABLE = str.maketrans(string.punctuation, ' ' * len(string.punctuation))
+_BIT_SHIFTS = np.arange(len(CATEGORIES), dtype=np.uint8)
+
+
+class LMScoringEngine:
+    def __init__(self, master_dictionary):
+        # Tokens that are all digits or a single character are never counted, so they get no id
+        words = [word for word in master_dictionary if not word.isdigit() and len(word) > 1]
+        n = len(words)
+        self.words = words
+        self.word_ids = {word: i for i, word in enumerate(words)}
+        self.category_mask = np.zeros(n, dtype=np.uint8)
+        self.syllables = np.zeros(n, dtype=np.int64)
+        self.word_length = np.fromiter((len(word) for word in words), dtype=np.int64, count=n)
+        for i, word in enumerate(words):
+            entry = master_dictionary[word]
+            bits = 0
+            for bit, category in enumerate(CATEGORIES):
+                if getattr(entry, category):
+                    bits |= 1 << bit
+            self.category_mask[i] = bits
+            self.syllables[i] = entry.syllables
+
+    def match(self, doc):
+        # Return (ids, counts) for the unique dictionary words in doc
+        word_ids = self.word_ids
+        ids = []
+        counts = []
+        for token, count in collections.Counter(_TOKEN_RE.findall(doc)).items():
+            word_id = word_ids.get(token)
+            if word_id is not None:
+                ids.append(word_id)
+                counts.append(count)
+        return np.array(ids, dtype=np.int64), np.array(counts, dtype=np.int64)
+
+    def score(self, doc):
+        return self.score_documents([doc])[0]
+
+    def score_documents(self, docs):
+        n_docs = len(docs)
+        matches = [self.match(doc) for doc in docs]
+        ids = np.concatenate([m[0] for m in matches]) if matches else np.zeros(0, dtype=np.int64)
+        counts = np.concatenate([m[1] for m in matches]) if matches else np.zeros(0, dtype=np.int64)
+        bounds = np.zeros(n_docs + 1, dtype=np.int64)
+        np.cumsum([len(m[0]) for m in matches], out=bounds[1:])
+
+        # Columns: words, letters, syllables, vocabulary, then one per category
+        bits = (self.category_mask[ids][:, None] >> _BIT_SHIFTS) & 1
+        columns = np.empty((len(ids), 4 + len(CATEGORIES)), dtype=np.int64)
+        columns[:, 0] = counts
+        columns[:, 1] = counts * self.word_length[ids]
+        columns[:, 2] = counts * self.syllables[ids]
+        columns[:, 3] = 1
+        columns[:, 4:] = bits * counts[:, None]
+        running = np.zeros((len(ids) + 1, columns.shape[1]), dtype=np.int64)
+        np.cumsum(columns, axis=0, out=running[1:])
+        totals = running[bounds[1:]] - running[bounds[:-1]]
+
+        rows = []
+        for doc, total in zip(docs, totals):
+            n_words = int(total[0])
+            _odata = [0] * 16
+            _odata[2] = n_words
+            if n_words:
+                for i in range(N_OUTPUT_CATEGORIES):
+                    _odata[3 + i] = (int(total[4 + i]) / n_words) * 100
+                _odata[13] = int(total[2]) / n_words
+                _odata[14] = int(total[1]) / n_words
+            _odata[10], _odata[11] = character_counts(doc)
+            _odata[12] = number_count(doc)
+            _odata[15] = int(total[3])
+            rows.append(_odata)
+
+        return rows
+
+
+def character_counts(doc):
+    # Count [A-Z] and [0-9] with a single byte histogram (both classes are ASCII only)
+    codes = np.frombuffer(doc.encode('ascii', errors='ignore'), dtype=np.uint8)
+    histogram = np.bincount(codes, minlength=128)
+    return int(histogram[65:91].sum()), int(histogram[48:58].sum())
+
+
+def number_count(doc):
+    # drop punctuation within numbers for number count
+    doc = _NUMBER_PUNCT_RE.sub('', doc).translate(_PUNCT_TABLE)
+    return sum(1 for _ in _NUMBER_RE.finditer(doc))
@@ -2,15 +2,27 @@
 Routine to load master dicitonary
 Version for LM 2021 Temporary Master Dictionary
 
+Warm loads read a columnar snapshot of the parsed CSV from SNAPSHOT_DIR.  The snapshot is keyed
+by the CSV's path, size and modification time (and SNAPSHOT_VERSION), so editing or replacing
+the CSV rebuilds it automatically.  Pass use_snapshot=False to always parse the CSV.
+
 Bill McDonald
 Date: 201510 Updated: 202201 / 202308 / 202402
 """
 
 import datetime as dt
+import hashlib
+import os
+import pickle
 import sys
 
+# Bump when the snapshot layout or MasterDictionary fields change
+SNAPSHOT_VERSION = 1
+# Directory holding master dictionary snapshots
+SNAPSHOT_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'LM_MasterDictionary')
+
 
-def load_masterdictionary(file_path, print_flag=False, f_log=None, get_other=False):
+def load_masterdictionary(file_path, print_flag=False, f_log=None, get_other=False, use_snapshot=True):
     start_local = dt.datetime.now()
     # Setup dictionaries
     _master_dictionary = {}
@@ -36,21 +48,32 @@ def load_masterdictionary(file_path, print_flag=False, f_log=None, get_other=Fal
                   'NO', 'NOR', 'NOT', 'ONLY', 'OWN', 'SAME', 'SO', 'THAN', 'TOO', 'VERY', 'CAN',
                   'JUST', 'SHOULD', 'NOW', 'AMONG']
 
-    # Loop thru words and load dictionaries
-    with open(file_path) as f:
-        _total_documents = 0
-        _md_header = f.readline()  # Consume header line
+    _stopword_set = frozenset(_stopwords)
 
-        for line in f:
-            cols = line.rstrip('\n').split(',')
-            word = cols[0]
-            _master_dictionary[word] = MasterDictionary(cols, _stopwords)
-            for sentiment in _sentiment_categories:
-                if getattr(_master_dictionary[word], sentiment):
-                    _sentiment_dictionaries[sentiment][word] = 0
-            _total_documents += _master_dictionary[cols[0]].doc_count
-            if len(_master_dictionary) % 5000 == 0 and print_flag:
-                print(f'\r ...Loading Master Dictionary {len(_master_dictionary):,}', end='', flush=True)
+    snapshot = _read_snapshot(file_path) if use_snapshot else None
+    if snapshot:
+        _md_header, words, columns = snapshot
+        for word, values in zip(words, zip(*columns)):
+            _master_dictionary[word] = MasterDictionary.from_values(values, _stopword_set)
+    else:
+        # Loop thru words and load dictionaries
+        with open(file_path) as f:
+            _md_header = f.readline()  # Consume header line
+
+            for line in f:
+                cols = line.rstrip('\n').split(',')
+                _master_dictionary[cols[0]] = MasterDictionary(cols, _stopword_set)
+                if len(_master_dictionary) % 5000 == 0 and print_flag:
+                    print(f'\r ...Loading Master Dictionary {len(_master_dictionary):,}', end='', flush=True)
+        if use_snapshot:
+            _write_snapshot(file_path, _md_header, _master_dictionary)
+
+    _total_documents = 0
+    for word, entry in _master_dictionary.items():
+        for sentiment in _sentiment_categories:
+            if getattr(entry, sentiment):
+                _sentiment_dictionaries[sentiment][word] = 0
+        _total_documents += entry.doc_count
 
     if print_flag:
         print('\r', end='')  # clear line
@@ -81,6 +104,12 @@ def load_masterdictionary(file_path, print_flag=False, f_log=None, get_other=Fal
 
 
 class MasterDictionary:
+    # Column order of the CSV file (stopword is derived, not read)
+    FIELDS = ('word', 'sequence_number', 'word_count', 'word_proportion', 'average_proportion',
+              'std_dev_prop', 'doc_count', 'negative', 'positive', 'uncertainty', 'litigious',
+              'strong_modal', 'weak_modal', 'constraining', 'complexity', 'syllables', 'source')
+    __slots__ = FIELDS + ('stopword',)
+
     def __init__(self, cols, _stopwords):
         for ptr, col in enumerate(cols):
             if col == '':
@@ -103,16 +132,78 @@ class MasterDictionary:
             self.complexity = int(cols[14])
             self.syllables = int(cols[15])
             self.source = cols[16]
-            if self.word in _stopwords:
-                self.stopword = True
-            else:
-                self.stopword = False
+            self.stopword = self.word in _stopwords
         except:
             print('ERROR in class MasterDictionary')
             print(f'word = {cols[0]} : seqnum = {cols[1]}')
             quit()
         return
 
+    @classmethod
+    def from_values(cls, values, _stopwords):
+        # Build an entry from already converted values (in FIELDS order) without reparsing
+        (word, sequence_number, word_count, word_proportion, average_proportion, std_dev_prop, doc_count,
+         negative, positive, uncertainty, litigious, strong_modal, weak_modal, constraining, complexity,
+         syllables, source) = values
+        self = cls.__new__(cls)
+        self.word = word
+        self.sequence_number = sequence_number
+        self.word_count = word_count
+        self.word_proportion = word_proportion
+        self.average_proportion = average_proportion
+        self.std_dev_prop = std_dev_prop
+        self.doc_count = doc_count
+        self.negative = negative
+        self.positive = positive
+        self.uncertainty = uncertainty
+        self.litigious = litigious
+        self.strong_modal = strong_modal
+        self.weak_modal = weak_modal
+        self.constraining = constraining
+        self.complexity = complexity
+        self.syllables = syllables
+        self.source = source
+        self.stopword = word in _stopwords
+        return self
+
+
+def _snapshot_key(file_path):
+    stat = os.stat(file_path)
+    return SNAPSHOT_VERSION, os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns
+
+
+def _snapshot_path(file_path):
+    path_hash = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(SNAPSHOT_DIR, f'{os.path.basename(file_path)}.{path_hash}.snapshot')
+
+
+def _read_snapshot(file_path):
+    # Return (header, words, columns) if a current snapshot exists, otherwise None
+    try:
+        with open(_snapshot_path(file_path), 'rb') as f:
+            key, header, words, columns = pickle.load(f)
+        if key == _snapshot_key(file_path):
+            return header, words, columns
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+        pass
+    return None
+
+
+def _write_snapshot(file_path, header, master_dictionary):
+    # Store the dictionary column by column; the snapshot is a cache, so failures are not fatal
+    columns = tuple([getattr(entry, field) for entry in master_dictionary.values()]
+                    for field in MasterDictionary.FIELDS)
+    snapshot_path = _snapshot_path(file_path)
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        tmp_path = f'{snapshot_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((_snapshot_key(file_path), header, list(master_dictionary), columns), f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, snapshot_path)
+    except OSError as e:
+        print(f'Master dictionary snapshot not written: {e}')
+
 
 
 if __name__ == '__main__':
@@ -0,0 +1,204 @@
+"""
+Local columnar store of EDGAR master indexes, 1993 onward, with incremental quarterly refresh.
+
+  store = MasterIndexStore(r'D:\EDGAR\MasterIndex')
+  store.refresh()  # fetch only quarters that are new or changed on EDGAR
+  filings = store.query(forms=MOD_EDGAR_Forms.f_10X, ciks=[320193], bgn_date=20200101)
+
+Each quarter is saved as one compressed .npz file with typed columns:
+  cik (int64), date (int32, YYYYMMDD), form_code (int16, index into form_types),
+  form_types (the quarter's distinct form strings), name and path (utf-8 bytes).
+manifest.json records the Last-Modified / Content-Length EDGAR reported for each quarter's
+master.zip, so refresh() only downloads a quarter when those change.  Queries open only the
+quarters that overlap the date range and only the columns they need.
+"""
+
+import datetime as dt
+import json
+import os
+import sys
+import tempfile
+import zipfile
+import numpy as np
+import MOD_EDGAR_Downloader as ed
+
+
+STORE_VERSION = 1
+PARM_EDGARPREFIX = 'https://www.sec.gov/Archives/edgar/full-index/'
+QUERY_COLUMNS = ('cik', 'date', 'form', 'name', 'path')
+
+
+class MasterIndexStore:
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        os.makedirs(store_dir, exist_ok=True)
+        self.manifest_file = os.path.join(store_dir, 'manifest.json')
+        self.manifest = {'version': STORE_VERSION, 'quarters': {}}
+        if os.path.exists(self.manifest_file):
+            with open(self.manifest_file) as f:
+                manifest = json.load(f)
+            if manifest.get('version') == STORE_VERSION:
+                self.manifest = manifest
+
+    def quarters(self):
+        return sorted(self.manifest['quarters'])
+
+    def refresh(self, bgn_year=1993, end_year=None, downloader=None, check_existing=True, print_flag=True):
+        # Download master.zip for quarters that are missing or changed; returns the refreshed quarters
+        today = dt.date.today()
+        end_year = end_year or today.year
+        own_downloader = downloader is None
+        downloader = downloader or ed.EDGARDownloader(max_workers=1)
+        refreshed = []
+        try:
+            for year in range(bgn_year, end_year + 1):
+                for qtr in range(1, 5):
+                    if (year, qtr) > (today.year, (today.month - 1) // 3 + 1):
+                        break
+                    key = _quarter_key(year, qtr)
+                    if key in self.manifest['quarters'] and not check_existing:
+                        continue
+                    url = f'{PARM_EDGARPREFIX}{year}/QTR{qtr}/master.zip'
+                    stamp = downloader.head(url)
+                    if stamp is None or self.manifest['quarters'].get(key, {}).get('stamp') == stamp:
+                        continue
+                    n = self._fetch_quarter(downloader, url, key)
+                    if n is None:
+                        continue
+                    self.manifest['quarters'][key] = {'stamp': stamp, 'n': n}
+                    self._write_manifest()
+                    refreshed.append(key)
+                    if print_flag:
+                        print(f'  {key}: {n:,} filings stored')
+        finally:
+            if own_downloader:
+                downloader.close()
+        return refreshed
+
+    def _fetch_quarter(self, downloader, url, key):
+        fd, tmp_name = tempfile.mkstemp(suffix='.zip', dir=self.store_dir)
+        os.close(fd)
+        try:
+            if not downloader.download(url, tmp_name):
+                return None
+            with zipfile.ZipFile(tmp_name) as zf:
+                text = zf.read('master.idx').decode('latin-1')
+        finally:
+            if os.path.exists(tmp_name):
+                os.remove(tmp_name)
+        columns = parse_masterindex(text)
+        quarter_file = self._quarter_file(key)
+        with open(quarter_file + '.tmp', 'wb') as f:
+            np.savez_compressed(f, **columns)
+        os.replace(quarter_file + '.tmp', quarter_file)
+        return len(columns['cik'])
+
+    def add_quarter(self, year, qtr, text, stamp=None):
+        # Store an already downloaded master.idx (text) for year/qtr
+        key = _quarter_key(year, qtr)
+        columns = parse_masterindex(text)
+        with open(self._quarter_file(key), 'wb') as f:
+            np.savez_compressed(f, **columns)
+        self.manifest['quarters'][key] = {'stamp': stamp, 'n': len(columns['cik'])}
+        self._write_manifest()
+
+    def query(self, forms=None, ciks=None, bgn_date=None, end_date=None,
+              columns=('cik', 'date', 'form', 'path')):
+        # Return a dict of column arrays for filings matching every filter (dates are inclusive YYYYMMDD)
+        unknown = set(columns) - set(QUERY_COLUMNS)
+        if unknown:
+            raise ValueError(f'Unknown master index columns: {sorted(unknown)}')
+        ciks = None if ciks is None else np.asarray(list(ciks), dtype=np.int64)
+        forms = None if forms is None else list(forms)
+        pieces = {column: [] for column in columns}
+        for key in self.quarters():
+            q_bgn, q_end = _quarter_dates(key)
+            if (bgn_date and q_end < bgn_date) or (end_date and q_bgn > end_date):
+                continue
+            with np.load(self._quarter_file(key)) as npz:
+                keep = np.ones(self.manifest['quarters'][key]['n'], dtype=bool)
+                if forms is not None:
+                    codes = np.flatnonzero(np.isin(npz['form_types'].astype(str), forms))
+                    keep &= np.isin(npz['form_code'], codes)
+                if ciks is not None:
+                    keep &= np.isin(npz['cik'], ciks)
+                if bgn_date or end_date:
+                    date = npz['date']
+                    if bgn_date:
+                        keep &= date >= bgn_date
+                    if end_date:
+                        keep &= date <= end_date
+                for column in columns:
+                    if column == 'form':
+                        pieces[column].append(npz['form_types'].astype(str)[npz['form_code'][keep]])
+                    elif column in ('name', 'path'):
+                        pieces[column].append(np.char.decode(npz[column][keep], 'utf-8'))
+                    else:
+                        pieces[column].append(npz[column][keep])
+        result = dict()
+        for column in columns:
+            if pieces[column]:
+                result[column] = np.concatenate(pieces[column])
+            else:
+                result[column] = np.zeros(0, dtype=str if column in ('form', 'name', 'path') else np.int64)
+        return result
+
+    def _quarter_file(self, key):
+        return os.path.join(self.store_dir, f'{key}.npz')
+
+    def _write_manifest(self):
+        with open(self.manifest_file + '.tmp', 'w') as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(self.manifest_file + '.tmp', self.manifest_file)
+
+
+def parse_masterindex(text):
+    # Parse master.idx text (header included) into typed columns
+    lines = text.splitlines()
+    start = 0
+    for i, line in enumerate(lines):
+        if line.startswith('-----'):
+            start = i + 1
+            break
+    cik = []
+    date = []
+    form = []
+    name = []
+    path = []
+    for line in lines[start:]:
+        parts = line.split('|')
+        if len(parts) == 5:
+            cik.append(int(parts[0]))
+            date.append(int(parts[3].replace('-', '')))
+            form.append(parts[2])
+            name.append(parts[1].encode('utf-8'))
+            path.append(parts[4].encode('utf-8'))
+    form_types, form_code = np.unique(np.array(form, dtype=str), return_inverse=True)
+    return {'cik': np.array(cik, dtype=np.int64),
+            'date': np.array(date, dtype=np.int32),
+            'form_code': form_code.astype(np.int16),
+            'form_types': form_types,
+            'name': np.array(name, dtype=bytes),
+            'path': np.array(path, dtype=bytes)}
+
+
+def _quarter_key(year, qtr):
+    return f'{year}QTR{qtr}'
+
+
+def _quarter_dates(key):
+    year, qtr = int(key[:4]), int(key[-1])
+    return year * 10000 + (3 * qtr - 2) * 100 + 1, year * 10000 + (3 * qtr) * 100 + 31
+
+
+if __name__ == '__main__':
+    import MOD_EDGAR_Forms
+    start = dt.datetime.now()
+    print(f'\n\n{start.strftime("%c")}\nPROGRAM NAME: {sys.argv[0]}\n')
+    store = MasterIndexStore(r'D:\Temp\EDGAR_MasterIndex')
+    store.refresh()
+    filings = store.query(forms=MOD_EDGAR_Forms.f_10K, bgn_date=20240101, end_date=20241231)
+    print(f'{len(store.quarters())} quarters stored | {len(filings["cik"]):,} 10-K filings in 2024')
+    print(f'\n\nRuntime: {(dt.datetime.now()-start)}')
+    print(f'\nNormal termination.\n{dt.datetime.now().strftime("%c")}\n')
@@ -0,0 +1,14 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+# @Filename: __init__
+# @Date: 2026/10/17
+# @Author: Mark Wang
+# @Email: wangyouan@xmu.edu.cn
+
+"""
+Reusable helpers factored out of the lecture notebooks.
+
+Modules are imported individually (e.g. ``from aifin import sections``) so that heavy optional
+dependencies such as torch or tensorflow are only needed by the modules that use them.
+"""
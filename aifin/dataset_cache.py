@@ -0,0 +1,383 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+# @Filename: dataset_cache
+# @Date: 2026/10/17
+# @Author: Mark Wang
+# @Email: wangyouan@xmu.edu.cn
+
+"""
+Memory-mapped columnar cache for the .dta / .pkl / .csv research datasets.
+
+The notebooks call ``pd.read_stata`` / ``pd.read_pickle`` on the full file in every session and
+filter afterwards.  ``load`` converts a source file once into a cache directory with one ``.npy``
+file per column (opened with ``mmap_mode='r'``) plus ``meta.json``, and rebuilds it only when the
+source's size or mtime changes.  Reads then touch only what they need:
+
+* column projection: only the requested columns are mapped,
+* row ranges: ``rows=(start, stop)`` slices the mapped arrays,
+* predicate pushdown: ``filters=[("year", "between", (1970, 2013)), ("CountryCode3", "in", [...])]``
+  is evaluated on the filter columns first, chunks whose stored min/max cannot match are skipped,
+  and the remaining columns are gathered for the matching rows only.
+
+String / categorical columns are stored as integer codes with their categories in ``meta.json``
+(so ``in`` / ``==`` filters compare codes), pandas nullable columns (Int64, Float64, boolean) as
+values + mask, and anything else that numpy cannot map falls back to a pickle per column.
+
+Typical use::
+
+    from aifin import dataset_cache
+    emission = dataset_cache.load("data/l3/GW_GHGEMISSIONY.dta",
+                                  columns=["SgnYear", "CountryCode3", "GHGEmission"],
+                                  filters=[("SgnYear", "between", (1970, 2013)),
+                                           ("CountryCode3", "in", ["USA", "CHN", "JPN", "GBR"])])
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "aifin", "colcache")
+CACHE_VERSION = 1
+CHUNK_ROWS = 1 << 16  # rows per zone-map chunk (min/max kept per chunk)
+INDEX_COLUMN = "__index__"
+OPERATORS = ("==", "!=", "<", "<=", ">", ">=", "in", "not in", "between")
+
+
+def read_source(source, **kwargs) -> pd.DataFrame:
+    """Read a source file with the pandas reader matching its extension."""
+    ext = os.path.splitext(source)[1].lower()
+    if ext == ".dta":
+        return pd.read_stata(source, **kwargs)
+    elif ext in (".pkl", ".pickle"):
+        return pd.read_pickle(source, **kwargs)
+    elif ext == ".csv":
+        return pd.read_csv(source, **kwargs)
+    elif ext == ".parquet":
+        return pd.read_parquet(source, **kwargs)
+    raise ValueError(f"no reader for {source}; pass reader=...")
+
+
+def cache_path(source, cache_dir=None) -> str:
+    """Cache directory of ``source``: ``<cache_dir>/<file name>.<hash of the absolute path>``."""
+    digest = hashlib.sha1(os.path.abspath(source).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir or CACHE_DIR, f"{os.path.basename(source)}.{digest}")
+
+
+def _source_state(source) -> dict:
+    st = os.stat(source)
+    return {"source": os.path.abspath(source), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _dtype_meta(dtype) -> dict:
+    if isinstance(dtype, pd.StringDtype):
+        return {"dtype": "string", "storage": dtype.storage,
+                "na_nan": bool(dtype.na_value is not pd.NA)}
+    return {"dtype": str(dtype)}
+
+
+def _restore_dtype(meta):
+    if meta["dtype"] == "string":
+        if meta.get("na_nan"):
+            return pd.StringDtype(storage=meta["storage"], na_value=np.nan)
+        return pd.StringDtype(storage=meta["storage"])
+    return pd.api.types.pandas_dtype(meta["dtype"])
+
+
+def _zone_map(values: np.ndarray, mask=None):
+    """Per-chunk (min, max) of a numeric / datetime array, or None when not applicable."""
+    if values.dtype.kind not in "iufM" or not len(values):
+        return None
+    mins, maxs = [], []
+    for bgn in range(0, len(values), CHUNK_ROWS):
+        chunk = values[bgn:bgn + CHUNK_ROWS]
+        if mask is not None:
+            chunk = chunk[~mask[bgn:bgn + CHUNK_ROWS]]
+        if chunk.dtype.kind in "fM":
+            chunk = chunk[~np.isnan(chunk)]
+        if not len(chunk):
+            mins.append(None)
+            maxs.append(None)
+            continue
+        lo, hi = chunk.min(), chunk.max()
+        if values.dtype.kind == "M":  # store datetimes as integers of their unit
+            lo, hi = lo.astype(np.int64), hi.astype(np.int64)
+        mins.append(lo.item())
+        maxs.append(hi.item())
+    return {"min": mins, "max": maxs}
+
+
+def _plain(values: np.ndarray) -> np.ndarray:
+    """View without dtype metadata (set on arrays from old pickles; ``np.save`` drops it with a warning)."""
+    return values.view(np.dtype(values.dtype.str)) if values.dtype.metadata is not None else values
+
+
+def _write_column(path: str, i: int, name, series: pd.Series) -> dict:
+    meta = {"name": name, **_dtype_meta(series.dtype)}
+    stem = os.path.join(path, f"c{i}")
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype) or isinstance(dtype, pd.StringDtype) or (
+            dtype == object and series.map(lambda v: isinstance(v, str) or v is None or v != v).all()):
+        cat = series.astype("category") if not isinstance(dtype, pd.CategoricalDtype) else series
+        codes = cat.cat.codes.to_numpy()
+        np.save(stem + ".npy", codes)
+        meta.update(kind="category", categories=[str(c) if not isinstance(c, (int, float)) else c
+                                                 for c in cat.cat.categories.tolist()],
+                    ordered=bool(cat.cat.ordered))
+    elif isinstance(dtype, pd.api.extensions.ExtensionDtype) and hasattr(series.array, "_data") \
+            and hasattr(series.array, "_mask"):
+        # pandas nullable (Int64, Float64, boolean): values + mask
+        values, mask = _plain(np.asarray(series.array._data)), np.asarray(series.array._mask)
+        np.save(stem + ".npy", values)
+        np.save(stem + ".mask.npy", mask)
+        meta.update(kind="masked", zone=_zone_map(values, mask))
+    elif isinstance(dtype, np.dtype) and dtype.kind in "biufcmM":
+        values = _plain(series.to_numpy())
+        np.save(stem + ".npy", values)
+        meta.update(kind="numpy", zone=_zone_map(values))
+    else:
+        with open(stem + ".pkl", "wb") as f:
+            pickle.dump(series.to_numpy(), f, protocol=pickle.HIGHEST_PROTOCOL)
+        meta.update(kind="pickle")
+    meta["stem"] = f"c{i}"
+    return meta
+
+
+def build_cache(source, cache_dir=None, reader=None, **reader_kwargs) -> str:
+    """Read ``source`` once and write its columnar cache; returns the cache directory."""
+    path = cache_path(source, cache_dir)
+    state = _source_state(source)
+    df = (reader or read_source)(source, **reader_kwargs)
+    if not isinstance(df, pd.DataFrame):
+        raise TypeError(f"{source} did not load as a DataFrame")
+
+    return write_frame(df, path, reader_kwargs=repr(sorted(reader_kwargs.items())), **state)
+
+
+def write_frame(df: pd.DataFrame, path: str, **extra_meta) -> str:
+    """
+    Write ``df`` as a columnar cache directory at ``path`` (replaced atomically).
+
+    ``extra_meta`` is stored in ``meta.json`` next to the layout; returns ``path``.
+    """
+    tmp = f"{path}.tmp{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    columns = [_write_column(tmp, i, name, df[name] if df.columns.is_unique else df.iloc[:, i])
+               for i, name in enumerate(df.columns)]
+    if isinstance(df.index, pd.RangeIndex):
+        index = {"kind": "range", "start": df.index.start, "step": df.index.step, "name": df.index.name}
+    else:
+        index = _write_column(tmp, "x", INDEX_COLUMN, df.index.to_series(index=None))
+        index["index_name"] = df.index.name
+    meta = {"version": CACHE_VERSION, "n_rows": len(df), "columns": columns, "index": index,
+            "columns_dtype": _dtype_meta(df.columns.dtype), **extra_meta}
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump(meta, f, default=str)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+    return path
+
+
+def read_meta(source, cache_dir=None):
+    """Metadata of the cache of ``source``, or None if it is missing."""
+    return frame_meta(cache_path(source, cache_dir))
+
+
+def frame_meta(path):
+    """Metadata of the cache directory ``path``, or None if it is missing."""
+    meta_file = os.path.join(path, "meta.json")
+    if not os.path.exists(meta_file):
+        return None
+    with open(meta_file) as f:
+        return json.load(f)
+
+
+def is_fresh(source, cache_dir=None, **reader_kwargs) -> bool:
+    """True when the cache exists and was built from the current version of ``source``."""
+    meta = read_meta(source, cache_dir)
+    if meta is None or meta.get("version") != CACHE_VERSION:
+        return False
+    state = _source_state(source)
+    return (meta["size"] == state["size"] and meta["mtime_ns"] == state["mtime_ns"]
+            and meta["reader_kwargs"] == repr(sorted(reader_kwargs.items())))
+
+
+def _open(path, meta):
+    stem = os.path.join(path, meta["stem"])
+    if meta["kind"] == "pickle":
+        with open(stem + ".pkl", "rb") as f:
+            return pickle.load(f), None
+    values = np.load(stem + ".npy", mmap_mode="r")
+    mask = np.load(stem + ".mask.npy", mmap_mode="r") if meta["kind"] == "masked" else None
+    return values, mask
+
+
+def _materialize(meta, values, mask, rows):
+    """Build the pandas array of a column from its stored values at ``rows`` (slice or int array)."""
+    values = np.asarray(values[rows])
+    dtype = _restore_dtype(meta)
+    if meta["kind"] == "category":
+        cat = pd.Categorical.from_codes(values, categories=meta["categories"], ordered=meta["ordered"])
+        return cat if isinstance(dtype, pd.CategoricalDtype) else pd.array(cat, dtype=dtype) \
+            if dtype != object else np.asarray(cat, dtype=object)
+    if meta["kind"] == "masked":
+        return dtype.construct_array_type()(values, np.asarray(mask[rows]))
+    return values
+
+
+def _encode_value(meta, value):
+    """Filter value in stored units (category code, datetime integer, ...)."""
+    if meta["kind"] == "category":
+        categories = meta["categories"]
+        lookup = {c: i for i, c in enumerate(categories)}
+        if isinstance(value, (list, tuple, set, np.ndarray, pd.Index, pd.Series)):
+            return [lookup.get(v, -2) for v in value]  # -2 never matches (-1 is missing)
+        return lookup.get(value, -2)
+    if meta["dtype"].startswith("datetime64"):
+        unit = np.datetime_data(np.dtype(meta["dtype"]))[0]
+        conv = lambda v: np.datetime64(pd.Timestamp(v), unit)
+        if isinstance(value, (list, tuple, set, np.ndarray, pd.Index, pd.Series)):
+            return [conv(v) for v in value]
+        return conv(value)
+    return value
+
+
+def _chunk_may_match(lo, hi, op, value) -> bool:
+    if lo is None:
+        return op in ("!=", "not in")
+    if op == "==":
+        return lo <= value <= hi
+    elif op == "<":
+        return lo < value
+    elif op == "<=":
+        return lo <= value
+    elif op == ">":
+        return hi > value
+    elif op == ">=":
+        return hi >= value
+    elif op == "between":
+        return hi >= value[0] and lo <= value[1]
+    elif op == "in":
+        return any(lo <= v <= hi for v in value)
+    return True
+
+
+def _evaluate(values, mask, op, value):
+    if op == "==":
+        hit = values == value
+    elif op == "!=":
+        hit = values != value
+    elif op == "<":
+        hit = values < value
+    elif op == "<=":
+        hit = values <= value
+    elif op == ">":
+        hit = values > value
+    elif op == ">=":
+        hit = values >= value
+    elif op == "between":  # inclusive on both ends
+        hit = (values >= value[0]) & (values <= value[1])
+    elif op == "in":
+        hit = np.isin(values, np.asarray(list(value), dtype=values.dtype))
+    elif op == "not in":
+        hit = ~np.isin(values, np.asarray(list(value), dtype=values.dtype))
+    else:
+        raise ValueError(f"unknown operator {op!r}; choose from {OPERATORS}")
+    if mask is not None:
+        hit &= ~mask
+    return hit
+
+
+def _zone_value(col, value):
+    """Datetime filter values compared with zone maps stored as integers."""
+    if col["dtype"].startswith("datetime64"):
+        if isinstance(value, list):
+            return [v.astype(np.int64).item() for v in value]
+        if isinstance(value, tuple):
+            return tuple(v.astype(np.int64).item() for v in value)
+        return value.astype(np.int64).item()
+    return value
+
+
+def load(source, columns=None, rows=None, filters=None, cache_dir=None, reader=None, refresh: bool = False,
+         **reader_kwargs) -> pd.DataFrame:
+    """
+    Load ``source`` through its columnar cache (built or rebuilt on demand).
+
+    columns: columns to return (default: all); filter columns need not be among them
+    rows: (start, stop) row range, applied before ``filters``
+    filters: list of (column, op, value), combined with AND; op is one of ``OPERATORS``
+             ('between' takes (low, high), inclusive)
+    reader / reader_kwargs: how to read the source when the cache is (re)built
+    """
+    path = cache_path(source, cache_dir)
+    if refresh or not is_fresh(source, cache_dir, **reader_kwargs):
+        build_cache(source, cache_dir, reader, **reader_kwargs)
+    return read_frame(path, columns, rows, filters)
+
+
+def read_frame(path: str, columns=None, rows=None, filters=None) -> pd.DataFrame:
+    """Read a cache directory written by ``write_frame``; arguments as in ``load``."""
+    meta = frame_meta(path)
+    if meta is None:
+        raise FileNotFoundError(f"no columnar cache at {path}")
+    by_name = {c["name"]: c for c in meta["columns"]}
+    columns = [c["name"] for c in meta["columns"]] if columns is None else list(columns)
+    missing = [c for c in columns + [f[0] for f in filters or []] if c not in by_name]
+    if missing:
+        raise KeyError(f"columns not in {path}: {missing}")
+
+    start, stop = (0, meta["n_rows"]) if rows is None else rows
+    start, stop = max(0, start), min(meta["n_rows"], meta["n_rows"] if stop is None else stop)
+    selection = slice(start, max(start, stop))
+
+    if filters:
+        # zone maps: keep only the chunks every filter may match
+        chunk_ids = range(start // CHUNK_ROWS, (max(stop, start + 1) - 1) // CHUNK_ROWS + 1)
+        encoded = [(by_name[name], op, _encode_value(by_name[name], value)) for name, op, value in filters]
+        keep = []
+        for k in chunk_ids:
+            ok = True
+            for col, op, value in encoded:
+                zone = col.get("zone")
+                if zone and not _chunk_may_match(zone["min"][k], zone["max"][k], op, _zone_value(col, value)):
+                    ok = False
+                    break
+            if ok:
+                keep.append(k)
+        hits = []
+        opened = {col["name"]: _open(path, col) for col, _, _ in encoded}
+        for k in keep:
+            bgn, end = max(start, k * CHUNK_ROWS), min(stop, (k + 1) * CHUNK_ROWS)
+            hit = np.ones(end - bgn, dtype=bool)
+            for col, op, value in encoded:
+                values, mask = opened[col["name"]]
+                hit &= _evaluate(np.asarray(values[bgn:end]), None if mask is None else np.asarray(mask[bgn:end]),
+                                 op, value)
+            hits.append(np.flatnonzero(hit) + bgn)
+        selection = np.concatenate(hits) if hits else np.zeros(0, dtype=np.int64)
+
+    data = dict()
+    for name in columns:
+        col = by_name[name]
+        values, mask = _open(path, col)
+        data[name] = _materialize(col, values, mask, selection)
+    index_meta = meta["index"]
+    if index_meta.get("kind") == "range":
+        positions = np.arange(meta["n_rows"])[selection]
+        index = pd.RangeIndex(start + index_meta["start"], stop + index_meta["start"], name=index_meta["name"]) \
+            if isinstance(selection, slice) and index_meta["step"] == 1 else \
+            pd.Index(index_meta["start"] + positions * index_meta["step"], name=index_meta["name"])
+    else:
+        values, mask = _open(path, index_meta)
+        index = pd.Index(_materialize(index_meta, values, mask, selection), name=index_meta["index_name"])
+    out = pd.DataFrame(data, index=index)
+    out.columns = pd.Index(columns, dtype=_restore_dtype(meta["columns_dtype"]))
+    return out
+
@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+# @Filename: finbert
+# @Date: 2026/10/17
+# @Author: Mark Wang
+# @Email: wangyouan@xmu.edu.cn
+
+"""
+Batched FinBERT document scoring for CPU nodes.
+
+The lecture6_textual_analysis version scores one document at a time, tokenizes every sentence
+separately to build chunks and pads each small batch to its longest chunk.  ``FinBERTScorer``
+instead
+
+* splits all documents into sentences and tokenizes every sentence in one fast-tokenizer call,
+* groups sentences into <= ``max_tokens`` chunks exactly as ``_chunk_text_by_tokens`` does,
+* looks chunks up in a content-hash cache of logits (boilerplate repeats across filings/years),
+* sorts the remaining unique chunks by token length and runs fixed-size batches under
+  ``torch.inference_mode`` with the configured number of CPU threads.
+
+Document scores are computed as in the notebook: mean chunk logits -> softmax -> pos/neu/neg and
+score = pos - neg.
+
+Typical use::
+
+    from aifin.finbert import FinBERTScorer
+    scorer = FinBERTScorer(cache_file="finbert_cache.npz")
+    scores = scorer.score_series(df["item7_text"], prefix="item7_finbert_")
+    scorer.save_cache()
+"""
+
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+MODEL_NAME = "ProsusAI/finbert"  # alternative: "yiyanghkust/finbert-tone"
+SCORE_COLUMNS = ("pos", "neu", "neg", "score", "chunks")
+
+
+def default_sent_tokenize():
+    """nltk.sent_tokenize, as used in the notebook (needs the punkt data)."""
+    from nltk.tokenize import sent_tokenize
+
+    return sent_tokenize
+
+
+def chunk_key(chunk: str) -> bytes:
+    """Content hash used as the cache key of a chunk."""
+    return hashlib.blake2b(chunk.encode("utf-8"), digest_size=16).digest()
+
+
+class FinBERTScorer(object):
+    """
+    Score documents with FinBERT in length-bucketed batches.
+
+    ``tokenizer`` / ``model`` may be passed in already loaded; otherwise they are loaded from
+    ``model_name``.  ``num_threads`` sets torch's intra-op threads (default: all cores).  Chunk
+    logits are cached in memory; with ``cache_file`` the cache is loaded at start and written by
+    ``save_cache``.
+    """
+
+    def __init__(self, model_name: str = MODEL_NAME, tokenizer=None, model=None, batch_size: int = 32,
+                 max_tokens: int = 480, num_threads=None, cache_file=None, sent_tokenize=None):
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        torch.set_num_threads(num_threads or os.cpu_count())
+        self.torch = torch
+        self.tokenizer = tokenizer if tokenizer is not None else AutoTokenizer.from_pretrained(model_name)
+        self.model = model if model is not None else AutoModelForSequenceClassification.from_pretrained(model_name)
+        self.model.eval()
+        self.batch_size = batch_size
+        self.max_tokens = max_tokens
+        self.sent_tokenize = sent_tokenize if sent_tokenize is not None else default_sent_tokenize()
+
+        # FinBERT label mapping (ProsusAI/finbert: 0=negative, 1=neutral, 2=positive)
+        label2id = {v.lower(): k for k, v in self.model.config.id2label.items()}
+        self.neg_id = label2id.get("negative", 0)
+        self.neu_id = label2id.get("neutral", 1)
+        self.pos_id = label2id.get("positive", 2)
+
+        self.cache_file = cache_file
+        self.cache = dict()
+        if cache_file and os.path.exists(cache_file):
+            with np.load(cache_file) as npz:
+                self.cache = dict(zip(npz["keys"].tolist(), npz["logits"]))
+
+    def save_cache(self, cache_file=None):
+        """Write the chunk-logit cache (keys + float32 logits) to ``cache_file``."""
+        cache_file = cache_file or self.cache_file
+        if not cache_file or not self.cache:
+            return
+        keys = np.array(list(self.cache.keys()), dtype="S16")
+        logits = np.stack(list(self.cache.values())).astype(np.float32)
+        with open(cache_file + ".tmp", "wb") as f:
+            np.savez(f, keys=keys, logits=logits)
+        os.replace(cache_file + ".tmp", cache_file)
+
+    def chunk_documents(self, texts) -> list:
+        """
+        Split every document into chunks of at most ``max_tokens`` tokens.
+
+        Same grouping as the notebook's ``_chunk_text_by_tokens``, but the sentences of all
+        documents are tokenized in one batch call.
+        """
+        doc_sents = [self.sent_tokenize(t) if isinstance(t, str) and t.strip() else [] for t in texts]
+        flat = [s for sents in doc_sents for s in sents]
+        lengths = [len(ids) for ids in self.tokenizer(flat, add_special_tokens=False)["input_ids"]] if flat else []
+
+        max_tokens = self.max_tokens
+        doc_chunks = []
+        pos = 0
+        for sents in doc_sents:
+            chunks, cur_chunk, cur_len = [], [], 0
+            for s in sents:
+                tok_len = lengths[pos]
+                pos += 1
+                if tok_len > max_tokens:  # very long sentence: split by words
+                    words = s.split()
+                    for i in range(0, len(words), max_tokens):
+                        chunks.append(" ".join(words[i:i + max_tokens]))
+                    cur_chunk, cur_len = [], 0
+                    continue
+                if cur_len + tok_len <= max_tokens:
+                    cur_chunk.append(s)
+                    cur_len += tok_len
+                else:
+                    if cur_chunk:
+                        chunks.append(" ".join(cur_chunk))
+                    cur_chunk = [s]
+                    cur_len = tok_len
+            if cur_chunk:
+                chunks.append(" ".join(cur_chunk))
+            doc_chunks.append(chunks)
+        return doc_chunks
+
+    def chunk_logits(self, chunks) -> np.ndarray:
+        """Logits (len(chunks) x n_labels) for ``chunks``; only uncached unique chunks are run."""
+        keys = [chunk_key(c) for c in chunks]
+        todo = dict()
+        for key, chunk in zip(keys, chunks):
+            if key not in self.cache and key not in todo:
+                todo[key] = chunk
+        if todo:
+            todo_keys = list(todo)
+            encoded = self.tokenizer(list(todo.values()), truncation=True, max_length=512)["input_ids"]
+            # Length buckets: neighbours in sorted order have similar lengths, so little padding
+            order = sorted(range(len(encoded)), key=lambda i: len(encoded[i]))
+            torch = self.torch
+            with torch.inference_mode():
+                for bgn in range(0, len(order), self.batch_size):
+                    batch = order[bgn:bgn + self.batch_size]
+                    enc = self.tokenizer.pad({"input_ids": [encoded[i] for i in batch]}, return_tensors="pt")
+                    logits = self.model(**enc).logits.float().numpy()
+                    for i, row in zip(batch, logits):
+                        self.cache[todo_keys[i]] = row
+        if not keys:
+            return np.zeros((0, len(self.model.config.id2label)), dtype=np.float32)
+        return np.stack([self.cache[key] for key in keys])
+
+    def score_texts(self, texts) -> list:
+        """Return one dict per document like the notebook's ``finbert_score_text``."""
+        doc_chunks = self.chunk_documents(texts)
+        logits = self.chunk_logits([c for chunks in doc_chunks for c in chunks])
+        results = []
+        pos = 0
+        for chunks in doc_chunks:
+            n = len(chunks)
+            if n == 0:
+                results.append({"pos": np.nan, "neu": np.nan, "neg": np.nan, "score": np.nan, "n_chunks": 0})
+                continue
+            mean_logits = logits[pos:pos + n].mean(axis=0)
+            pos += n
+            probs = np.exp(mean_logits - mean_logits.max())
+            probs /= probs.sum()
+            p_pos, p_neu, p_neg = (float(probs[self.pos_id]), float(probs[self.neu_id]),
+                                   float(probs[self.neg_id]))
+            results.append({"pos": p_pos, "neu": p_neu, "neg": p_neg, "score": p_pos - p_neg, "n_chunks": n})
+        return results
+
+    def score_series(self, texts, prefix: str = "finbert_", docs_per_pass: int = 256) -> pd.DataFrame:
+        """
+        Score a column of documents; returns ``<prefix>pos/neu/neg/score/chunks`` on the same index.
+
+        Documents are processed ``docs_per_pass`` at a time so memory stays bounded on big columns.
+        """
+        texts = pd.Series(texts)
+        values = texts.to_numpy()
+        results = []
+        for bgn in range(0, len(values), docs_per_pass):
+            results += self.score_texts(values[bgn:bgn + docs_per_pass])
+        df = pd.DataFrame(results, index=texts.index, columns=["pos", "neu", "neg", "score", "n_chunks"])
+        df.columns = [prefix + c for c in SCORE_COLUMNS]
+        return df
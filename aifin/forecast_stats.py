@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+# @Filename: forecast_stats
+# @Date: 2026/10/17
+# @Author: Mark Wang
+# @Email: wangyouan@xmu.edu.cn
+
+"""
+Forecast-comparison statistics for many models at once.
+
+``dm_test_from_predictions`` (lecture4) and ``calculate_DM_statistic`` / ``calculate_CW_statistic`` /
+``calculate_R_OOS_2`` (lecture5) compare one pair of forecasts per call.  Here the forecasts are a
+models x time matrix and every statistic is computed for all models or model pairs with array
+operations:
+
+* ``dm_matrix`` / ``dm_matrices``: pairwise Diebold-Mariano statistics with Newey-West variance and
+  the HLN small-sample correction, for one or several lags.  The long-run variance of every loss
+  differential comes from the lagged cross-covariances of the per-model losses, so the cost is a
+  few (models x time) @ (time x models) products per lag instead of one loop per pair.
+* ``cw_test``: Clark-West statistics of every model against the historical-mean benchmark.
+* ``r2_oos``: out-of-sample R^2 (in %) against the historical-mean benchmark.
+* ``bootstrap_dm_pvalues``: circular block-bootstrap p-values for the pairwise mean loss
+  differentials, with the replicates split over a process pool.
+
+``predictions`` is either a DataFrame with one column per model (rows aligned with ``y``) or a
+2-D array of shape (n_models, T) together with ``names``.  Rows where ``y``, the benchmark or any
+forecast is missing are dropped for all models, so every pair is compared on the same months.
+
+Typical use::
+
+    from aifin import forecast_stats
+    preds = Models_pred[["ypca", "ypls", "yspca", "ybar"]]
+    dm = forecast_stats.dm_matrices(Models_pred["y"], preds, lags=(0, 3, 6))
+    dm[3]["DM"]                      # models x models DataFrame
+    forecast_stats.r2_oos(Models_pred["y"], preds, Models_pred["ybar"])
+    forecast_stats.cw_test(Models_pred["y"], preds, Models_pred["ybar"])
+"""
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+BOOT_CHUNK = 500  # bootstrap replicates per job (bounds the replicates x models x models array)
+
+
+def _norm_cdf(x):
+    from scipy.special import ndtr
+
+    return ndtr(x)
+
+
+def _p_values(stat, alternative: str):
+    if alternative == "two-sided":
+        return 2.0 * (1.0 - _norm_cdf(np.abs(stat)))
+    elif alternative == "greater":  # A better than B
+        return 1.0 - _norm_cdf(stat)
+    elif alternative == "less":     # A worse than B
+        return _norm_cdf(stat)
+    raise ValueError("alternative must be 'two-sided', 'greater', or 'less'")
+
+
+def as_matrix(y, predictions, names=None, benchmark=None):
+    """
+    Return (y, P, names, benchmark) as float arrays restricted to the common finite rows.
+
+    ``P`` has shape (n_models, T); ``benchmark`` is ``None`` when not given.
+    """
+    if isinstance(predictions, pd.DataFrame):
+        names = list(predictions.columns) if names is None else list(names)
+        P = predictions.to_numpy(dtype=np.float64).T
+    else:
+        P = np.atleast_2d(np.asarray(predictions, dtype=np.float64))
+        names = [f"model{i}" for i in range(len(P))] if names is None else list(names)
+    y = np.asarray(y, dtype=np.float64)
+    if P.shape[1] != len(y) or len(names) != len(P):
+        raise ValueError("predictions must be (n_models, T) with T = len(y) and one name per model")
+    mask = np.isfinite(y) & np.isfinite(P).all(axis=0)
+    if benchmark is not None:
+        benchmark = np.asarray(benchmark, dtype=np.float64)
+        mask &= np.isfinite(benchmark)
+        benchmark = benchmark[mask]
+    return y[mask], P[:, mask], names, benchmark
+
+
+def forecast_losses(y, P, loss: str = "squared"):
+    """Per-model loss series (n_models x T)."""
+    e = y - P
+    if loss == "squared":
+        return e ** 2
+    elif loss == "absolute":
+        return np.abs(e)
+    raise ValueError("loss must be 'squared' or 'absolute'")
+
+
+def _newey_west(Lc, lags):
+    """
+    Newey-West long-run covariance matrices of the rows of the centered ``Lc`` (n x T), one per lag.
+
+    Returns ``{lag: S}`` with S = G_0 + sum_k w_k (G_k + G_k'), G_k = Lc[:, k:] @ Lc[:, :-k]' / T.
+    """
+    T = Lc.shape[1]
+    out = dict()
+    for lag in sorted(set(lags)):
+        S = Lc @ Lc.T / T
+        for k in range(1, min(lag, T - 1) + 1):
+            G = Lc[:, k:] @ Lc[:, :-k].T / T
+            S += (1.0 - k / (lag + 1.0)) * (G + G.T)
+        out[lag] = S
+    return out
+
+
+def dm_matrices(y, predictions, names=None, *, lags=(None,), loss: str = "squared", h: int = 1,
+                alternative: str = "two-sided", use_hln: bool = True) -> dict:
+    """
+    Pairwise Diebold-Mariano tests for every lag in ``lags``.
+
+    Returns ``{lag: {"DM", "p_value", "mean_d", "T_eff"}}`` where DM / p_value / mean_d are
+    models x models DataFrames; entry (a, b) equals ``dm_test_from_predictions(y, yhat_a, yhat_b,
+    lag=lag, ...)`` (positive DM: A has the larger loss).  A lag of ``None`` means h - 1, as in
+    the notebook.
+    """
+    y, P, names, _ = as_matrix(y, predictions, names)
+    T = len(y)
+    lags = [max(h - 1, 0) if lag is None else int(lag) for lag in lags]
+    L = forecast_losses(y, P, loss)
+    m = L.mean(axis=1)
+    mean_d = m[:, None] - m[None, :]
+    results = dict()
+
+    def frame(a):
+        return pd.DataFrame(a, index=names, columns=names)
+
+    if T < 5:
+        nan = np.full_like(mean_d, np.nan)
+        for lag in lags:
+            results[lag] = {"DM": frame(nan), "p_value": frame(nan), "mean_d": frame(nan), "T_eff": T}
+        return results
+
+    hln = ((T + 1 - 2 * h + (h * (h - 1)) / T) / T) ** 0.5 if use_hln else 1.0
+    for lag, S in _newey_west(L - m[:, None], lags).items():
+        # Var(L_a - L_b) = S_aa + S_bb - S_ab - S_ba
+        diag = np.diag(S)
+        lrvar = diag[:, None] + diag[None, :] - S - S.T
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dm = np.where(lrvar > 0, mean_d / np.sqrt(np.where(lrvar > 0, lrvar, 1.0) / T), np.nan) * hln
+        results[lag] = {"DM": frame(dm), "p_value": frame(_p_values(dm, alternative)),
+                        "mean_d": frame(mean_d), "T_eff": T}
+    return results
+
+
+def dm_matrix(y, predictions, names=None, *, loss: str = "squared", h: int = 1, lag=None,
+              alternative: str = "two-sided", use_hln: bool = True) -> dict:
+    """Pairwise Diebold-Mariano tests for one lag (see ``dm_matrices``)."""
+    results = dm_matrices(y, predictions, names, lags=(lag,), loss=loss, h=h, alternative=alternative,
+                          use_hln=use_hln)
+    return next(iter(results.values()))
+
+
+def r2_oos(y, predictions, benchmark, names=None) -> pd.Series:
+    """
+    Out-of-sample R^2 in % of every model against ``benchmark`` (the historical mean forecast).
+
+    Same formula as the notebook's ``calculate_R_OOS_2`` without its rounding to 2 decimals.
+    """
+    y, P, names, benchmark = as_matrix(y, predictions, names, benchmark)
+    sse = ((y - P) ** 2).sum(axis=1)
+    sse_bench = ((y - benchmark) ** 2).sum()
+    return pd.Series((1 - sse / sse_bench) * 100, index=names, name="r2_oos")
+
+
+def cw_test(y, predictions, benchmark, names=None, lag=None) -> pd.DataFrame:
+    """
+    Clark-West test of every model against the nested ``benchmark`` forecast.
+
+    d_t = (y - bar)^2 - [(y - hat)^2 - (bar - hat)^2]; CW is the Newey-West t-statistic of mean(d)
+    with ``lag`` = ceil(4 (T/100)^(2/9)) by default (the notebook's rule) and a one-sided p-value.
+    Note that the notebook's ``calculate_CW_statistic`` regresses ``r_real`` on [1, d]; here d is
+    regressed on a constant, which is the Clark-West statistic.
+    """
+    y, P, names, benchmark = as_matrix(y, predictions, names, benchmark)
+    T = len(y)
+    if lag is None:
+        lag = int(np.ceil(4 * (T / 100) ** (2 / 9)))
+    d = (y - benchmark) ** 2 - ((y - P) ** 2 - (benchmark - P) ** 2)
+    d_bar = d.mean(axis=1)
+    lrvar = np.diag(_newey_west(d - d_bar[:, None], (lag,))[lag])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cw = np.where(lrvar > 0, d_bar / np.sqrt(np.where(lrvar > 0, lrvar, 1.0) / T), np.nan)
+    return pd.DataFrame({"CW": cw, "p_value": 1.0 - _norm_cdf(cw), "mean_d": d_bar, "T_eff": T}, index=names)
+
+
+def _exceedances(boot_d, observed, alternative: str):
+    if alternative == "two-sided":
+        return (np.abs(boot_d) >= np.abs(observed)).sum(axis=0)
+    elif alternative == "greater":  # large positive differentials are extreme, as for the DM p-value
+        return (boot_d >= observed).sum(axis=0)
+    elif alternative == "less":
+        return (boot_d <= observed).sum(axis=0)
+    raise ValueError("alternative must be 'two-sided', 'greater', or 'less'")
+
+
+def _bootstrap_block(args):
+    block_sums, block_length, n_blocks, observed, alternative, n_reps, seed = args
+    T = block_sums.shape[1]
+    rng = np.random.default_rng(seed)
+    starts = rng.integers(0, T, size=(n_reps, n_blocks))
+    # counts[r, s]: how often replicate r draws the block starting at s
+    counts = np.zeros((n_reps, T))
+    np.add.at(counts, (np.repeat(np.arange(n_reps), n_blocks), starts.reshape(-1)), 1.0)
+    boot_m = counts @ block_sums.T / (n_blocks * block_length)  # resampled mean (centered) losses
+    boot_d = boot_m[:, :, None] - boot_m[:, None, :]  # n_reps x models x models
+    return _exceedances(boot_d, observed, alternative)
+
+
+def bootstrap_dm_pvalues(y, predictions, names=None, *, loss: str = "squared", block_length=None,
+                         n_boot: int = 9999, alternative: str = "two-sided", seed: int = 42,
+                         n_workers=None) -> pd.DataFrame:
+    """
+    Circular block-bootstrap p-values for the pairwise mean loss differentials.
+
+    Losses are centered per model so the null of equal accuracy holds in the resamples; the
+    bootstrap distribution of every mean differential is then compared with the observed one.
+    ``block_length`` defaults to ceil(T^(1/3)).  Replicates are split over ``n_workers`` processes
+    (1 runs serially); each chunk has its own seed stream, so results do not depend on
+    ``n_workers``.
+    """
+    y, P, names, _ = as_matrix(y, predictions, names)
+    T = len(y)
+    L = forecast_losses(y, P, loss)
+    m = L.mean(axis=1)
+    observed = m[:, None] - m[None, :]
+    block_length = block_length or int(math.ceil(T ** (1 / 3)))
+    n_blocks = int(math.ceil(T / block_length))
+
+    # Sum of each circular block of the centered losses, for every start position
+    Lc = L - m[:, None]
+    csum = np.concatenate([np.zeros((len(L), 1)), np.cumsum(np.concatenate([Lc, Lc[:, :block_length]], axis=1),
+                                                             axis=1)], axis=1)
+    block_sums = csum[:, block_length:block_length + T] - csum[:, :T]
+
+    _exceedances(observed, observed, alternative)  # validate before starting workers
+    seeds = np.random.SeedSequence(seed).spawn(int(math.ceil(n_boot / BOOT_CHUNK)))
+    jobs = [(block_sums, block_length, n_blocks, observed, alternative, min(BOOT_CHUNK, n_boot - i * BOOT_CHUNK), s)
+            for i, s in enumerate(seeds)]
+    n_workers = min(len(jobs), n_workers or os.cpu_count() or 1)
+    if n_workers == 1:
+        exceed = sum(map(_bootstrap_block, jobs))
+    else:
+        with ProcessPoolExecutor(n_workers) as pool:
+            exceed = sum(pool.map(_bootstrap_block, jobs))
+    p = (exceed + 1.0) / (n_boot + 1.0)
+    np.fill_diagonal(p, np.nan)
+    return pd.DataFrame(p, index=names, columns=names)
@@ -0,0 +1,255 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+# @Filename: halving_search
+# @Date: 2026/10/17
+# @Author: Mark Wang
+# @Email: wangyouan@xmu.edu.cn
+
+"""
+Parallel successive-halving hyper-parameter search (loan approval and lecture9 classifiers).
+
+Exhaustive or randomized search gives every candidate the full training data (or all epochs) on
+every fold.  ``halving_search`` starts all candidates on a small budget, keeps the best
+1 / ``factor`` of them and multiplies the budget by ``factor`` until one candidate is left or the
+full budget is reached, so losing candidates stop after the cheap rounds.  The budget is either
+the number of training rows of each fold (``resource='rows'``) or an estimator parameter such as
+``'n_estimators'`` or the ``'epochs'`` of a scikeras ``KerasClassifier``.
+
+Candidates are evaluated as (candidate, fold) tasks in a process pool.  The CV fold indices and
+the preprocessed matrices (``preprocess`` fitted on each training fold, computed once) are put in
+shared memory and attached by every worker, and each worker caps its BLAS / OpenMP / TensorFlow
+thread pools to ``threads_per_worker``.
+
+Typical use::
+
+    from aifin.halving_search import halving_search, load_loan_data
+    from sklearn.ensemble import RandomForestClassifier
+    X, y = load_loan_data("data/l7/loan_approval.csv")
+    result = halving_search(RandomForestClassifier(random_state=42),
+                            {"max_depth": [4, 6, 8, 10, None], "min_samples_leaf": [1, 5, 20],
+                             "max_features": ["sqrt", 0.5, 1.0]},
+                            X, y, resource="n_estimators", max_resource=400, scoring="roc_auc")
+    result["best_params"], result["history"]
+"""
+
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+FEATURE_COLS = ['income', 'credit_score', 'loan_amount', 'years_employed',
+                'points', 'debt_to_income', 'loan_to_income']
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "VECLIB_MAXIMUM_THREADS",
+                   "NUMEXPR_NUM_THREADS", "TF_NUM_INTRAOP_THREADS", "TF_NUM_INTEROP_THREADS")
+MIN_ROWS_PER_FOLD = 30  # smallest default row budget
+
+
+def load_loan_data(path):
+    """
+    Features and target as prepared in lecture7_loan_approval (steps 3, 5 and 6).
+
+    Duplicates are dropped, missing numbers filled with the median, and the ratio features added;
+    returns (X with ``FEATURE_COLS``, y as int).
+    """
+    df = pd.read_csv(path).drop_duplicates()
+    numerical_cols = df.select_dtypes(include=[np.number]).columns
+    df[numerical_cols] = df[numerical_cols].fillna(df[numerical_cols].median())
+    df['debt_to_income'] = df['loan_amount'] / df['income']
+    df['loan_to_income'] = df['loan_amount'] / df['income']
+    return df[FEATURE_COLS], df['loan_approved'].astype(int)
+
+
+def _share(arr: np.ndarray):
+    """Copy ``arr`` into a new shared-memory block; returns (block, (name, shape, dtype))."""
+    arr = np.ascontiguousarray(arr)
+    shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+    np.ndarray(arr.shape, arr.dtype, buffer=shm.buf)[...] = arr
+    return shm, (shm.name, arr.shape, arr.dtype.str)
+
+
+def _attach(spec):
+    name, shape, dtype = spec
+    # workers share the parent's resource tracker, which unlinks the block if the parent dies
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, np.dtype(dtype), buffer=shm.buf)
+
+
+_worker = dict()
+
+
+def _init_worker(estimator, specs, threads_per_worker, scoring):
+    if threads_per_worker:
+        for var in THREAD_ENV_VARS:
+            os.environ[var] = str(threads_per_worker)
+        try:
+            from threadpoolctl import threadpool_limits
+            _worker["limits"] = threadpool_limits(threads_per_worker)
+        except ImportError:
+            pass
+    arrays = dict()
+    _worker["blocks"] = []
+    for key, spec in specs.items():
+        shm, arr = _attach(spec)
+        _worker["blocks"].append(shm)
+        arrays[key] = arr
+    _worker.update(arrays=arrays, estimator=estimator, scoring=scoring)
+
+
+def _run_task(task):
+    from sklearn.base import clone
+    from sklearn.metrics import get_scorer
+
+    cid, params, fold, resource, budget = task
+    a = _worker["arrays"]
+    X = a["X"][fold if len(a["X"]) > 1 else 0]
+    bounds = a["bounds"]
+    train_idx = a["train"][bounds[fold, 0]:bounds[fold, 1]]
+    val_idx = a["val"][bounds[fold, 2]:bounds[fold, 3]]
+    est = clone(_worker["estimator"]).set_params(**params)
+    if resource == "rows":
+        train_idx = train_idx[:budget]  # fold indices are stored in a shuffled order
+    else:
+        est.set_params(**{resource: budget})
+    t0 = time.perf_counter()
+    est.fit(X[train_idx], a["y"][train_idx])
+    fit_time = time.perf_counter() - t0
+    score = get_scorer(_worker["scoring"])(est, X[val_idx], a["y"][val_idx])
+    return cid, fold, float(score), fit_time
+
+
+def make_candidates(param_grid=None, param_distributions=None, n_candidates: int = 20, random_state=None) -> list:
+    """Candidate parameter dicts: the full ``param_grid`` or ``n_candidates`` draws from ``param_distributions``."""
+    from sklearn.model_selection import ParameterGrid, ParameterSampler
+
+    if param_grid is not None:
+        return list(ParameterGrid(param_grid))
+    return list(ParameterSampler(param_distributions, n_candidates, random_state=random_state))
+
+
+def halving_search(estimator, param_grid, X, y, *, resource: str = "rows", max_resource=None,
+                   min_resource=None, factor: int = 3, cv: int = 5, scoring: str = "roc_auc",
+                   preprocess=None, n_workers=None, threads_per_worker: int = 1, random_state: int = 42,
+                   refit: bool = True, param_distributions=None, n_candidates: int = 20,
+                   verbose: bool = False) -> dict:
+    """
+    Successive-halving search over ``param_grid`` (or ``n_candidates`` draws from ``param_distributions``).
+
+    resource: 'rows' (training rows per fold) or the name of an estimator parameter
+    max_resource / min_resource: budget of the last / first round; for 'rows' the default maximum is
+                                 the size of the smallest training fold, and the default minimum is
+                                 chosen so the rounds end at the maximum when one candidate is left
+    preprocess: optional transformer (e.g. ``StandardScaler()``) fitted on every training fold once
+    n_workers: processes (default: all cores // threads_per_worker); 1 runs in this process
+
+    Returns a dict with ``best_params``, ``best_score`` (mean CV score in the last round),
+    ``best_estimator`` (refitted on all rows with the full budget when ``refit``), the fitted
+    ``preprocess`` to apply before it, and ``history`` (one row per candidate and round).
+    """
+    from sklearn.base import clone, is_classifier
+    from sklearn.model_selection import KFold, StratifiedKFold
+
+    candidates = make_candidates(param_grid, param_distributions, n_candidates, random_state)
+    if not candidates:
+        raise ValueError("no candidates to search")
+    X_arr = np.asarray(X, dtype=np.float64)
+    y_arr = np.asarray(y)
+
+    # CV folds once; training indices shuffled so that a row budget is a random subsample
+    splitter = (StratifiedKFold if is_classifier(estimator) else KFold)(cv, shuffle=True, random_state=random_state)
+    rng = np.random.default_rng(random_state)
+    folds = [(rng.permutation(tr), va) for tr, va in splitter.split(X_arr, y_arr)]
+    if preprocess is not None:
+        X_blocks = np.stack([clone(preprocess).fit(X_arr[tr]).transform(X_arr) for tr, _ in folds])
+    else:
+        X_blocks = X_arr[None]
+    # fold f: train[bounds[f, 0]:bounds[f, 1]] and val[bounds[f, 2]:bounds[f, 3]]
+    t_end = np.cumsum([len(tr) for tr, _ in folds])
+    v_end = np.cumsum([len(va) for _, va in folds])
+    bounds = np.column_stack([t_end - [len(tr) for tr, _ in folds], t_end,
+                              v_end - [len(va) for _, va in folds], v_end]).astype(np.int64)
+
+    if max_resource is None:
+        if resource != "rows":
+            raise ValueError("max_resource is required when the resource is an estimator parameter")
+        max_resource = min(len(tr) for tr, _ in folds)
+    n_rounds = max(1, math.ceil(math.log(len(candidates), factor)) + 1) if len(candidates) > 1 else 1
+    if min_resource is None:
+        floor = MIN_ROWS_PER_FOLD if resource == "rows" else 1
+        min_resource = max(floor, int(max_resource // factor ** (n_rounds - 1)))
+
+    train_all = np.concatenate([tr for tr, _ in folds])
+    val_all = np.concatenate([va for _, va in folds])
+
+    if n_workers is None:
+        n_workers = max(1, (os.cpu_count() or 1) // max(threads_per_worker or 1, 1))
+    arrays = {"X": X_blocks, "y": y_arr, "bounds": bounds, "train": train_all, "val": val_all}
+    blocks, pool = [], None
+    try:
+        if n_workers > 1:
+            specs = dict()
+            for key, arr in arrays.items():
+                shm, specs[key] = _share(arr)
+                blocks.append(shm)
+            pool = ProcessPoolExecutor(n_workers, initializer=_init_worker,
+                                       initargs=(estimator, specs, threads_per_worker, scoring))
+        else:
+            _worker.update(arrays=arrays, estimator=estimator, scoring=scoring)
+
+        history = []
+        survivors = list(range(len(candidates)))
+        budget = int(min_resource)
+        round_no = 0
+        try:
+            while True:
+                tasks = [(cid, candidates[cid], fold, resource, budget) for cid in survivors for fold in range(cv)]
+                outputs = pool.map(_run_task, tasks, chunksize=max(1, len(tasks) // (4 * n_workers))) \
+                    if pool is not None else map(_run_task, tasks)
+                scores = {cid: [] for cid in survivors}
+                fit_times = {cid: 0.0 for cid in survivors}
+                for cid, fold, score, fit_time in outputs:
+                    scores[cid].append(score)
+                    fit_times[cid] += fit_time
+                for cid in survivors:
+                    history.append({"round": round_no, "resource": budget, "candidate": cid,
+                                    "params": candidates[cid], "mean_score": float(np.mean(scores[cid])),
+                                    "std_score": float(np.std(scores[cid])), "fit_time_sec": fit_times[cid]})
+                ranked = sorted(survivors, key=lambda c: -np.mean(scores[c]))
+                if verbose:
+                    print(f"round {round_no}: {len(survivors)} candidates, {resource}={budget}, "
+                          f"best score {np.mean(scores[ranked[0]]):.4f}")
+                if len(survivors) == 1 or budget >= max_resource:
+                    break
+                survivors = ranked[:max(1, math.ceil(len(survivors) / factor))]
+                budget = int(min(budget * factor, max_resource))
+                round_no += 1
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            _worker.clear()
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+    best = ranked[0]
+    history = pd.DataFrame(history)
+    result = {"best_params": candidates[best],
+              "best_score": float(np.mean(scores[best])),
+              "best_estimator": None,
+              "preprocess": None,
+              "history": history}
+    if refit:
+        est = clone(estimator).set_params(**candidates[best])
+        if resource != "rows":
+            est.set_params(**{resource: max_resource})
+        X_fit = X_arr
+        if preprocess is not None:
+            result["preprocess"] = clone(preprocess).fit(X_arr)
+            X_fit = result["preprocess"].transform(X_arr)
+        result["best_estimator"] = est.fit(X_fit, y_arr)
+    return result
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+# @Filename: lag_features
+# @Date: 2026/10/17
+# @Author: Mark Wang
+# @Email: wangyouan@xmu.edu.cn
+
+"""
+Lag-window features over one float32 buffer, with streaming batches for Keras.
+
+``add_lags`` in lecture9_deep_learning copies the frame and adds every ``<feature>_lag_<k>``
+column one at a time, and the RNN/LSTM cells wrap the data in ``TimeseriesGenerator``.
+``LagFeatureBuffer`` keeps the base features in a single (n_rows x n_features) float32 array and
+serves every sample as a view into it:
+
+* ``windows`` is a ``sliding_window_view`` of shape (n_samples, lags, n_features); sample i holds
+  rows i .. i + lags - 1 and predicts row i + lags (the ``TimeseriesGenerator`` layout),
+* the same window read backwards and transposed is the ``add_lags`` row (feature-major, lag 1
+  first), so dense and recurrent models share one buffer,
+* ``normalize`` standardizes the buffer in place with statistics of the training rows only,
+* ``batches`` yields (X, y) batches copied straight from the view, and ``tf_dataset`` builds a
+  ``tf.data`` pipeline that gathers the windows inside TensorFlow with parallel map + prefetch.
+
+Typical use::
+
+    from aifin.lag_features import LagFeatureBuffer, build_features
+    buf = LagFeatureBuffer(build_features(data, symbol), target="d", lags=5)
+    buf.normalize(train_end=buf.split_row(0.8))
+    train_ds = buf.tf_dataset(buf.train_samples, batch_size=32, layout="lags", shuffle=True)
+    model.fit(train_ds, epochs=25)
+"""
+
+import numpy as np
+import pandas as pd
+
+FEATURES = ("r", "d", "sma", "min", "max", "mom", "vol")  # added after the price column
+
+
+def build_features(data: pd.DataFrame, symbol: str, window: int = 20) -> pd.DataFrame:
+    """The base features of ``add_lags`` (price, r, d, sma, min, max, mom, vol), NaN rows dropped."""
+    price = data[symbol].dropna().astype(np.float64)
+    r = np.log(price / price.shift())
+    df = pd.DataFrame({symbol: price, "r": r})
+    roll_p, roll_r = price.rolling(window), r.rolling(window)
+    df["sma"] = roll_p.mean()
+    df["min"] = roll_p.min()
+    df["max"] = roll_p.max()
+    df["mom"] = roll_r.mean()
+    df["vol"] = roll_r.std()
+    df.dropna(inplace=True)
+    df["d"] = np.where(df["r"] > 0, 1, 0)
+    return df[[symbol] + list(FEATURES)]
+
+
+class LagFeatureBuffer(object):
+    """
+    Lag windows of ``features`` served as views over one float32 buffer.
+
+    ``target`` names the column to predict; it is copied out before normalization so that e.g.
+    the 0/1 direction ``d`` stays a label.  ``columns`` selects the input features (default: all
+    columns of ``features``, in order).
+    """
+
+    def __init__(self, features: pd.DataFrame, target: str, lags: int = 5, columns=None):
+        self.columns = list(features.columns) if columns is None else list(columns)
+        self.index = features.index
+        self.lags = int(lags)
+        self.buffer = np.ascontiguousarray(features[self.columns].to_numpy(dtype=np.float32))
+        self.target = features[target].to_numpy(dtype=np.float32).copy()
+        self.mean = self.std = None
+        self.train_end = None
+        if len(self.buffer) <= self.lags:
+            raise ValueError(f"need more than lags={self.lags} rows, got {len(self.buffer)}")
+
+    @property
+    def n_samples(self) -> int:
+        return len(self.buffer) - self.lags
+
+    @property
+    def windows(self) -> np.ndarray:
+        """(n_samples, lags, n_features) view: sample i covers rows i .. i + lags - 1."""
+        view = np.lib.stride_tricks.sliding_window_view(self.buffer, (self.lags, len(self.columns)))
+        return view[:-1, 0]
+
+    @property
+    def targets(self) -> np.ndarray:
+        """Target of every sample (row i + lags)."""
+        return self.target[self.lags:]
+
+    @property
+    def sample_index(self):
+        """Index labels of the predicted rows."""
+        return self.index[self.lags:]
+
+    @property
+    def lag_columns(self) -> list:
+        """``add_lags`` column names, in the order of the ``lags`` layout."""
+        return [f"{f}_lag_{lag}" for f in self.columns for lag in range(1, self.lags + 1)]
+
+    def split_row(self, fraction: float = 0.8) -> int:
+        """Row where the test period starts when the first ``fraction`` of rows is training data."""
+        return int(len(self.buffer) * fraction)
+
+    @property
+    def train_samples(self) -> np.ndarray:
+        """Samples whose window and target lie before ``train_end`` (all samples if not set)."""
+        end = self.n_samples if self.train_end is None else max(self.train_end - self.lags, 0)
+        return np.arange(end)
+
+    @property
+    def test_samples(self) -> np.ndarray:
+        start = self.n_samples if self.train_end is None else max(self.train_end - self.lags, 0)
+        return np.arange(start, self.n_samples)
+
+    def normalize(self, train_end: int):
+        """
+        Standardize the buffer in place with the mean / std (ddof=1) of rows ``[0, train_end)``.
+
+        The statistics are stored in ``mean`` / ``std`` so new rows can be scaled the same way.
+        """
+        if self.mean is not None:
+            raise RuntimeError("buffer is already normalized")
+        train = self.buffer[:train_end].astype(np.float64)
+        self.mean = train.mean(axis=0)
+        self.std = train.std(axis=0, ddof=1)
+        self.std[~(self.std > 0)] = 1.0
+        self.buffer -= self.mean.astype(np.float32)
+        self.buffer /= self.std.astype(np.float32)
+        self.train_end = int(train_end)
+        return self
+
+    def take(self, samples, layout: str = "sequence"):
+        """
+        Copy the windows of ``samples`` into a batch array.
+
+        layout 'sequence': (n, lags, n_features) in time order, for SimpleRNN / LSTM
+        layout 'lags': (n, n_features * lags) with the columns of ``lag_columns``, for Dense models
+        """
+        w = self.windows[samples]
+        if layout == "sequence":
+            return w
+        elif layout == "lags":
+            return np.ascontiguousarray(w[:, ::-1, :].transpose(0, 2, 1)).reshape(len(w), -1)
+        raise ValueError("layout must be 'sequence' or 'lags'")
+
+    def to_frame(self, samples=None) -> pd.DataFrame:
+        """The ``add_lags`` style frame (base features + lag columns) of ``samples``."""
+        samples = np.arange(self.n_samples) if samples is None else np.asarray(samples)
+        base = pd.DataFrame(self.buffer[samples + self.lags], index=self.index[samples + self.lags],
+                            columns=self.columns)
+        lagged = pd.DataFrame(self.take(samples, "lags"), index=base.index, columns=self.lag_columns)
+        return pd.concat([base, lagged], axis=1)
+
+    def batches(self, samples=None, batch_size: int = 32, layout: str = "sequence", shuffle: bool = False,
+                seed=None, epochs=1):
+        """
+        Generator of (X, y) batches read from the buffer.
+
+        ``epochs=None`` repeats forever (reshuffling every pass), as Keras expects of a generator
+        used with ``steps_per_epoch``.
+        """
+        samples = np.arange(self.n_samples) if samples is None else np.asarray(samples)
+        rng = np.random.default_rng(seed)
+        targets = self.targets
+        epoch = 0
+        while epochs is None or epoch < epochs:
+            order = rng.permutation(samples) if shuffle else samples
+            for bgn in range(0, len(order), batch_size):
+                batch = order[bgn:bgn + batch_size]
+                yield self.take(batch, layout), targets[batch]
+            epoch += 1
+
+    def tf_dataset(self, samples=None, batch_size: int = 32, layout: str = "sequence", shuffle: bool = False,
+                   seed=None, prefetch=None):
+        """
+        ``tf.data.Dataset`` of (X, y) batches.
+
+        The buffer is handed to TensorFlow once; each batch of sample ids is turned into windows
+        with ``tf.gather`` in a parallel map, so no Python code runs per batch.
+        """
+        import tensorflow as tf
+
+        if layout not in ("sequence", "lags"):
+            raise ValueError("layout must be 'sequence' or 'lags'")
+        samples = np.arange(self.n_samples) if samples is None else np.asarray(samples)
+        buffer = tf.constant(self.buffer)
+        targets = tf.constant(self.targets)
+        offsets = tf.range(self.lags, dtype=tf.int64)
+        n_flat = len(self.columns) * self.lags
+
+        def gather(ids):
+            w = tf.gather(buffer, ids[:, None] + offsets[None, :])  # batch x lags x features
+            if layout == "lags":
+                w = tf.reshape(tf.transpose(tf.reverse(w, axis=[1]), [0, 2, 1]), [-1, n_flat])
+            return w, tf.gather(targets, ids)
+
+        ds = tf.data.Dataset.from_tensor_slices(samples.astype(np.int64))
+        if shuffle:
+            ds = ds.shuffle(len(samples), seed=seed, reshuffle_each_iteration=True)
+        ds = ds.batch(batch_size).map(gather, num_parallel_calls=tf.data.AUTOTUNE)
+        return ds.prefetch(tf.data.AUTOTUNE if prefetch is None else prefetch)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+# @Filename: lm_sentiment
+# @Date: 2026/10/17
+# @Author: Mark Wang
+# @Email: wangyouan@xmu.edu.cn
+
+"""
+Loughran-McDonald dictionary sentiment scoring with a hashed word -> category table.
+
+Replaces ``count_words`` / ``get_words`` / ``get_sentiment_score`` from lecture6_textual_analysis,
+which look every token up with ``list.index`` over thousands of dictionary words.  The engine is
+built once from the LM master dictionary; each token is then one dict lookup, and a whole column
+of documents is counted with one ``np.bincount`` per category.
+
+Typical use::
+
+    from aifin.lm_sentiment import LMSentimentEngine
+    engine = LMSentimentEngine.from_master_dictionary("data/l6/Loughran-McDonald_MasterDictionary_1993-2024.csv")
+    scores = engine.score_series(df["item7_text"], prefix="item7_")
+    df = df.join(scores)   # item7_sentiment, item7_positive_rate, item7_negative_rate, item7_n_*, ...
+"""
+
+import string
+
+import numpy as np
+import pandas as pd
+
+CATEGORIES = ("negative", "positive", "uncertainty", "litigious", "strong_modal", "weak_modal",
+              "constraining", "complexity")
+
+# The notebook filters with ``x not in punc_list`` where punc_list is a str, i.e. a substring test
+PUNCTUATION = string.punctuation
+
+
+def default_tokenizer():
+    """nltk.word_tokenize, as used in the notebook (needs the punkt data)."""
+    import nltk
+
+    return nltk.word_tokenize
+
+
+def default_stop_words() -> frozenset:
+    """nltk English stop words, as used in the notebook."""
+    from nltk.corpus import stopwords
+
+    return frozenset(stopwords.words("english"))
+
+
+class LMSentimentEngine(object):
+    """
+    Score documents against the LM sentiment categories.
+
+    ``word_index`` maps an upper-case word to a row of ``category_matrix`` (n_words x 8, one
+    column per entry of ``CATEGORIES``).  ``tokenize`` and ``stop_words`` default to the nltk
+    tokenizer and English stop words used in the notebook; pass your own to avoid nltk.
+    """
+
+    def __init__(self, word_index: dict, category_matrix: np.ndarray, tokenize=None, stop_words=None):
+        self.word_index = word_index
+        self.category_matrix = np.asarray(category_matrix, dtype=np.float64)
+        self.tokenize = tokenize if tokenize is not None else default_tokenizer()
+        self.stop_words = frozenset(stop_words) if stop_words is not None else default_stop_words()
+
+    @classmethod
+    def from_master_dictionary(cls, source, tokenize=None, stop_words=None):
+        """
+        Build the engine from the LM master dictionary CSV (or an already loaded DataFrame).
+
+        A word belongs to a category when its column is non-zero, the same rule as the notebook's
+        ``sentiment_dict_lm[sentiment_dict_lm['Positive'] != 0]``.
+        """
+        if isinstance(source, pd.DataFrame):
+            lm = source
+        else:
+            # keep_default_na=False: "NULL", "NAN" and "NA" are dictionary words, not missing values
+            lm = pd.read_csv(source, keep_default_na=False, usecols=["Word"] + [c.title() for c in CATEGORIES])
+        words = lm["Word"].astype(str).str.upper()
+        matrix = np.column_stack([lm[c.title()].to_numpy() != 0 for c in CATEGORIES])
+        keep = matrix.any(axis=1)
+        words, matrix = words[keep].to_numpy(), matrix[keep]
+        word_index = {word: i for i, word in enumerate(words)}
+        return cls(word_index, matrix, tokenize, stop_words)
+
+    def filter_tokens(self, text: str) -> list:
+        """Tokenize and drop punctuation and stop words (the notebook's ``token_filtered``)."""
+        stop_words = self.stop_words
+        return [x for x in self.tokenize(text) if x not in PUNCTUATION and x not in stop_words]
+
+    def token_ids(self, tokens) -> np.ndarray:
+        """Dictionary row of every token found in the LM dictionary."""
+        get = self.word_index.get
+        ids = (get(token.upper()) for token in tokens)
+        return np.fromiter((i for i in ids if i is not None), dtype=np.int64)
+
+    def count(self, tokens) -> np.ndarray:
+        """Per-category counts (length 8, ordered as ``CATEGORIES``) for one token list."""
+        return self.category_matrix[self.token_ids(tokens)].sum(axis=0)
+
+    def get_words(self, tokens, category: str = "positive") -> list:
+        """Lower-cased tokens that fall in ``category`` (replaces the notebook's ``get_words``)."""
+        column = self.category_matrix[:, CATEGORIES.index(category)]
+        get = self.word_index.get
+        return [token.lower() for token in tokens
+                if (i := get(token.upper())) is not None and column[i]]
+
+    def get_sentiment_score(self, content: str):
+        """(sentiment, positive_rate, negative_rate), as the notebook's ``get_sentiment_score``."""
+        tokens = self.filter_tokens(content)
+        counts = self.count(tokens)
+        n = len(tokens)
+        positive_rate = counts[1] / n if n else np.nan
+        negative_rate = counts[0] / n if n else np.nan
+        return positive_rate - negative_rate, positive_rate, negative_rate
+
+    def score_series(self, texts, prefix: str = "") -> pd.DataFrame:
+        """
+        Score a whole column of documents in one batch.
+
+        Returns a DataFrame on the same index with ``sentiment``, ``positive_rate`` and
+        ``negative_rate`` (the ``get_sentiment_score`` tuple), ``n_tokens``, and ``n_<category>`` /
+        ``<category>_rate`` for every LM category, each column name prefixed with ``prefix``.
+        Missing or empty documents get NaN rates.
+        """
+        texts = pd.Series(texts)
+        n_docs = len(texts)
+        ids, doc_of_id = [], []
+        n_tokens = np.zeros(n_docs, dtype=np.int64)
+        for i, text in enumerate(texts.to_numpy()):
+            if not isinstance(text, str):
+                continue
+            tokens = self.filter_tokens(text)
+            n_tokens[i] = len(tokens)
+            doc_ids = self.token_ids(tokens)
+            ids.append(doc_ids)
+            doc_of_id.append(np.full(len(doc_ids), i, dtype=np.int64))
+        ids = np.concatenate(ids) if ids else np.zeros(0, dtype=np.int64)
+        doc_of_id = np.concatenate(doc_of_id) if doc_of_id else np.zeros(0, dtype=np.int64)
+
+        hits = self.category_matrix[ids]
+        counts = np.column_stack([np.bincount(doc_of_id, weights=hits[:, j], minlength=n_docs)
+                                  for j in range(len(CATEGORIES))])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rates = counts / np.where(n_tokens > 0, n_tokens, np.nan)[:, None]
+
+        result = {"sentiment": rates[:, 1] - rates[:, 0],
+                  "positive_rate": rates[:, 1],
+                  "negative_rate": rates[:, 0],
+                  "n_tokens": n_tokens}
+        for j, category in enumerate(CATEGORIES):
+            result[f"n_{category}"] = counts[:, j].astype(np.int64)
+        for j, category in enumerate(CATEGORIES[2:], start=2):
+            result[f"{category}_rate"] = rates[:, j]
+        return pd.DataFrame({prefix + name: values for name, values in result.items()}, index=texts.index)
@@ -0,0 +1,338 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+# @Filename: model_zoo
+# @Date: 2026/10/17
+# @Author: Mark Wang
+# @Email: wangyouan@xmu.edu.cn
+
+"""
+Parallel, cached evaluation of a registry of return-prediction models.
+
+lecture4_simple_algorithms_for_stock_return_prediction runs OLS, Lasso, Ridge, ElasticNet, a
+random forest and gradient boosting one after another through ``evaluate_model`` and appends each
+metrics dict to ``all_result_df`` by hand.  ``run_model_zoo`` takes a list of ``ModelSpec`` and
+
+* evaluates all specs concurrently in a process pool (the feature matrices are shipped to every
+  worker once, not once per model),
+* stores each fitted model with its predictions under a key built from the fingerprint of the
+  data the model sees and the estimator's hyper-parameters, so a rerun only fits the models whose
+  data or parameters changed,
+* returns the metrics table (one row per spec, ``Model`` column as in the notebook) plus timing.
+
+Typical use::
+
+    from aifin import model_zoo
+    feature_sets = {"linear": (X_train_linear, X_test_linear), "tree": (X_train_tree, X_test_tree)}
+    all_result_df, results = model_zoo.run_model_zoo(model_zoo.default_specs(), feature_sets,
+                                                     y_train, y_test, cache_dir="model_cache")
+    dm_test_from_predictions(y=results["Ridge"]["y_test"], yhat_a=results["Ridge"]["y_pred"],
+                             yhat_b=results["OLS"]["y_pred"])
+"""
+
+import hashlib
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+METRIC_COLUMNS = ("rmse", "mae", "hit_ratio", "r2_oos", "sharpe_monthly", "sharpe_annualized", "fit_time_sec")
+
+# Parameters that change how fast a model fits, not what it predicts
+IGNORED_PARAMS = ("n_jobs", "verbose")
+
+
+def evaluate_model(
+    model,
+    X_train,
+    y_train,
+    X_test,
+    y_test,
+    *,
+    loss: str = "squared",             # "squared" or "absolute"
+    annualize: bool = True,
+    periods_per_year: int = 12,
+) -> Dict[str, Any]:
+    """
+    Minimal evaluation (same as the notebook):
+      - Fits `model` and times `.fit()`
+      - Predicts on test
+      - Computes RMSE, MAE, Hit Ratio, OOS R^2, Sharpe (monthly & annualized)
+      - Returns arrays needed for DM test (y_test, y_pred, y_bench, errors, losses)
+
+    Notes:
+      - Assumes y is (next-month) excess return if you want Sharpe to be meaningful.
+      - Drops rows with NaN/inf in y_test or y_pred (mask is returned).
+    """
+    y_train = np.asarray(y_train, dtype=float)
+    y_test_arr = np.asarray(y_test, dtype=float)
+
+    # 1) Fit & time
+    t0 = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_time_sec = time.perf_counter() - t0
+
+    # 2) Predict
+    y_pred_full = np.asarray(model.predict(X_test), dtype=float)
+
+    result = prediction_metrics(y_test_arr, y_pred_full, fit_time_sec, loss=loss, annualize=annualize,
+                                periods_per_year=periods_per_year)
+    result["fitted_model"] = model   # trained model
+    return result
+
+
+def sharpe_ratio(strat_ret, annualize: bool = True, periods_per_year: int = 12):
+    """(per-period, annualized) Sharpe ratio of the strategy returns ``strat_ret``."""
+    strat_ret = np.asarray(strat_ret, dtype=float)
+    mu = np.mean(strat_ret) if len(strat_ret) else np.nan
+    sd = np.std(strat_ret, ddof=1) if len(strat_ret) > 1 else np.nan
+    sharpe_m = float(mu / sd) if (sd and np.isfinite(sd)) else np.nan
+    sharpe_a = float(sharpe_m * np.sqrt(periods_per_year)) if (annualize and np.isfinite(sharpe_m)) else sharpe_m
+    return sharpe_m, sharpe_a
+
+
+def prediction_metrics(y_test, y_pred, fit_time_sec: float = np.nan, *, loss: str = "squared",
+                       annualize: bool = True, periods_per_year: int = 12) -> Dict[str, Any]:
+    """
+    Metrics and DM-ready arrays of ``evaluate_model`` for given test targets and predictions.
+
+    RMSE, MAE, hit ratio, OOS R^2 against a zero forecast and the Sharpe ratio of the sign strategy,
+    computed over the rows where both ``y_test`` and ``y_pred`` are finite.
+    """
+    y_test_arr = np.asarray(y_test, dtype=float)
+    y_pred_full = np.asarray(y_pred, dtype=float)
+
+    # 1) Valid mask and align
+    mask = np.isfinite(y_test_arr) & np.isfinite(y_pred_full)
+    y_t = y_test_arr[mask]
+    yhat = y_pred_full[mask]
+
+    # 2) Errors & loss (DM-ready)
+    e_model = y_t - yhat
+    e_bench = y_t
+    if loss == "squared":
+        loss_model = e_model ** 2
+        loss_bench = e_bench ** 2
+    elif loss == "absolute":
+        loss_model = np.abs(e_model)
+        loss_bench = np.abs(e_bench)
+    else:
+        raise ValueError("loss must be 'squared' or 'absolute'.")
+
+    # 3) Metrics
+    rmse = float(np.sqrt(np.mean(e_model ** 2))) if len(e_model) else np.nan
+    mae = float(np.mean(np.abs(e_model))) if len(e_model) else np.nan
+    hit_ratio = float(np.mean(np.sign(yhat) == np.sign(y_t))) if len(y_t) else np.nan
+
+    sse_model = float(np.sum(e_model ** 2))
+    sse_bench = float(np.sum(e_bench ** 2))
+    r2_oos = 1.0 - sse_model / sse_bench if sse_bench > 0 else np.nan
+
+    sharpe_m, sharpe_a = sharpe_ratio(np.sign(yhat) * y_t, annualize, periods_per_year)
+
+    return {
+        "metrics": {
+            "rmse": rmse,
+            "mae": mae,
+            "hit_ratio": hit_ratio,
+            "r2_oos": float(r2_oos),
+            "sharpe_monthly": sharpe_m,
+            "sharpe_annualized": sharpe_a,
+            "fit_time_sec": float(fit_time_sec),
+        },
+        # DM-ready series
+        "y_test": y_t,
+        "y_pred": yhat,
+        "errors_model": e_model,
+        "errors_bench": e_bench,
+        "loss_model": loss_model,
+        "loss_bench": loss_bench,
+        "mask_bool": mask,       # in case you need to align with original index
+    }
+
+
+class ModelSpec(object):
+    """
+    One entry of the model registry.
+
+    ``estimator`` is an unfitted scikit-learn style estimator (it is cloned before fitting),
+    ``features`` names the feature set it is trained on (a key of ``feature_sets`` in
+    ``run_model_zoo``, e.g. 'linear' for imputed + standardized X, 'tree' for imputed X) and
+    ``eval_kwargs`` are passed on to ``evaluate_model``.
+    """
+
+    def __init__(self, name: str, estimator, features: str = "linear", **eval_kwargs):
+        self.name = name
+        self.estimator = estimator
+        self.features = features
+        self.eval_kwargs = eval_kwargs
+
+    def __repr__(self):
+        return f"ModelSpec({self.name!r}, {type(self.estimator).__name__}, features={self.features!r})"
+
+    def params_key(self) -> str:
+        """Estimator class and hyper-parameters as a stable string (nested estimators by class)."""
+        params = self.estimator.get_params(deep=True)
+        items = []
+        for k in sorted(params):
+            if k.split("__")[-1] in IGNORED_PARAMS:
+                continue
+            v = params[k]
+            items.append((k, type(v).__name__ if hasattr(v, "get_params") else v))
+        cls = type(self.estimator)
+        return f"{cls.__module__}.{cls.__name__}{items!r}{sorted(self.eval_kwargs.items())!r}"
+
+
+def default_specs(random_state: int = 42) -> list:
+    """
+    The lecture4 model line-up.
+
+    Ridge is specified as ``RidgeCV`` over the notebook's alpha grid; RidgeCV refits on the whole
+    training set with the best alpha, which gives the notebook's ``Ridge(alpha=best_alpha)``.
+    """
+    from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+    from sklearn.linear_model import ElasticNet, Lasso, LinearRegression, RidgeCV
+
+    return [
+        ModelSpec("OLS", LinearRegression(), "linear"),
+        ModelSpec("Lasso(alpha=0.005)", Lasso(alpha=0.005, max_iter=5000, random_state=random_state), "linear"),
+        ModelSpec("Ridge", RidgeCV(alphas=np.logspace(-4, 4, 50)), "linear"),
+        ModelSpec("ElasticNet(alpha=0.001, l1_ratio=0.5)",
+                  ElasticNet(alpha=0.001, l1_ratio=0.5, max_iter=10000, random_state=random_state), "linear"),
+        ModelSpec("RandomForest(n=600)",
+                  RandomForestRegressor(n_estimators=600, criterion="absolute_error", max_depth=8,
+                                        min_samples_leaf=8, min_samples_split=8, max_features=0.5,
+                                        bootstrap=True, max_samples=0.8, oob_score=True, n_jobs=-1,
+                                        random_state=random_state), "tree"),
+        ModelSpec("GradientBoosting(n=1000)",
+                  GradientBoostingRegressor(n_estimators=1000, learning_rate=0.02, max_depth=3,
+                                            min_samples_leaf=8, subsample=0.8, max_features=None,
+                                            validation_fraction=0.2, n_iter_no_change=50,
+                                            random_state=random_state), "tree"),
+    ]
+
+
+def fingerprint(*arrays) -> str:
+    """sha1 over shape, dtype and bytes of every array (DataFrames/Series via ``to_numpy``)."""
+    h = hashlib.sha1()
+    for a in arrays:
+        a = np.ascontiguousarray(a.to_numpy() if hasattr(a, "to_numpy") else np.asarray(a))
+        h.update(f"{a.shape}{a.dtype.str}".encode())
+        if a.dtype == object:
+            h.update(pickle.dumps(a.tolist(), protocol=4))
+        else:
+            h.update(a.view(np.uint8).reshape(-1).data)
+    return h.hexdigest()
+
+
+def cache_key(spec: ModelSpec, data_fingerprint: str) -> str:
+    return hashlib.sha1(f"{data_fingerprint}|{spec.params_key()}".encode()).hexdigest()
+
+
+def _load_cached(cache_dir, key):
+    if not cache_dir:
+        return None
+    path = os.path.join(cache_dir, key + ".pkl")
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None  # unreadable entry: refit and overwrite
+
+
+def _store_cached(cache_dir, key, result):
+    if not cache_dir:
+        return
+    path = os.path.join(cache_dir, key + ".pkl")
+    with open(path + ".tmp", "wb") as f:
+        pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + ".tmp", path)
+
+
+_worker_data = None
+
+
+def _init_worker(feature_sets, y_train, y_test):
+    global _worker_data
+    _worker_data = (feature_sets, y_train, y_test)
+
+
+def _evaluate_spec(spec: ModelSpec):
+    from sklearn.base import clone
+
+    feature_sets, y_train, y_test = _worker_data
+    X_train, X_test = feature_sets[spec.features]
+    t0 = time.perf_counter()
+    result = evaluate_model(clone(spec.estimator), X_train, y_train, X_test, y_test, **spec.eval_kwargs)
+    return result, time.perf_counter() - t0
+
+
+def run_model_zoo(specs, feature_sets: dict, y_train, y_test, n_workers=None, cache_dir=None):
+    """
+    Evaluate every spec with ``evaluate_model`` and return ``(all_result_df, results)``.
+
+    feature_sets: ``{name: (X_train, X_test)}``; each spec uses ``feature_sets[spec.features]``
+    n_workers: processes to use (default: one per spec, capped at the core count); 1 runs serially
+    cache_dir: directory holding one pickle per (data fingerprint, hyper-parameters); ``None`` disables caching
+
+    ``all_result_df`` has the notebook's metric columns and ``Model``, plus ``eval_time_sec``
+    (fit + predict + metrics, 0 when cached), ``cached`` and the cache ``key``; the total wall time
+    is in ``all_result_df.attrs["wall_time_sec"]``.  ``results`` maps the spec name to the full
+    ``evaluate_model`` dict (fitted model, predictions, DM-ready errors).
+
+    Models that parallelize internally (``n_jobs=-1``) compete with the other workers for cores;
+    lower ``n_workers`` or their ``n_jobs`` if the machine is oversubscribed.
+    """
+    t_start = time.perf_counter()
+    names = [spec.name for spec in specs]
+    if len(set(names)) != len(names):
+        raise ValueError("model spec names must be unique")
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+
+    y_fp = fingerprint(y_train, y_test)
+    data_fp = {name: fingerprint(X_train, X_test) + y_fp for name, (X_train, X_test) in feature_sets.items()}
+
+    results, timing, keys, todo = dict(), dict(), dict(), []
+    for spec in specs:
+        keys[spec.name] = key = cache_key(spec, data_fp[spec.features])
+        cached = _load_cached(cache_dir, key)
+        if cached is not None:
+            results[spec.name] = cached
+            timing[spec.name] = 0.0
+        else:
+            todo.append(spec)
+
+    if todo:
+        workers = min(len(todo), n_workers or os.cpu_count() or 1)
+        if workers == 1:
+            _init_worker(feature_sets, y_train, y_test)
+            outputs = ((spec, _evaluate_spec(spec)) for spec in todo)
+        else:
+            pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(feature_sets, y_train, y_test))
+            futures = {pool.submit(_evaluate_spec, spec): spec for spec in todo}
+            outputs = ((futures[f], f.result()) for f in as_completed(futures))
+        try:
+            for spec, (result, elapsed) in outputs:
+                results[spec.name] = result
+                timing[spec.name] = elapsed
+                _store_cached(cache_dir, keys[spec.name], result)  # saved as each model finishes
+        finally:
+            if workers > 1:
+                pool.shutdown()
+
+    rows = []
+    for spec in specs:
+        row = dict(results[spec.name]["metrics"])
+        row.update(Model=spec.name, eval_time_sec=timing[spec.name], cached=spec not in todo,
+                   key=keys[spec.name])
+        rows.append(row)
+    all_result_df = pd.DataFrame(rows, columns=list(METRIC_COLUMNS) + ["Model", "eval_time_sec", "cached", "key"])
+    all_result_df.attrs["wall_time_sec"] = time.perf_counter() - t_start
+    return all_result_df, results
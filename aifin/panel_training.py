@@ -0,0 +1,349 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+# @Filename: panel_training
+# @Date: 2026/10/17
+# @Author: Mark Wang
+# @Email: wangyouan@xmu.edu.cn
+
+"""
+Out-of-core training of the lecture4 return-prediction models on a stock-month panel.
+
+``evaluate_model`` in lecture4_simple_algorithms_for_stock_return_prediction needs the whole
+``X_train_linear`` / ``X_train_tree`` matrix in memory.  That is fine for one stock, but a
+Gu-Kelly-Xiu style panel (millions of stock-months, about a hundred characteristics) does not fit.
+This module keeps the panel on disk and streams it:
+
+* ``MonthStore`` writes the panel (a DataFrame or an iterable of chunks, e.g. from
+  ``aifin.pit_join``) as one float32 feature matrix, one target vector and one id vector per month,
+  all memory-mapped,
+* each month's cross-section is standardized when it is read: 'zscore' (cross-sectional mean / std),
+  'rank' (cross-sectional ranks scaled to [-1, 1], as in Gu, Kelly and Xiu) or 'none'.  Missing
+  characteristics become the cross-sectional median (0 after 'zscore' / 'rank'), so there is no
+  imputer to fit,
+* ``fit_panel`` feeds month batches to any estimator with ``partial_fit`` (``SGDRegressor``,
+  ``MLPRegressor``, or ``MiniBatchBoosting``: gradient boosting where every stage is fitted on one
+  streamed batch),
+* ``evaluate_panel`` returns the ``evaluate_model`` result: RMSE, MAE, hit ratio and R^2_OOS
+  pooled over all test stock-months, and the Sharpe ratio of the monthly sign-strategy return
+  (cross-sectional mean of sign(y_pred) * y).
+
+Typical use::
+
+    from sklearn.linear_model import SGDRegressor
+    from aifin.panel_training import MonthStore, evaluate_panel
+    store = MonthStore("data/gkx_panel").write(pit_chunks, feature_cols=X_cols, target="excess_ret_fwd1")
+    months = store.months
+    result = evaluate_panel(SGDRegressor(penalty="elasticnet", alpha=1e-4), store,
+                            train_months=[m for m in months if m <= "2018-12"],
+                            test_months=[m for m in months if m >= "2019-01"], epochs=3)
+    result["metrics"]
+"""
+
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from aifin.model_zoo import prediction_metrics, sharpe_ratio
+
+TRANSFORMS = ("zscore", "rank", "none")
+STORE_VERSION = 1
+
+
+def _month_label(dates) -> np.ndarray:
+    """'YYYY-MM' label of every date."""
+    return pd.to_datetime(pd.Series(dates)).dt.strftime("%Y-%m").to_numpy()
+
+
+def standardize_month(X: np.ndarray, transform: str = "zscore") -> np.ndarray:
+    """
+    Cross-sectional transform of one month's float32 characteristics (rows = stocks).
+
+    'zscore': (x - mean) / std per column, 'rank': ranks mapped to [-1, 1] (ties get their average
+    rank, so equal values map to the same number), 'none': raw values;
+    missing values become the cross-sectional median (0 for 'zscore' / 'rank'), columns that are
+    all missing become 0.
+    """
+    X = np.array(X, dtype=np.float32)
+    missing = ~np.isfinite(X)
+    if transform == "zscore":
+        X[missing] = np.nan
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.nanmean(X, axis=0, dtype=np.float64) if len(X) else np.zeros(X.shape[1])
+            std = np.nanstd(X, axis=0, dtype=np.float64) if len(X) else np.ones(X.shape[1])
+        std = np.where(np.isfinite(std) & (std > 0), std, 1.0)
+        mean = np.where(np.isfinite(mean), mean, 0.0)
+        X -= mean.astype(np.float32)
+        X /= std.astype(np.float32)
+        X[missing] = 0.0
+    elif transform == "rank":
+        from scipy.stats import rankdata
+
+        X[missing] = np.inf  # ranked last, then overwritten
+        ranks = (rankdata(X, method="average", axis=0) - 1.0).astype(np.float32)
+        count = (~missing).sum(axis=0).astype(np.float32)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            X = np.where(count > 1, 2.0 * ranks / np.maximum(count - 1, 1) - 1.0, 0.0).astype(np.float32)
+        X[missing] = 0.0
+    elif transform == "none":
+        X[missing] = np.nan
+        with np.errstate(invalid="ignore"):
+            median = np.nanmedian(X, axis=0) if len(X) else np.zeros(X.shape[1])
+        median = np.where(np.isfinite(median), median, 0.0).astype(np.float32)
+        X = np.where(missing, median, X)
+    else:
+        raise ValueError(f"transform must be one of {TRANSFORMS}")
+    return X
+
+
+class MonthStore(object):
+    """
+    Month-partitioned float32 panel on disk: ``<path>/<YYYY-MM>/{X,y,id}.npy`` plus ``meta.json``.
+
+    Writing accepts chunks in any order (e.g. PERMNO chunks); rows are appended to per-month shards
+    that are merged into one file per month at the end, so memory stays at one chunk.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._meta = None
+
+    @property
+    def meta(self) -> dict:
+        if self._meta is None:
+            with open(os.path.join(self.path, "meta.json")) as f:
+                self._meta = json.load(f)
+        return self._meta
+
+    @property
+    def months(self) -> list:
+        return list(self.meta["months"])
+
+    @property
+    def feature_cols(self) -> list:
+        return list(self.meta["feature_cols"])
+
+    def n_rows(self, months=None) -> int:
+        rows = self.meta["rows"]
+        return int(sum(rows[m] for m in (self.months if months is None else months)))
+
+    def write(self, chunks, feature_cols, target: str = "excess_ret_fwd1", date_col: str = "date_m",
+              id_col: str = "permno"):
+        """
+        Write ``chunks`` (a DataFrame or an iterable of DataFrames) into the store, replacing it.
+
+        Rows with a missing target are skipped; missing characteristics are kept as NaN.
+        """
+        self._check_replaceable()
+        if isinstance(chunks, pd.DataFrame):
+            chunks = [chunks]
+        feature_cols = list(feature_cols)
+        tmp = f"{self.path}.tmp{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        shards = dict()
+        for n, chunk in enumerate(chunks):
+            y = pd.to_numeric(chunk[target], errors="coerce").to_numpy(dtype=np.float32, na_value=np.nan)
+            keep = np.isfinite(y)
+            if not keep.any():
+                continue
+            X = chunk[feature_cols].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float32,
+                                                                                      na_value=np.nan)[keep]
+            ids = chunk[id_col].to_numpy()[keep].astype(np.int64)
+            label = _month_label(chunk[date_col])[keep]
+            order = np.argsort(label, kind="stable")
+            label, X, y, ids = label[order], X[order], y[keep][order], ids[order]
+            bounds = np.flatnonzero(np.r_[True, label[1:] != label[:-1], True])
+            for bgn, end in zip(bounds[:-1], bounds[1:]):
+                month = label[bgn]
+                folder = os.path.join(tmp, month)
+                os.makedirs(folder, exist_ok=True)
+                for name, arr in (("X", X[bgn:end]), ("y", y[bgn:end]), ("id", ids[bgn:end])):
+                    np.save(os.path.join(folder, f"{name}-{n:06d}.npy"), arr)
+                shards.setdefault(month, []).append(n)
+
+        rows = dict()
+        for month, parts in shards.items():
+            folder = os.path.join(tmp, month)
+            for name in ("X", "y", "id"):
+                files = [os.path.join(folder, f"{name}-{n:06d}.npy") for n in parts]
+                np.save(os.path.join(folder, f"{name}.npy"), np.concatenate([np.load(f) for f in files]))
+                for f in files:
+                    os.remove(f)
+            rows[month] = int(len(np.load(os.path.join(folder, "y.npy"), mmap_mode="r")))
+        meta = {"version": STORE_VERSION, "feature_cols": feature_cols, "target": target,
+                "months": sorted(rows), "rows": rows}
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.replace(tmp, self.path)
+        self._meta = None
+        return self
+
+    def _check_replaceable(self):
+        # only an empty directory or an earlier store may be replaced
+        if not os.path.exists(self.path):
+            return
+        if os.path.isdir(self.path):
+            if not os.listdir(self.path):
+                return
+            try:
+                with open(os.path.join(self.path, "meta.json")) as f:
+                    if "version" in json.load(f):
+                        return
+            except (OSError, ValueError):
+                pass
+        raise FileExistsError(f"{self.path} exists and is not a MonthStore; refusing to replace it")
+
+    def load_month(self, month: str, transform: str = "zscore"):
+        """(X float32 transformed, y float32, ids) of one month."""
+        folder = os.path.join(self.path, month)
+        X = np.load(os.path.join(folder, "X.npy"), mmap_mode="r")
+        y = np.load(os.path.join(folder, "y.npy"), mmap_mode="r")
+        ids = np.load(os.path.join(folder, "id.npy"), mmap_mode="r")
+        return standardize_month(X, transform), np.asarray(y), np.asarray(ids)
+
+    def iter_batches(self, months, transform: str = "zscore", batch_months: int = 1, shuffle: bool = False,
+                     seed=None):
+        """Yield (X, y) batches of ``batch_months`` consecutive (or shuffled) months."""
+        months = list(months)
+        if shuffle:
+            months = [months[i] for i in np.random.default_rng(seed).permutation(len(months))]
+        for bgn in range(0, len(months), batch_months):
+            parts = [self.load_month(m, transform)[:2] for m in months[bgn:bgn + batch_months]]
+            if len(parts) == 1:
+                yield parts[0]
+            else:
+                yield np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+
+class MiniBatchBoosting(object):
+    """
+    Gradient-boosted regression trees fitted from streamed batches (squared loss).
+
+    Every ``partial_fit`` call adds ``trees_per_batch`` trees, each fitted to the current residuals
+    of that batch only, so the training data never has to be in memory at once.  This is stochastic
+    gradient boosting (Friedman, 2002) with the subsample drawn by the stream rather than at random.
+    """
+
+    def __init__(self, learning_rate: float = 0.05, max_depth: int = 3, min_samples_leaf: int = 100,
+                 trees_per_batch: int = 1, max_trees=None, random_state=None):
+        self.learning_rate = learning_rate
+        self.max_depth = max_depth
+        self.min_samples_leaf = min_samples_leaf
+        self.trees_per_batch = trees_per_batch
+        self.max_trees = max_trees
+        self.random_state = random_state
+        self.init_ = None
+        self.estimators_ = []
+        self._y_sum = 0.0
+        self._y_count = 0
+
+    def get_params(self, deep=True):
+        return {"learning_rate": self.learning_rate, "max_depth": self.max_depth,
+                "min_samples_leaf": self.min_samples_leaf, "trees_per_batch": self.trees_per_batch,
+                "max_trees": self.max_trees, "random_state": self.random_state}
+
+    def set_params(self, **params):
+        for key, value in params.items():
+            setattr(self, key, value)
+        return self
+
+    def partial_fit(self, X, y):
+        from sklearn.tree import DecisionTreeRegressor
+
+        y = np.asarray(y, dtype=np.float64)
+        if self.init_ is None:
+            self.init_ = float(np.mean(y)) if len(y) else 0.0
+        if self.max_trees is not None and len(self.estimators_) >= self.max_trees:
+            return self
+        residual = y - self.predict(X)
+        for _ in range(self.trees_per_batch):
+            seed = None if self.random_state is None else self.random_state + len(self.estimators_)
+            tree = DecisionTreeRegressor(max_depth=self.max_depth, min_samples_leaf=self.min_samples_leaf,
+                                         random_state=seed)
+            tree.fit(X, residual)
+            self.estimators_.append(tree)
+            residual -= self.learning_rate * tree.predict(X)
+        return self
+
+    def fit(self, X, y):
+        self.init_ = None
+        self.estimators_ = []
+        return self.partial_fit(X, y)
+
+    def predict(self, X) -> np.ndarray:
+        out = np.full(len(X), 0.0 if self.init_ is None else self.init_)
+        for tree in self.estimators_:
+            out += self.learning_rate * tree.predict(X)
+        return out
+
+
+def fit_panel(estimator, store: MonthStore, months, transform: str = "zscore", epochs: int = 1,
+              batch_months: int = 1, shuffle: bool = True, seed: int = 42, verbose: bool = False):
+    """
+    Train ``estimator`` with ``partial_fit`` on month batches of ``months``.
+
+    Each epoch visits every month once (in random order when ``shuffle``); returns the estimator.
+    """
+    if not hasattr(estimator, "partial_fit"):
+        raise TypeError(f"{type(estimator).__name__} has no partial_fit; use an incremental estimator")
+    for epoch in range(epochs):
+        t0 = time.perf_counter()
+        n = 0
+        for X, y in store.iter_batches(months, transform, batch_months, shuffle, seed + epoch):
+            estimator.partial_fit(X, y)
+            n += len(y)
+        if verbose:
+            print(f"epoch {epoch}: {n} rows in {time.perf_counter() - t0:.1f}s")
+    return estimator
+
+
+def predict_panel(estimator, store: MonthStore, months, transform: str = "zscore") -> pd.DataFrame:
+    """Predictions for ``months``: DataFrame with month, id, y and y_pred (one row per stock-month)."""
+    frames = []
+    for month in months:
+        X, y, ids = store.load_month(month, transform)
+        frames.append(pd.DataFrame({"month": month, "id": ids, "y": y.astype(np.float64),
+                                    "y_pred": np.asarray(estimator.predict(X), dtype=np.float64)}))
+    if not frames:
+        return pd.DataFrame(columns=["month", "id", "y", "y_pred"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def evaluate_panel(estimator, store: MonthStore, train_months, test_months, *, transform: str = "zscore",
+                   epochs: int = 1, batch_months: int = 1, shuffle: bool = True, seed: int = 42,
+                   loss: str = "squared", annualize: bool = True, periods_per_year: int = 12,
+                   verbose: bool = False):
+    """
+    Panel counterpart of ``evaluate_model``: stream-fit on ``train_months``, predict ``test_months``.
+
+    Returns the ``evaluate_model`` dict (metrics, DM-ready arrays, ``fitted_model``) plus
+    ``predictions`` (month, id, y, y_pred) and ``strategy_returns`` (by month).  RMSE, MAE, hit ratio
+    and R2_OOS are pooled over all stock-months; the Sharpe ratios are those of the monthly return
+    of the sign strategy, the cross-sectional mean of sign(y_pred) * y in each month.
+    """
+    t0 = time.perf_counter()
+    fit_panel(estimator, store, train_months, transform, epochs, batch_months, shuffle, seed, verbose)
+    fit_time_sec = time.perf_counter() - t0
+    predictions = predict_panel(estimator, store, test_months, transform)
+    result = prediction_metrics(predictions["y"].to_numpy(), predictions["y_pred"].to_numpy(), fit_time_sec,
+                                loss=loss, annualize=annualize, periods_per_year=periods_per_year)
+    strat_ret = sign_strategy_returns(predictions)
+    sharpe_m, sharpe_a = sharpe_ratio(strat_ret.to_numpy(), annualize, periods_per_year)
+    result["metrics"].update(sharpe_monthly=sharpe_m, sharpe_annualized=sharpe_a)
+    result["fitted_model"] = estimator
+    result["predictions"] = predictions
+    result["strategy_returns"] = strat_ret
+    return result
+
+
+def sign_strategy_returns(predictions: pd.DataFrame) -> pd.Series:
+    """Monthly return of the sign strategy: mean of sign(y_pred) * y over the stocks of each month."""
+    valid = predictions[np.isfinite(predictions["y"]) & np.isfinite(predictions["y_pred"])]
+    ret = np.sign(valid["y_pred"]) * valid["y"]
+    return ret.groupby(valid["month"]).mean()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+# @Filename: pit_join
+# @Date: 2026/10/17
+# @Author: Mark Wang
+# @Email: wangyouan@xmu.edu.cn
+
+"""
+Point-in-time CRSP / Compustat join for the whole cross-section.
+
+lecture4_simple_algorithms_for_stock_return_prediction builds ``merged_all`` for MSFT only: it
+normalizes ``date_m``, matches Compustat annual features with ``pd.merge_asof`` on the month (no
+security key) and merges the Fama-French factors.  ``PointInTimeJoin`` does the same for every
+PERMNO:
+
+* Compustat rows become available ``lag_months`` month-ends after ``datadate`` (``avail_date``);
+  ``lag_months=0`` is the notebook's matching on ``date_m``,
+* each CRSP month gets the latest Compustat row of its own firm that is already available.  CRSP
+  PERMNOs are mapped to GVKEYs with the CCM link table (``linkdt`` <= date <= ``linkenddt``), or
+  CRSP carries a ``gvkey`` column,
+* both sides are sorted once into integer (security, month) keys and matched with
+  ``np.searchsorted``, so there is no groupby and no per-security merge,
+* the CRSP panel is processed in chunks of whole PERMNOs (``chunk_rows``), so only one chunk of the
+  wide merged frame exists at a time.  ``build_panel`` can write the chunks to disk in the
+  ``aifin.dataset_cache`` layout.
+
+The output has the ``merged_all`` layout: CRSP columns, ``date_m``, the Compustat columns (plus
+``avail_date``), the factors, ``excess_ret`` and ``excess_ret_fwd1``.  The cleaning steps are the
+notebook's: inf becomes NaN, and returns below -100% or above +500% become NaN.  The forward target
+is the next month of the same PERMNO.  It is NaN when that month is missing, where the notebook's
+``shift(-1)`` would take the next row.
+
+Typical use::
+
+    from aifin.pit_join import build_panel
+    panel = build_panel(crsp_msf, annual_features, ff=ff_factors, link=ccm_link, lag_months=4)
+    paths = build_panel(crsp_msf, annual_features, ff=ff_factors, link=ccm_link, out_dir="data/panel")
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+FF_COLS = ['mktrf', 'smb', 'hml', 'rf', 'cma', 'rmw', 'umd']
+LINK_COLS = ('gvkey', 'lpermno', 'linkdt', 'linkenddt')
+CHUNK_ROWS = 500_000
+RET_BOUNDS = (-1.0, 5.0)  # returns outside are treated as data errors
+NAT_MONTH = -(2 ** 30)  # month number of missing dates (before any real month)
+
+
+def _datetimes(dates) -> pd.Series:
+    dates = pd.Series(dates)
+    return dates if pd.api.types.is_datetime64_any_dtype(dates) else pd.to_datetime(dates)
+
+
+def month_number(dates) -> np.ndarray:
+    """Months since 1970-01 (int64) of datetime-like ``dates``; NaT becomes ``NAT_MONTH``."""
+    d = _datetimes(dates).to_numpy(dtype="datetime64[ns]")
+    months = d.astype("datetime64[M]").astype(np.int64)
+    return np.where(np.isnat(d), NAT_MONTH, months)
+
+
+def month_end(dates) -> pd.Series:
+    """The notebook's ``date_m``: month-end timestamp of every date."""
+    return _datetimes(dates).dt.to_period('M').dt.to_timestamp('M')
+
+
+def _codes(values, categories):
+    """Integer code of every value in ``categories`` (-1 if absent)."""
+    return pd.Index(categories).get_indexer(pd.Index(values))
+
+
+def _take(values, pos: np.ndarray):
+    """Values at ``pos`` with -1 giving a missing value of the column's type."""
+    return pd.api.extensions.take(values, pos, allow_fill=True)
+
+
+class PointInTimeJoin(object):
+    """
+    Compustat (and factor) data prepared once for as-of lookups by CRSP security and month.
+
+    comp: annual features with ``comp_key`` (gvkey) and ``comp_date`` (datadate)
+    ff: monthly factors with a ``date`` column (``FF_COLS`` are kept when present)
+    link: CCM link table with ``LINK_COLS``; already filtered to the wanted link types
+          (e.g. linktype LU/LC, linkprim P/C) so that a PERMNO has one GVKEY at a time.
+          ``linkenddt`` may be missing for an open-ended link
+    lag_months: months after ``datadate`` (at month-end) before a report is used
+    max_age_months: ignore reports that became available more than this many months ago
+    """
+
+    def __init__(self, comp: pd.DataFrame, ff: pd.DataFrame = None, link: pd.DataFrame = None,
+                 lag_months: int = 4, max_age_months=None, comp_key: str = 'gvkey', comp_date: str = 'datadate'):
+        self.comp_key = comp_key
+        self.lag_months = int(lag_months)
+        self.max_age_months = max_age_months
+
+        comp = comp.drop(columns=['date_m'], errors='ignore')
+        avail = month_number(comp[comp_date]).astype(np.int64) + self.lag_months
+        self.keys = pd.Index(pd.unique(comp[comp_key].dropna()))
+        code = _codes(comp[comp_key], self.keys)
+        # last report wins among reports available in the same month (as merge_asof on sorted data)
+        order = np.lexsort((month_number(comp[comp_date]), avail, code))
+        order = order[(code[order] >= 0) & (avail[order] > NAT_MONTH + self.lag_months)]
+        self.comp = comp.iloc[order].reset_index(drop=True)
+        self.comp['avail_date'] = month_end(self.comp[comp_date]) + pd.offsets.MonthEnd(self.lag_months) \
+            if self.lag_months else month_end(self.comp[comp_date])
+        self.comp_code = code[order]
+        self.comp_month = avail[order]
+        self.comp_sort_key = self._key(self.comp_code, self.comp_month)
+
+        self.ff = None
+        if ff is not None:
+            ff_cols = [c for c in FF_COLS if c in ff.columns]
+            month = month_number(ff['date'])
+            order = np.argsort(month, kind='stable')
+            self.ff = ff.iloc[order][ff_cols].reset_index(drop=True)
+            self.ff_month = month[order]
+
+        self.link_sort_key = None
+        if link is not None:
+            missing = [c for c in LINK_COLS if c not in link.columns]
+            if missing:
+                raise KeyError(f"link table lacks {missing}")
+            link = link[link['lpermno'].notna()]
+            permno = link['lpermno'].to_numpy(dtype=np.int64)
+            start = month_number(link['linkdt'])
+            end = month_number(link['linkenddt'].fillna(pd.Timestamp.max.normalize()))
+            order = np.lexsort((start, permno))
+            self.link_permno = permno[order]
+            self.link_start = start[order]
+            self.link_end = end[order]
+            self.link_code = _codes(link['gvkey'].to_numpy()[order], self.keys)
+            self.link_sort_key = self._key(self.link_permno, self.link_start)
+
+    @staticmethod
+    def _key(code, month):
+        # security code in the high bits, month (offset to be non-negative) in the low 32 bits
+        return (code.astype(np.int64) << 32) + (month.astype(np.int64) + (1 << 31))
+
+    def _link_codes(self, permno: np.ndarray, month: np.ndarray) -> np.ndarray:
+        """GVKEY code of every (permno, month) from the link table (-1 when unlinked)."""
+        # last link of the permno starting at or before the month, then check its end
+        pos = np.searchsorted(self.link_sort_key, self._key(permno, month), side='right') - 1
+        safe = np.maximum(pos, 0)
+        ok = (pos >= 0) & (self.link_permno[safe] == permno) & (month <= self.link_end[safe])
+        return np.where(ok, self.link_code[safe], -1)
+
+    def join(self, crsp: pd.DataFrame, permno_col: str = 'permno', date_col: str = 'date') -> pd.DataFrame:
+        """
+        ``merged_all`` rows for ``crsp`` (one chunk; must hold whole PERMNOs sorted by date for the
+        forward target to be complete).
+        """
+        crsp = crsp.drop(columns=['date_m'], errors='ignore').reset_index(drop=True)
+        month = month_number(crsp[date_col])
+        if self.link_sort_key is not None:
+            code = self._link_codes(crsp[permno_col].to_numpy(dtype=np.int64), month)
+        elif self.comp_key in crsp.columns:
+            code = _codes(crsp[self.comp_key], self.keys)
+        else:
+            raise ValueError(f"pass a link table or a '{self.comp_key}' column in crsp")
+
+        # as-of: last Compustat row of the same firm available at or before the month
+        pos = np.searchsorted(self.comp_sort_key, self._key(np.maximum(code, 0), month), side='right') - 1
+        safe = np.maximum(pos, 0)
+        ok = (code >= 0) & (pos >= 0) & (self.comp_code[safe] == code)
+        if self.max_age_months is not None:
+            ok &= month - self.comp_month[safe] <= self.max_age_months
+        pos = np.where(ok, pos, -1)
+
+        out = dict()
+        for col in crsp.columns:
+            out[col] = crsp[col].array
+        out['date_m'] = month_end(crsp[date_col]).to_numpy()
+        if self.comp_key not in out:
+            # the firm of the row, also before its first report is available (as merge_asof by key)
+            out[self.comp_key] = _take(self.keys.array, code)
+        for col in self.comp.columns:
+            if col in out:
+                continue
+            out[col] = _take(self.comp[col].array, pos)
+        if self.ff is not None:
+            ff_pos = np.searchsorted(self.ff_month, month, side='left')
+            safe = np.minimum(ff_pos, len(self.ff_month) - 1)
+            ff_pos = np.where((ff_pos < len(self.ff_month)) & (self.ff_month[safe] == month), ff_pos, -1)
+            for col in self.ff.columns:
+                if col not in out:
+                    out[col] = _take(self.ff[col].array, ff_pos)
+        merged = pd.DataFrame(out)
+
+        # notebook cleaning and target
+        numeric = merged.select_dtypes(include=[np.number]).columns
+        merged[numeric] = merged[numeric].replace([np.inf, -np.inf], np.nan)
+        if 'ret' in merged:
+            ret = pd.to_numeric(merged['ret'], errors='coerce')
+            merged['ret'] = ret.where((ret >= RET_BOUNDS[0]) & (ret <= RET_BOUNDS[1]))
+            if 'rf' in merged:
+                merged['excess_ret'] = merged['ret'] - merged['rf']
+                permno = crsp[permno_col].to_numpy()
+                nxt = np.empty(len(merged), dtype=bool)
+                nxt[:-1] = (permno[1:] == permno[:-1]) & (month[1:] == month[:-1] + 1)
+                nxt[-1:] = False
+                fwd = np.full(len(merged), np.nan)
+                fwd[:-1] = merged['excess_ret'].to_numpy(dtype=np.float64, na_value=np.nan)[1:]
+                merged['excess_ret_fwd1'] = np.where(nxt, fwd, np.nan)
+        return merged
+
+    def iter_chunks(self, crsp: pd.DataFrame, chunk_rows: int = CHUNK_ROWS, permno_col: str = 'permno',
+                    date_col: str = 'date'):
+        """Sort ``crsp`` by (permno, date) once and yield the joined chunks of whole PERMNOs."""
+        permno = crsp[permno_col].to_numpy()
+        order = np.lexsort((month_number(crsp[date_col]), permno))
+        permno = permno[order]
+        starts = np.flatnonzero(np.r_[True, permno[1:] != permno[:-1]])
+        bounds = np.r_[starts, len(order)]
+        bgn = 0
+        while bgn < len(order):
+            # extend to the PERMNO boundary at or after bgn + chunk_rows
+            cut = bounds[np.searchsorted(bounds, bgn + max(chunk_rows, 1), side='left')] \
+                if bgn + chunk_rows < len(order) else len(order)
+            yield self.join(crsp.iloc[order[bgn:cut]], permno_col, date_col)
+            bgn = cut
+
+
+def build_panel(crsp: pd.DataFrame, comp: pd.DataFrame, ff: pd.DataFrame = None, link: pd.DataFrame = None,
+                lag_months: int = 4, max_age_months=None, chunk_rows: int = CHUNK_ROWS, out_dir=None,
+                permno_col: str = 'permno', date_col: str = 'date'):
+    """
+    Point-in-time panel of ``crsp`` joined with ``comp`` and ``ff``.
+
+    Returns the concatenated DataFrame, or with ``out_dir`` writes every chunk to
+    ``<out_dir>/part-<n>`` (``aifin.dataset_cache.write_frame``) and returns the paths.
+    """
+    engine = PointInTimeJoin(comp, ff, link, lag_months, max_age_months)
+    chunks = engine.iter_chunks(crsp, chunk_rows, permno_col, date_col)
+    if out_dir is None:
+        return pd.concat(list(chunks), ignore_index=True)
+
+    from aifin import dataset_cache
+
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for i, chunk in enumerate(chunks):
+        paths.append(dataset_cache.write_frame(chunk, os.path.join(out_dir, f"part-{i:05d}"),
+                                               lag_months=lag_months))
+    return paths
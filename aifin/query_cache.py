@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+# @Filename: query_cache
+# @Date: 2026/10/17
+# @Author: Mark Wang
+# @Email: wangyouan@xmu.edu.cn
+
+"""
+Local cache of WRDS / CSMAR query results with incremental date-range fetches.
+
+lecture3, lecture4 and lecture5 pull CRSP ``msf``, ``crsp_a_indexes.msp500``,
+``ff.fivefactors_monthly`` and ``comp.funda`` with ``db.raw_sql`` and ``TRD_Dalyr`` with
+``csmar.query_df``, downloading the whole date range on every run.  ``QueryCache`` stores each
+query's result locally in the columnar layout of ``aifin.dataset_cache``, keyed by the normalized
+query (SQL with comments, case and whitespace normalized, or the CSMAR table / columns / condition),
+and remembers which date ranges it holds.  A request only fetches the sub-ranges that are not
+covered yet, merges them in and returns the requested window, so extending a panel to today costs
+one small query.
+
+Coverage only extends to the latest ``date_col`` value held: the days after it are fetched again on
+the next request, because sources publish with a lag (CRSP / Fama-French month-ends appear weeks
+later) and an empty answer for recent days does not mean there will never be rows for them.  Ranges
+before the latest held date are assumed final; use ``refresh`` or ``invalidate`` after a revision.
+
+The SQL form takes any ``raw_sql(sql, **kwargs) -> DataFrame`` callable: ``db.raw_sql`` of a
+``wrds.Connection``, or ``functools.partial(pd.read_sql_query, con=sqlite3.connect(...))`` to run
+the same queries against a local SQLite copy.  The template marks the date window with ``{start}``
+and ``{end}`` (ISO dates, inclusive).
+
+Typical use::
+
+    from aifin.query_cache import QueryCache
+    cache = QueryCache()  # ~/.cache/aifin/querycache
+    ff_factors = cache.sql(db.raw_sql, '''
+        select date, mktrf, smb, hml, rf, cma, rmw, umd
+        from ff.fivefactors_monthly
+        where date between '{start}' and '{end}'
+    ''', date_col="date", start="1990-01-01", end="2024-12-31")
+    pingan = cache.csmar(csmar.query_df, ['Stkcd', 'Trddt', 'Opnprc', 'Hiprc', 'Loprc', 'Clsprc'],
+                         "Stkcd=000001", 'TRD_Dalyr', '2006-01-01', '2010-12-31', date_col='Trddt')
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+
+import pandas as pd
+
+from aifin import dataset_cache
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "aifin", "querycache")
+ONE_DAY = pd.Timedelta(days=1)
+_SQL_TOKENS = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")|(--[^\n]*|/\*.*?\*/)|(\s+)", re.S)
+
+
+def normalize_sql(sql: str) -> str:
+    """Lower-case ``sql`` and collapse comments / whitespace, leaving quoted literals untouched."""
+    parts = []
+    pos = 0
+    for m in _SQL_TOKENS.finditer(sql):
+        parts.append(sql[pos:m.start()].lower())
+        if m.group(1):
+            parts.append(m.group(1))
+        else:
+            parts.append(" ")
+        pos = m.end()
+    parts.append(sql[pos:].lower())
+    text = re.sub(r" +", " ", "".join(parts)).strip()
+    return re.sub(r" ?([,()=<>]) ?", r"\1", text)
+
+
+def query_key(*parts) -> str:
+    """Cache key (sha1) of the query description ``parts``."""
+    return hashlib.sha1(json.dumps(parts, default=str).encode("utf-8")).hexdigest()
+
+
+def _day(value) -> pd.Timestamp:
+    return pd.Timestamp(value).normalize()
+
+
+def merge_ranges(ranges) -> list:
+    """Union of inclusive (start, end) date ranges, adjacent days joined, in order."""
+    merged = []
+    for bgn, end in sorted((_day(b), _day(e)) for b, e in ranges):
+        if merged and bgn <= merged[-1][1] + ONE_DAY:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([bgn, end])
+    return [(b, e) for b, e in merged]
+
+
+def missing_ranges(covered, start, end) -> list:
+    """Parts of the inclusive range [start, end] not in ``covered`` (list of (start, end))."""
+    start, end = _day(start), _day(end)
+    gaps = []
+    cursor = start
+    for bgn, stop in merge_ranges(covered):
+        if stop < cursor:
+            continue
+        if bgn > end:
+            break
+        if bgn > cursor:
+            gaps.append((cursor, bgn - ONE_DAY))
+        cursor = max(cursor, stop + ONE_DAY)
+    if cursor <= end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+def _clip_ranges(ranges, last) -> list:
+    """``ranges`` cut off after the day of ``last`` (nothing when ``last`` is missing)."""
+    if pd.isna(last):
+        return []
+    last = _day(last)
+    return [(b, min(e, last)) for b, e in merge_ranges(ranges) if b <= last]
+
+
+class QueryCache(object):
+    """
+    Columnar store of query results, one directory per normalized query.
+
+    Every entry keeps its rows sorted by ``date_col`` (stored as datetime64) and the list of date
+    ranges already fetched, up to the latest date held; rows are only ever added for ranges that
+    were missing, so a range up to that date is never downloaded twice until it is invalidated.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or CACHE_DIR
+        self.fetches = []  # (key, start, end, rows) of every remote call, newest last
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def coverage(self, key: str) -> list:
+        """Date ranges held for ``key``."""
+        meta = dataset_cache.frame_meta(self._path(key))
+        return [] if meta is None else [(pd.Timestamp(b), pd.Timestamp(e)) for b, e in meta["coverage"]]
+
+    def _stored(self, key: str):
+        path = self._path(key)
+        return dataset_cache.read_frame(path) if os.path.exists(path) else None
+
+    def _write(self, key, df, coverage, description, date_col):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        df = df.sort_values(date_col, kind="stable").reset_index(drop=True)
+        dataset_cache.write_frame(df, self._path(key), description=description, date_col=date_col,
+                                  coverage=[(b.strftime("%Y-%m-%d"), e.strftime("%Y-%m-%d"))
+                                            for b, e in merge_ranges(coverage)])
+
+    def get(self, key: str, fetch_range, date_col: str, start, end=None, columns=None, description=None,
+            refresh: bool = False) -> pd.DataFrame:
+        """
+        Rows of ``key`` with ``date_col`` in [start, end] (end defaults to today).
+
+        fetch_range: ``fetch_range(start, end) -> DataFrame`` for an inclusive range of ISO dates; it is
+                     called once per missing sub-range
+        columns: columns to return (default: all)
+        refresh: drop what is cached for [start, end] and fetch it again
+        """
+        end = pd.Timestamp.today() if end is None else end
+        start, end = _day(start), _day(end)
+        if refresh:
+            self.invalidate(key, start, end)
+        covered = self.coverage(key)
+        gaps = missing_ranges(covered, start, end)
+        if gaps:
+            frames = []
+            stored = self._stored(key)
+            if stored is not None:
+                frames.append(stored)
+            for bgn, stop in gaps:
+                part = fetch_range(bgn.strftime("%Y-%m-%d"), stop.strftime("%Y-%m-%d"))
+                part = part.copy()
+                part[date_col] = pd.to_datetime(part[date_col])
+                self.fetches.append((key, bgn, stop, len(part)))
+                frames.append(part)
+            frames = [f for f in frames if len(f)] or frames[-1:]
+            df = pd.concat(frames, ignore_index=True)
+            self._write(key, df, _clip_ranges(covered + gaps, df[date_col].max()), description, date_col)
+        result = dataset_cache.read_frame(self._path(key), columns,
+                                          filters=[(date_col, "between", (start, end + ONE_DAY - pd.Timedelta(1)))])
+        return result.reset_index(drop=True)
+
+    def invalidate(self, key: str, start=None, end=None):
+        """Forget the rows and coverage of ``key`` in [start, end] (everything by default)."""
+        path = self._path(key)
+        meta = dataset_cache.frame_meta(path)
+        if meta is None:
+            return
+        if start is None and end is None:
+            shutil.rmtree(path, ignore_errors=True)
+            return
+        date_col = meta["date_col"]
+        start = _day(pd.Timestamp.min if start is None else start)
+        end = _day(pd.Timestamp.max if end is None else end)
+        covered = []
+        for bgn, stop in self.coverage(key):
+            if bgn < start:
+                covered.append((bgn, min(stop, start - ONE_DAY)))
+            if stop > end:
+                covered.append((max(bgn, end + ONE_DAY), stop))
+        df = dataset_cache.read_frame(path)
+        day = df[date_col].dt.normalize()
+        self._write(key, df[(day < start) | (day > end)], covered, meta.get("description"), date_col)
+
+    def sql(self, raw_sql, template: str, date_col: str, start, end=None, columns=None, refresh: bool = False,
+            **kwargs) -> pd.DataFrame:
+        """
+        Cached ``raw_sql(template with {start}/{end} filled in, **kwargs)``.
+
+        The key is the normalized template plus ``kwargs``, so the same query written with different
+        spacing, comments or keyword case shares one entry.
+        """
+        if "{start}" not in template or "{end}" not in template:
+            raise ValueError("the SQL template must contain {start} and {end}")
+        normalized = normalize_sql(template)
+        key = query_key("sql", normalized, sorted(kwargs.items()))
+
+        def fetch_range(bgn, stop):
+            return raw_sql(template.replace("{start}", bgn).replace("{end}", stop), **kwargs)
+
+        return self.get(key, fetch_range, date_col, start, end, columns, normalized, refresh)
+
+    def csmar(self, query_df, columns, condition: str, table: str, start, end=None, date_col: str = "Trddt",
+              refresh: bool = False) -> pd.DataFrame:
+        """Cached ``query_df(columns, condition, table, start, end)`` of the CSMAR client."""
+        key = query_key("csmar", table, list(columns), condition)
+
+        def fetch_range(bgn, stop):
+            return query_df(list(columns), condition, table, bgn, stop)
+
+        description = f"csmar {table} {list(columns)} {condition}"
+        return self.get(key, fetch_range, date_col, start, end, None, description, refresh)
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+# @Filename: rolling_forecast
+# @Date: 2026/10/17
+# @Author: Mark Wang
+# @Email: wangyouan@xmu.edu.cn
+
+"""
+Rolling-window PCA / PLS / sPCA out-of-sample forecaster.
+
+The OOS loop in lecture5_Dimensionality_Reduction_and_Feature_Selection moves a window of
+``train_month_n + test_month_n + oos_month_n`` months forward ``oos_month_n`` months at a time,
+min-max normalizes the window with ``Norm`` and refits ``PCA_method``, ``PLS_method`` and
+``sPCA_method`` from scratch for every component count.  All three methods are linear in the
+centered training data, so every forecast only needs the training cross products
+X'X and X'y:
+
+* the window sums of x, y, xx' and xy are updated by adding the months that enter and
+  subtracting the months that leave the training window;
+* ``Norm`` only rescales each column by its window range (the offset cancels after centering),
+  and the window min/max of all steps come from one sliding-window reduction;
+* PCA and sPCA are one eigen-decomposition of the (weighted) p x p covariance, and the regression
+  on the first k components for every k in the grid is a cumulative sum over components;
+* PLS (one target, ``scale=False``) is the kernel algorithm on X'X and X'y, which gives the
+  coefficients of every component count in one pass.
+
+Independent blocks of window positions run in parallel.  The result is the notebook's
+``Models_pred`` frame (Dates, y, ypca, ypls, yspca, ybar) indexed like ``reg_df``.
+
+Typical use::
+
+    from aifin.rolling_forecast import rolling_forecast
+    Models_pred = rolling_forecast(reg_df, train_month_n=60, test_month_n=12, oos_month_n=3)
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+MODELS = ("pca", "pls", "spca")
+MIN_BLOCK_STEPS = 16  # window positions per parallel block (fewer is not worth a process)
+EIG_TOL = 1e-12  # relative eigenvalue below which a component carries no variance
+
+
+def window_steps(n_months: int, train_month_n: int = 60, test_month_n: int = 12, oos_month_n: int = 3) -> list:
+    """End positions ``i`` visited by the notebook loop (OOS months are ``[i - oos_month_n, i)``)."""
+    return list(range(train_month_n + test_month_n + oos_month_n, n_months, oos_month_n))
+
+
+def pca_coefficients(cov: np.ndarray, cross: np.ndarray, components) -> np.ndarray:
+    """
+    Coefficients (len(components) x p) of OLS on the first k principal components.
+
+    ``cov`` is the centered X'X and ``cross`` the centered X'y of the training window; the
+    regression on orthogonal scores decouples, so the k-component fit is a partial sum.
+    """
+    eigval, eigvec = np.linalg.eigh(cov)
+    eigval, eigvec = eigval[::-1], eigvec[:, ::-1]
+    keep = eigval > EIG_TOL * max(eigval[0], 0.0)
+    gamma = np.where(keep, eigvec.T @ cross / np.where(keep, eigval, 1.0), 0.0)
+    coef = np.cumsum(eigvec * gamma, axis=1).T  # row k-1: first k components
+    return coef[np.asarray(components) - 1]
+
+
+def pls_coefficients(cov: np.ndarray, cross: np.ndarray, components) -> np.ndarray:
+    """
+    Coefficients (len(components) x p) of PLS1 with 1..k components (kernel algorithm).
+
+    Equivalent to ``PLSRegression(n_components=k, scale=False)`` fitted on one target.
+    """
+    p = len(cross)
+    n_comp = max(components)
+    R, P, q = np.zeros((p, n_comp)), np.zeros((p, n_comp)), np.zeros(n_comp)
+    xy = cross.astype(np.float64)
+    for a in range(n_comp):
+        norm = np.linalg.norm(xy)
+        if norm == 0:
+            break  # y is fully explained, later components add nothing
+        w = xy / norm
+        r = w - R[:, :a] @ (P[:, :a].T @ w)
+        tt = r @ cov @ r
+        P[:, a] = cov @ r / tt
+        q[a] = r @ xy / tt
+        R[:, a] = r
+        xy = xy - P[:, a] * (q[a] * tt)
+    coef = np.cumsum(R * q, axis=1).T
+    return coef[np.asarray(components) - 1]
+
+
+class _WindowSums(object):
+    """Sums of x, y, xx' and xy over a range of rows, moved by adding/removing rows."""
+
+    def __init__(self, X: np.ndarray, y: np.ndarray):
+        self.X, self.y = X, y
+        p = X.shape[1]
+        self.lo = self.hi = 0
+        self.sx, self.sy = np.zeros(p), 0.0
+        self.sxx, self.sxy = np.zeros((p, p)), np.zeros(p)
+
+    def _update(self, lo: int, hi: int, sign: float):
+        if hi <= lo:
+            return
+        X, y = self.X[lo:hi], self.y[lo:hi]
+        self.sx += sign * X.sum(axis=0)
+        self.sy += sign * y.sum()
+        self.sxx += sign * (X.T @ X)
+        self.sxy += sign * (X.T @ y)
+
+    def move(self, lo: int, hi: int):
+        if lo >= self.hi or hi <= self.lo:  # no overlap: start over
+            self._update(self.lo, self.hi, -1.0)
+            self._update(lo, hi, 1.0)
+        else:
+            # rows [min(lo, self.lo), max(lo, self.lo)) leave or enter at the front, likewise at the back
+            self._update(min(lo, self.lo), max(lo, self.lo), -1.0 if lo > self.lo else 1.0)
+            self._update(min(hi, self.hi), max(hi, self.hi), 1.0 if hi > self.hi else -1.0)
+        self.lo, self.hi = lo, hi
+
+    def centered(self):
+        """(mean_x, mean_y, centered X'X, centered X'y)."""
+        n = self.hi - self.lo
+        mx, my = self.sx / n, self.sy / n
+        return mx, my, self.sxx - n * np.outer(mx, mx), self.sxy - n * mx * my
+
+
+def _run_block(args):
+    X, y, steps, train_month_n, test_month_n, oos_month_n, components = args
+    total = train_month_n + test_month_n + oos_month_n
+    steps = np.asarray(steps)
+    windows = np.lib.stride_tricks.sliding_window_view(X, total, axis=0)[steps - total]
+    col_range = windows.max(axis=-1) - windows.min(axis=-1)
+    col_range[col_range == 0] = 1.0  # Norm leaves constant columns untouched
+
+    sums = _WindowSums(X, y)
+    preds = np.empty((len(steps), oos_month_n, len(MODELS)))
+    ybar = np.empty(len(steps))
+    selected = np.empty((len(steps), len(MODELS)), dtype=np.int64)
+    for s, i in enumerate(steps):
+        train_lo = i - total
+        test_lo = train_lo + train_month_n
+        oos_lo = test_lo + test_month_n
+        sums.move(train_lo, test_lo)
+        mx, my, cov, cross = sums.centered()
+
+        # Normalized space: each column divided by its window range
+        scale = col_range[s]
+        cov = cov / np.outer(scale, scale)
+        cross = cross / scale
+        X_test = (X[test_lo:oos_lo] - mx) / scale
+        X_oos = (X[oos_lo:i] - mx) / scale
+        y_test = y[test_lo:oos_lo]
+
+        # sPCA: each predictor weighted by its univariate slope on y
+        var = np.diag(cov)
+        slope = np.divide(cross, var, out=np.zeros_like(cross), where=var > 0)
+        coefs = (pca_coefficients(cov, cross, components),
+                 pls_coefficients(cov, cross, components),
+                 pca_coefficients(cov * np.outer(slope, slope), cross * slope, components) * slope)
+        for m, coef in enumerate(coefs):
+            test_hat = my + X_test @ coef.T  # n_test x n_components
+            r2 = 1 - ((y_test[:, None] - test_hat) ** 2).sum(axis=0) / (y_test ** 2).sum()
+            best = int(np.argmax(r2))
+            selected[s, m] = components[best]
+            preds[s, :, m] = my + X_oos @ coef[best]
+        ybar[s] = y[train_lo:oos_lo].mean()
+    return preds, ybar, selected
+
+
+def rolling_forecast(reg_df: pd.DataFrame, x_cols=None, train_month_n: int = 60, test_month_n: int = 12,
+                     oos_month_n: int = 3, components=range(1, 9), n_workers=None, return_selected: bool = False):
+    """
+    Run the lecture5 rolling OOS loop and return ``Models_pred``.
+
+    reg_df: monthly rows in date order with ``Dates``, ``y`` and the predictors
+    x_cols: predictor columns (default: every column except ``Dates`` and ``y``)
+    components: grid of component counts; the count with the best test-window R^2 (against a zero
+                forecast, as in the notebook) is used for the OOS months
+    n_workers: processes for the blocks of window positions (default: all cores); 1 runs serially
+    return_selected: also return the chosen component count of every model at every step
+
+    Each window is normalized with the notebook's ``Norm`` (min-max over the whole window,
+    including its OOS months), so the forecasts match the notebook loop.
+    """
+    if x_cols is None:
+        x_cols = [c for c in reg_df.columns if c not in ("Dates", "y")]
+    components = [int(k) for k in components]
+    if not components or min(components) < 1 or max(components) > len(x_cols):
+        raise ValueError(f"component counts must lie in 1..{len(x_cols)}")
+
+    X = reg_df[x_cols].to_numpy(dtype=np.float64)
+    y = reg_df["y"].to_numpy(dtype=np.float64)
+    X = X - X.mean(axis=0)  # a common shift keeps the running sums well conditioned
+    steps = window_steps(len(reg_df), train_month_n, test_month_n, oos_month_n)
+    columns = ["Dates", "y"] + [f"y{m}" for m in MODELS] + ["ybar"]
+    if not steps:
+        empty = pd.DataFrame(columns=columns)
+        return (empty, pd.DataFrame(columns=list(MODELS))) if return_selected else empty
+
+    n_blocks = max(1, min(n_workers or os.cpu_count() or 1, len(steps) // MIN_BLOCK_STEPS))
+    jobs = [(X, y, block.tolist(), train_month_n, test_month_n, oos_month_n, components)
+            for block in np.array_split(np.asarray(steps), n_blocks)]
+    if n_blocks == 1:
+        outputs = list(map(_run_block, jobs))
+    else:
+        with ProcessPoolExecutor(n_blocks) as pool:
+            outputs = list(pool.map(_run_block, jobs))
+    preds = np.concatenate([o[0] for o in outputs])
+    ybar = np.concatenate([o[1] for o in outputs])
+    selected = np.concatenate([o[2] for o in outputs])
+
+    rows = np.concatenate([np.arange(i - oos_month_n, i) for i in steps])
+    Models_pred = reg_df[["Dates", "y"]].iloc[rows].copy()
+    for m, model in enumerate(MODELS):
+        Models_pred[f"y{model}"] = preds[:, :, m].reshape(-1)
+    Models_pred["ybar"] = np.repeat(ybar, oos_month_n)
+    if return_selected:
+        first_oos = reg_df["Dates"].iloc[[i - oos_month_n for i in steps]].to_numpy()
+        return Models_pred, pd.DataFrame(selected, index=first_oos, columns=list(MODELS))
+    return Models_pred
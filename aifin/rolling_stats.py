@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+# @Filename: rolling_stats
+# @Date: 2026/10/17
+# @Author: Mark Wang
+# @Email: wangyouan@xmu.edu.cn
+
+"""
+Vectorized rolling statistics for return series and return panels.
+
+lecture3_financial_data_acquisition_and_analysis computes the 22-day volatility of every index
+return with ``rolling(window=22).apply(compute_volatility)``, i.e. one Python call per window and
+column.  ``rolling_stats`` computes several statistics for many columns and window lengths at once
+without any per-window Python code:
+
+* mean / vol / zscore from window sums of x and x^2 (differences of cumulative sums, with the
+  data centered first so the sums stay small),
+* momentum (compounded return over the window) from cumulative sums of log(1 + r); a window
+  with a -100% return (e.g. a CRSP delisting return) is -1 and one with a return below -100% is
+  NaN, counted separately so that they do not spoil the sums of later windows,
+* min / max from ``scipy.ndimage`` running filters (van Herk / Gil-Werman, O(1) per element).
+
+With ``group`` (e.g. 'PERMNO') the frame is treated as a panel: rows are ordered by group (and
+``sort_by`` within a group) and a window never spans two groups.  As with ``pandas.rolling``
+(``min_periods`` = window), a statistic is NaN until a full window is available and for every
+window that contains a missing value.
+
+Typical use::
+
+    from aifin.rolling_stats import rolling_stats
+    vol = rolling_stats(sp500_ret, ["ewretx", "vwretx", "sprtrn"], windows=(22,), stats=("vol",))
+    crsp = crsp.join(rolling_stats(crsp, ["ret"], windows=(22, 63, 252), group="PERMNO", sort_by="date"))
+"""
+
+import numpy as np
+import pandas as pd
+
+STATS = ("mean", "vol", "min", "max", "momentum", "zscore")
+PERIODS_PER_YEAR = 252
+
+
+def _window_sum(cs: np.ndarray, window: int) -> np.ndarray:
+    """Sum of the last ``window`` rows at every row, from ``cs`` = cumsum with a leading zero row."""
+    out = np.full((len(cs) - 1,) + cs.shape[1:], np.nan)
+    out[window - 1:] = cs[window:] - cs[:-window]
+    return out
+
+
+def _cumsum0(x: np.ndarray) -> np.ndarray:
+    return np.concatenate([np.zeros((1,) + x.shape[1:]), np.cumsum(x, axis=0)])
+
+
+def _running_extreme(x: np.ndarray, window: int, kind: str) -> np.ndarray:
+    """Trailing-window min or max along axis 0 (``x`` must not contain NaN)."""
+    from scipy.ndimage import maximum_filter1d, minimum_filter1d
+
+    func = minimum_filter1d if kind == "min" else maximum_filter1d
+    # the filter is centered; shift its origin so row i covers rows [i - window + 1, i]
+    origin = (window - 1) // 2
+    return func(x, size=window, axis=0, origin=origin, mode="nearest")
+
+
+def rolling_arrays(values: np.ndarray, windows=(22,), stats=STATS, group_start=None,
+                   periods_per_year: int = PERIODS_PER_YEAR) -> dict:
+    """
+    Rolling statistics of a 2-D array (rows = time, columns = series).
+
+    group_start: for a panel stacked by group, the row index where each row's group starts
+                 (windows reaching before it are NaN); ``None`` for a single series
+    Returns ``{(stat, window): array like values}``.
+    """
+    x = np.asarray(values, dtype=np.float64)
+    if x.ndim == 1:
+        x = x[:, None]
+    n = len(x)
+    stats = tuple(stats)
+    unknown = set(stats) - set(STATS)
+    if unknown:
+        raise ValueError(f"unknown statistics: {sorted(unknown)}; choose from {STATS}")
+
+    missing = ~np.isfinite(x)
+    x_clean = np.where(missing, 0.0, x)
+    cs_missing = _cumsum0(missing.astype(np.float64))
+    pos = np.arange(n) if group_start is None else np.arange(n) - np.asarray(group_start)
+
+    need_moments = {"mean", "vol", "zscore"} & set(stats)
+    if need_moments:
+        # center each column so the cumulative sums do not grow with the level of the series
+        center = np.nanmean(np.where(missing, np.nan, x), axis=0) if n else np.zeros(x.shape[1])
+        center = np.where(np.isfinite(center), center, 0.0)
+        xc = np.where(missing, 0.0, x - center)
+        cs1, cs2 = _cumsum0(xc), _cumsum0(xc * xc)
+    if "momentum" in stats:
+        # log1p is -inf at -100% and NaN below: count those rows instead of summing them
+        wiped = x_clean <= -1.0
+        cs_wiped = _cumsum0(wiped.astype(np.float64))
+        cs_below = _cumsum0((x_clean < -1.0).astype(np.float64))
+        cs_log = _cumsum0(np.log1p(np.where(missing | wiped, 0.0, x_clean)))
+
+    results = dict()
+    for window in windows:
+        window = int(window)
+        if n < window:
+            for stat in stats:
+                results[(stat, window)] = np.full(x.shape, np.nan)
+            continue
+        # NaN count in the window (NaN itself for the first window - 1 rows)
+        invalid = (_window_sum(cs_missing, window) != 0) | (pos < window - 1)[:, None]
+
+        if need_moments:
+            s1, s2 = _window_sum(cs1, window), _window_sum(cs2, window)
+            mean_c = s1 / window
+            var = np.maximum(s2 / window - mean_c ** 2, 0.0)  # population variance (ddof=0)
+        for stat in stats:
+            if stat == "mean":
+                out = mean_c + center
+            elif stat == "vol":
+                # as the notebook's compute_volatility: population std * sqrt(periods_per_year / window)
+                out = np.sqrt(var) * np.sqrt(periods_per_year / window)
+            elif stat == "zscore":
+                sd = np.sqrt(var * window / (window - 1)) if window > 1 else np.full(x.shape, np.nan)
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    out = (xc - mean_c) / sd
+            elif stat == "momentum":
+                out = np.expm1(_window_sum(cs_log, window))
+                out = np.where(_window_sum(cs_wiped, window) != 0, -1.0, out)
+                out = np.where(_window_sum(cs_below, window) != 0, np.nan, out)
+            else:
+                fill = np.inf if stat == "min" else -np.inf
+                out = _running_extreme(np.where(missing, fill, x), window, stat)
+            out = np.where(invalid, np.nan, out)
+            results[(stat, window)] = out
+    return results
+
+
+def rolling_stats(df: pd.DataFrame, columns, windows=(22,), stats=STATS, group=None, sort_by=None,
+                  periods_per_year: int = PERIODS_PER_YEAR) -> pd.DataFrame:
+    """
+    Rolling statistics of ``df[columns]`` for every window in ``windows``.
+
+    Returns a DataFrame on ``df``'s index with one column ``<column>_<stat><window>`` per
+    combination (e.g. ``sprtrn_vol22``).  ``group`` / ``sort_by`` name the panel id and the time
+    column; without ``sort_by`` rows are taken in their current order within each group.
+    """
+    columns = [columns] if isinstance(columns, str) else list(columns)
+    windows = tuple(int(w) for w in windows)
+    stats = (stats,) if isinstance(stats, str) else tuple(stats)
+
+    if group is None and sort_by is None:
+        order = None
+        values = df[columns].to_numpy(dtype=np.float64)
+        group_start = None
+    else:
+        keys = [k for k in (group, sort_by) if k is not None]
+        order = np.lexsort([df[k].to_numpy() for k in reversed(keys)])  # stable, last key primary
+        values = df[columns].to_numpy(dtype=np.float64)[order]
+        group_start = None
+        if group is not None:
+            g = df[group].to_numpy()[order]
+            new_group = np.ones(len(g), dtype=bool)
+            new_group[1:] = g[1:] != g[:-1]
+            group_start = np.maximum.accumulate(np.where(new_group, np.arange(len(g)), 0))
+
+    results = rolling_arrays(values, windows, stats, group_start, periods_per_year)
+    out = dict()
+    for window in windows:
+        for stat in stats:
+            arr = results[(stat, window)]
+            if order is not None:
+                restored = np.empty_like(arr)
+                restored[order] = arr
+                arr = restored
+            for j, col in enumerate(columns):
+                out[f"{col}_{stat}{window}"] = arr[:, j]
+    return pd.DataFrame(out, index=df.index)
@@ -0,0 +1,455 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+# @Filename: parser_benchmarks
+# @Date: 2026/10/17
+# @Author: Mark Wang
+# @Email: wangyouan@xmu.edu.cn
+
+"""
+Reproducible benchmarks for the MOD parsers and the lecture6 Item extractors.
+
+The nightly text pipeline depends on ``Generic_Parser.get_data``, ``load_masterdictionary``,
+``read_docdict``, ``MasterIndexRecord``, ``cl_LM10XSummaries`` and the Item 1 / 1A / 7 / 7A
+extractors (``aifin.sections``).  This script runs each of them on the 10-K sample in
+``data/l6/sample10k`` and on synthetic corpora scaled 10x, 100x and 1000x.  It records:
+
+* throughput: docs/s, tokens/s and MB/s (timed around the parser call only; inputs are streamed
+  one document / line at a time so memory does not grow with the scale),
+* peak RSS: every (benchmark, scale) runs in a fresh interpreter, so ``ru_maxrss`` belongs to it,
+* import time: the best of ``IMPORT_REPEATS`` cold imports of each module in a fresh interpreter.
+
+Inputs the repository does not ship are generated once in the work directory from the sample:
+
+* an LM-format master dictionary built from the sample's vocabulary (categories drawn with a
+  fixed seed), unless ``--dictionary`` points to the real CSV,
+* Document Dictionary lines (word counts of every sample filing), master.idx records and
+  LM_10X_Summaries rows.
+
+A scaled corpus cycles through the base inputs ``scale`` times.  The dictionary loads are measured
+at scale 1 only, since the dictionary does not grow with the corpus.  ``--max-seconds`` caps each
+run; the throughput is then computed over the part that was processed (``complete`` is False).
+
+Results can be saved as a baseline and later runs compared against it.  A throughput that is more
+than ``--threshold`` below the baseline, or a peak RSS / import time that is more than
+``--threshold`` above it, is reported as a regression and the script exits with status 1.
+
+Typical use::
+
+    python benchmarks/parser_benchmarks.py --scales 1 10 --save-baseline benchmarks/baseline.json
+    python benchmarks/parser_benchmarks.py --scales 1 10 --baseline benchmarks/baseline.json
+"""
+
+import argparse
+import datetime as dt
+import glob
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MOD_DIR = os.path.join(ROOT, 'MOD')
+SAMPLE_DIR = os.path.join(ROOT, 'data', 'l6', 'sample10k')
+WORK_DIR = os.path.join(tempfile.gettempdir(), 'aifin_parser_benchmarks')
+DEFAULT_SCALES = (1, 10)  # 100 and 1000 are opt-in (--scales 1 10 100 1000)
+MAX_SECONDS = 120.0
+THRESHOLD = 0.10
+IMPORT_REPEATS = 3
+IMPORT_SLACK_SEC = 0.02  # import-time differences below this are noise
+SYNTHETIC_RECORDS = 100_000  # master.idx / Summaries rows at scale 1
+INPUT_VERSION = 1
+SEED = 20241001
+
+IMPORT_MODULES = ('Generic_Parser', 'MOD_Load_MasterDictionary_v2023', 'MOD_Read_DocDict', 'MOD_EDGAR_Pac',
+                  'Class_LM10XSummaries_v2023', 'aifin.sections')
+THROUGHPUT_METRICS = ('docs_per_s', 'tokens_per_s', 'mb_per_s')
+FORMS = ('10-K', '10-K405', '10-Q', '10-K/A', '8-K', 'S-1', 'DEF 14A')
+CATEGORY_RATES = {'negative': 0.03, 'positive': 0.005, 'uncertainty': 0.004, 'litigious': 0.01,
+                  'strong_modal': 0.0003, 'weak_modal': 0.0003, 'constraining': 0.002, 'complexity': 0.0005}
+_WORD_RE = re.compile(r'\b[A-Z][A-Z\-\']*[A-Z]\b')
+
+
+def _set_paths():
+    for path in (ROOT, MOD_DIR):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+
+def sample_files(sample_dir=SAMPLE_DIR) -> list:
+    return sorted(glob.glob(os.path.join(sample_dir, '*.txt')))
+
+
+def _read(path) -> str:
+    with open(path, 'r', encoding='UTF-8', errors='ignore') as f:
+        return f.read()
+
+
+def _syllables(word: str) -> int:
+    return max(1, len(re.findall(r'[AEIOUY]+', word)))
+
+
+# ----------------------------------------------------------------------------------------------
+# Inputs
+# ----------------------------------------------------------------------------------------------
+
+def prepare_inputs(work_dir=WORK_DIR, sample_dir=SAMPLE_DIR, dictionary=None) -> dict:
+    """Create (once) the generated inputs in ``work_dir``; returns their paths."""
+    os.makedirs(work_dir, exist_ok=True)
+    files = sample_files(sample_dir)
+    if not files:
+        raise FileNotFoundError(f'no *.txt filings in {sample_dir}')
+    paths = {'sample_dir': os.path.abspath(sample_dir),
+             'dictionary': os.path.abspath(dictionary) if dictionary else os.path.join(work_dir, 'LM_dictionary.csv'),
+             'docdict': os.path.join(work_dir, 'Doc_Dict_10X.txt'),
+             'masterindex': os.path.join(work_dir, 'master.idx'),
+             'summaries': os.path.join(work_dir, 'LM_10X_Summaries.csv'),
+             'snapshot_dir': os.path.join(work_dir, 'snapshots')}
+    stamp_file = os.path.join(work_dir, 'inputs.json')
+    stamp = {'version': INPUT_VERSION, 'sample': [(os.path.basename(f), os.path.getsize(f)) for f in files],
+             'dictionary': paths['dictionary']}
+    if os.path.exists(stamp_file):
+        with open(stamp_file) as f:
+            if json.load(f) == stamp and all(os.path.exists(paths[k]) for k in
+                                             ('dictionary', 'docdict', 'masterindex', 'summaries')):
+                return paths
+
+    rng = random.Random(SEED)
+    if dictionary is None:
+        vocabulary = dict()
+        for path in files:
+            for word in _WORD_RE.findall(_read(path).upper()):
+                vocabulary[word] = vocabulary.get(word, 0) + 1
+        with open(paths['dictionary'] + '.tmp', 'w') as f:
+            f.write('Word,Seq_num,Word Count,Word Proportion,Average Proportion,Std Dev,Doc Count,Negative,'
+                    'Positive,Uncertainty,Litigious,Strong_Modal,Weak_Modal,Constraining,Complexity,Syllables,'
+                    'Source\n')
+            total = sum(vocabulary.values())
+            for seq, (word, count) in enumerate(sorted(vocabulary.items()), start=1):
+                flags = [2009 if rng.random() < rate else 0 for rate in CATEGORY_RATES.values()]
+                f.write(f'{word},{seq},{count},{count / total:.6e},{count / total:.6e},0,1,'
+                        f'{",".join(map(str, flags))},{_syllables(word)},12of12inf\n')
+        os.replace(paths['dictionary'] + '.tmp', paths['dictionary'])
+
+    _set_paths()
+    import MOD_Load_MasterDictionary_v2023 as LM
+    LM.SNAPSHOT_DIR = paths['snapshot_dir']
+    master_dictionary = LM.load_masterdictionary(paths['dictionary'], use_snapshot=False)
+    seq = {word: entry.sequence_number for word, entry in master_dictionary.items()}
+
+    # Document Dictionary: header|seq:count,... for every sample filing
+    with open(paths['docdict'] + '.tmp', 'w') as f:
+        for i, path in enumerate(files):
+            counts = dict()
+            for word in re.findall(r'\w+', _read(path).upper()):
+                if word in seq:
+                    counts[seq[word]] = counts.get(seq[word], 0) + 1
+            cik = 1000 + i
+            f.write(f'{cik},{20240101 + i % 28},0000{cik}-24-{i:06d},20231231,10-K,COMPANY {i}|'
+                    + ','.join(f'{k}:{v}' for k, v in sorted(counts.items())) + '\n')
+    os.replace(paths['docdict'] + '.tmp', paths['docdict'])
+
+    # master.idx records (cik|name|form|date|path) and LM_10X_Summaries rows
+    with open(paths['masterindex'] + '.tmp', 'w') as f:
+        for i in range(SYNTHETIC_RECORDS):
+            cik = rng.randint(1000, 2_000_000)
+            f.write(f'{cik}|COMPANY {i} INC|{rng.choice(FORMS)}|2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}'
+                    f'|edgar/data/{cik}/0000{cik}-24-{i:06d}.txt\n')
+    os.replace(paths['masterindex'] + '.tmp', paths['masterindex'])
+    with open(paths['summaries'] + '.tmp', 'w') as f:
+        f.write(','.join(['CIK', 'FILING_DATE', 'ACC_NUM', 'CPR', 'FORM_TYPE', 'CoName', 'SIC', 'FFInd',
+                          'N_Words', 'N_Unique', 'N_Negative', 'N_Positive', 'N_Uncertainty', 'N_Litigious',
+                          'N_StrongModal', 'N_WeakModal', 'N_Constraining', 'N_Complexity', 'N_Negation',
+                          'GrossFileSize', 'NetFileSize', 'NonTextDocTypeChars', 'HTMLChars', 'XBRLChars',
+                          'XMLChars', 'N_Exhibits']) + '\n')
+        for i in range(SYNTHETIC_RECORDS):
+            counts = [rng.randint(0, 100_000) for _ in range(11)]
+            sizes = [rng.randint(0, 50_000_000) for _ in range(6)]
+            sic = '' if rng.random() < 0.05 else str(rng.randint(100, 9999))
+            f.write(f'{rng.randint(1000, 2_000_000)},2024{rng.randint(1, 12):02d}{rng.randint(1, 28):02d},'
+                    f'0000000000-24-{i:06d},20231231,{rng.choice(FORMS)},COMPANY {i} INC,{sic},'
+                    f'{rng.randint(1, 48)},' + ','.join(map(str, counts + sizes)) + f',{rng.randint(0, 40)}\n')
+    os.replace(paths['summaries'] + '.tmp', paths['summaries'])
+
+    with open(stamp_file, 'w') as f:
+        json.dump(stamp, f)
+    return paths
+
+
+def _cycle_lines(path, scale: int, skip_header: bool = False):
+    for _ in range(scale):
+        with open(path) as f:
+            if skip_header:
+                f.readline()
+            yield from f
+
+
+def _cycle_files(paths, scale: int):
+    for _ in range(scale):
+        for path in sample_files(paths['sample_dir']):
+            yield path
+
+
+# ----------------------------------------------------------------------------------------------
+# Benchmarks: each returns (docs, tokens, bytes, seconds, complete)
+# ----------------------------------------------------------------------------------------------
+
+def bench_get_data(paths, scale, max_seconds):
+    import Generic_Parser as GP
+    import MOD_Load_MasterDictionary_v2023 as LM
+    LM.SNAPSHOT_DIR = paths['snapshot_dir']
+    GP.load_dictionary(paths['dictionary'], print_flag=False)
+    docs = tokens = n_bytes = 0
+    seconds = 0.0
+    for path in _cycle_files(paths, scale):
+        doc = re.sub('(May|MAY)', ' ', _read(path)).upper()  # as Generic_Parser.parse_file
+        t0 = time.perf_counter()
+        row = GP.get_data(doc)
+        seconds += time.perf_counter() - t0
+        docs += 1
+        tokens += row[2]
+        n_bytes += len(doc)
+        if seconds > max_seconds:
+            return docs, tokens, n_bytes, seconds, False
+    return docs, tokens, n_bytes, seconds, True
+
+
+def _bench_dictionary(paths, use_snapshot):
+    import MOD_Load_MasterDictionary_v2023 as LM
+    LM.SNAPSHOT_DIR = paths['snapshot_dir']
+    if use_snapshot:
+        LM.load_masterdictionary(paths['dictionary'], use_snapshot=True)  # make sure it exists
+    t0 = time.perf_counter()
+    master_dictionary = LM.load_masterdictionary(paths['dictionary'], use_snapshot=use_snapshot)
+    seconds = time.perf_counter() - t0
+    return 1, len(master_dictionary), os.path.getsize(paths['dictionary']), seconds, True
+
+
+def bench_load_masterdictionary(paths, scale, max_seconds):
+    return _bench_dictionary(paths, use_snapshot=False)
+
+
+def bench_load_masterdictionary_snapshot(paths, scale, max_seconds):
+    return _bench_dictionary(paths, use_snapshot=True)
+
+
+def bench_read_docdict(paths, scale, max_seconds):
+    import MOD_Load_MasterDictionary_v2023 as LM
+    import MOD_Read_DocDict as RD
+    LM.SNAPSHOT_DIR = paths['snapshot_dir']
+    lookup = RD.create_lookup_dictionary(LM.load_masterdictionary(paths['dictionary']))
+    docs = tokens = n_bytes = 0
+    seconds = 0.0
+    for line in _cycle_lines(paths['docdict'], scale):
+        t0 = time.perf_counter()
+        header, doc_dict = RD.read_docdict(line, lookup)
+        seconds += time.perf_counter() - t0
+        docs += 1
+        tokens += len(doc_dict)
+        n_bytes += len(line)
+        if seconds > max_seconds:
+            return docs, tokens, n_bytes, seconds, False
+    return docs, tokens, n_bytes, seconds, True
+
+
+def _bench_records(path, parse, scale, max_seconds, skip_header=False, batch=10_000):
+    docs = n_bytes = 0
+    seconds = 0.0
+    lines = _cycle_lines(path, scale, skip_header)
+    while True:
+        chunk = [line for _, line in zip(range(batch), lines)]
+        if not chunk:
+            return docs, docs, n_bytes, seconds, True
+        t0 = time.perf_counter()
+        for line in chunk:
+            parse(line)
+        seconds += time.perf_counter() - t0
+        docs += len(chunk)
+        n_bytes += sum(len(line) for line in chunk)
+        if seconds > max_seconds:
+            return docs, docs, n_bytes, seconds, False
+
+
+def bench_master_index_record(paths, scale, max_seconds):
+    import MOD_EDGAR_Pac as EP
+    return _bench_records(paths['masterindex'], EP.MasterIndexRecord, scale, max_seconds)
+
+
+def bench_lm10x_summaries(paths, scale, max_seconds):
+    import Class_LM10XSummaries_v2023 as CS
+
+    def parse(line):
+        # converter() can only fill empty int fields from a numeric missing_values
+        return CS.cl_LM10XSummaries(line, missing_values='-99')
+
+    return _bench_records(paths['summaries'], parse, scale, max_seconds, skip_header=True)
+
+
+def bench_item_extractors(paths, scale, max_seconds):
+    from aifin import sections
+    docs = tokens = n_bytes = 0
+    seconds = 0.0
+    for path in _cycle_files(paths, scale):
+        raw = sections.read_file(path)
+        t0 = time.perf_counter()
+        text = sections.normalize_text(raw)
+        items = sections.extract_items(text, ("1", "1A", "7", "7A"))
+        seconds += time.perf_counter() - t0
+        docs += 1
+        tokens += sum(len(v.split()) for v in items.values() if v)
+        n_bytes += len(raw)
+        if seconds > max_seconds:
+            return docs, tokens, n_bytes, seconds, False
+    return docs, tokens, n_bytes, seconds, True
+
+
+BENCHMARKS = {
+    'get_data': bench_get_data,
+    'load_masterdictionary': bench_load_masterdictionary,
+    'load_masterdictionary_snapshot': bench_load_masterdictionary_snapshot,
+    'read_docdict': bench_read_docdict,
+    'master_index_record': bench_master_index_record,
+    'lm10x_summaries': bench_lm10x_summaries,
+    'item_extractors': bench_item_extractors,
+}
+FIXED_SIZE = ('load_masterdictionary', 'load_masterdictionary_snapshot')  # measured at scale 1 only
+
+
+# ----------------------------------------------------------------------------------------------
+# Runner
+# ----------------------------------------------------------------------------------------------
+
+def _peak_rss_mb() -> float:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024  # bytes on macOS, KiB on Linux
+
+
+def run_child(name, scale, work_dir, max_seconds) -> dict:
+    """Run one benchmark in this process (called in a fresh interpreter by ``run_benchmark``)."""
+    _set_paths()
+    with open(os.path.join(work_dir, 'paths.json')) as f:
+        paths = json.load(f)
+    docs, tokens, n_bytes, seconds, complete = BENCHMARKS[name](paths, scale, max_seconds)
+    seconds = max(seconds, 1e-9)
+    return {'benchmark': name, 'scale': scale, 'docs': docs, 'tokens': tokens, 'mb': n_bytes / 1e6,
+            'seconds': seconds, 'docs_per_s': docs / seconds, 'tokens_per_s': tokens / seconds,
+            'mb_per_s': n_bytes / 1e6 / seconds, 'peak_rss_mb': _peak_rss_mb(), 'complete': complete}
+
+
+def run_benchmark(name, scale, work_dir=WORK_DIR, max_seconds=MAX_SECONDS) -> dict:
+    """Run one (benchmark, scale) in a fresh interpreter and return its result dict."""
+    cmd = [sys.executable, os.path.abspath(__file__), '--child', name, '--child-scale', str(scale),
+           '--work-dir', work_dir, '--max-seconds', str(max_seconds)]
+    out = subprocess.run(cmd, capture_output=True, text=True, cwd=ROOT)
+    if out.returncode:
+        raise RuntimeError(f'benchmark {name} x{scale} failed:\n{out.stderr}')
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def import_time(module: str, repeats: int = IMPORT_REPEATS) -> float:
+    """Best wall time (seconds) of importing ``module`` in a fresh interpreter."""
+    code = (f'import sys, time; sys.path[:0] = [{ROOT!r}, {MOD_DIR!r}]; import importlib; '
+            f't0 = time.perf_counter(); importlib.import_module({module!r}); print(time.perf_counter() - t0)')
+    best = float('inf')
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=ROOT)
+        if out.returncode:
+            raise RuntimeError(f'importing {module} failed:\n{out.stderr}')
+        best = min(best, float(out.stdout.strip().splitlines()[-1]))
+    return best
+
+
+def run_suite(scales=DEFAULT_SCALES, benchmarks=None, work_dir=WORK_DIR, dictionary=None,
+              max_seconds=MAX_SECONDS, imports=True, verbose=True) -> dict:
+    """Run the selected benchmarks at every scale (plus import times); returns the report dict."""
+    paths = prepare_inputs(work_dir, dictionary=dictionary)
+    with open(os.path.join(work_dir, 'paths.json'), 'w') as f:
+        json.dump(paths, f)
+    results = dict()
+    for name in benchmarks or BENCHMARKS:
+        for scale in scales:
+            if name in FIXED_SIZE and scale != 1:
+                continue
+            result = run_benchmark(name, scale, work_dir, max_seconds)
+            results[f'{name}@{scale}'] = result
+            if verbose:
+                print(f'{name:32} x{scale:<5} {result["docs_per_s"]:12,.1f} docs/s {result["tokens_per_s"]:14,.0f} '
+                      f'tokens/s {result["mb_per_s"]:9.2f} MB/s {result["peak_rss_mb"]:8.1f} MB RSS'
+                      + ('' if result['complete'] else '  (time-capped)'))
+    import_times = dict()
+    if imports:
+        for module in IMPORT_MODULES:
+            import_times[module] = import_time(module)
+            if verbose:
+                print(f'import {module:42} {import_times[module] * 1000:8.1f} ms')
+    return {'meta': {'date': dt.datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(),
+                     'platform': platform.platform(), 'cpu_count': os.cpu_count(), 'max_seconds': max_seconds,
+                     'dictionary': paths['dictionary']},
+            'results': results, 'import_time': import_times}
+
+
+def compare(report: dict, baseline: dict, threshold: float = THRESHOLD) -> list:
+    """Regressions of ``report`` against ``baseline``: list of (key, metric, baseline, current)."""
+    regressions = []
+    for key, current in report['results'].items():
+        base = baseline.get('results', {}).get(key)
+        if base is None:
+            continue
+        for metric in THROUGHPUT_METRICS:
+            if base[metric] > 0 and current[metric] < base[metric] * (1 - threshold):
+                regressions.append((key, metric, base[metric], current[metric]))
+        if current['peak_rss_mb'] > base['peak_rss_mb'] * (1 + threshold):
+            regressions.append((key, 'peak_rss_mb', base['peak_rss_mb'], current['peak_rss_mb']))
+    for module, current in report.get('import_time', {}).items():
+        base = baseline.get('import_time', {}).get(module)
+        if base is not None and current > base * (1 + threshold) and current - base > IMPORT_SLACK_SEC:
+            regressions.append((f'import {module}', 'seconds', base, current))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=list(DEFAULT_SCALES))
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help='benchmarks to run (default: all)')
+    parser.add_argument('--dictionary', help='LM master dictionary CSV (default: generated from the sample)')
+    parser.add_argument('--work-dir', default=WORK_DIR)
+    parser.add_argument('--max-seconds', type=float, default=MAX_SECONDS)
+    parser.add_argument('--no-imports', action='store_true', help='skip the import-time measurements')
+    parser.add_argument('--output', help='write the report (JSON) here')
+    parser.add_argument('--save-baseline', help='write the report as the baseline (JSON) here')
+    parser.add_argument('--baseline', help='compare against this baseline; exit 1 on a regression')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--child-scale', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.child_scale, args.work_dir, args.max_seconds)))
+        return 0
+
+    report = run_suite(args.scales, args.only, args.work_dir, args.dictionary, args.max_seconds,
+                       imports=not args.no_imports)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for key, metric, base, current in regressions:
+            print(f'REGRESSION {key} {metric}: {base:,.3f} -> {current:,.3f} ({current / base - 1:+.1%})')
+        if regressions:
+            return 1
+        print(f'no regressions beyond {args.threshold:.0%} against {args.baseline}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+# @Filename: test_generic_parser
+# @Date: 2026/10/17
+# @Author: Mark Wang
+# @Email: wangyouan@xmu.edu.cn
+
+"""
+Rerun / resume / incremental behaviour of MOD/Generic_Parser.main on four sample10k filings.
+
+Every scenario ends by comparing OUTPUT_FILE with a fresh full run on the same inputs, so a file
+whose row was left stale is caught whatever the reason.
+"""
+
+import csv
+import glob
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'MOD'))
+
+import Generic_Parser as GP  # noqa: E402
+import MOD_Load_MasterDictionary_v2023 as LM  # noqa: E402
+
+SAMPLE_FILES = sorted(glob.glob(os.path.join(ROOT, 'data', 'l6', 'sample10k', '*.txt')))[:4]
+DICTIONARY_HEADER = ('Word,Seq_num,Word Count,Word Proportion,Average Proportion,Std Dev,Doc Count,Negative,'
+                     'Positive,Uncertainty,Litigious,Strong_Modal,Weak_Modal,Constraining,Complexity,Syllables,'
+                     'Source\n')
+WORDS = ('COMPANY', 'LOSS', 'LOSSES', 'RISK', 'RISKS', 'NET', 'SALES', 'ADVERSE', 'LITIGATION')
+
+pytestmark = pytest.mark.skipif(len(SAMPLE_FILES) < 4, reason='data/l6/sample10k is not available')
+
+
+def write_dictionary(path, negative):
+    with open(path, 'w') as f:
+        f.write(DICTIONARY_HEADER)
+        for seq, word in enumerate(WORDS, start=1):
+            f.write(f'{word},{seq},1,0,0,0,1,{2009 if word in negative else 0},0,0,0,0,0,0,0,2,12of12inf\n')
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    input_dir = tmp_path / 'input'
+    input_dir.mkdir()
+    for file in SAMPLE_FILES:
+        shutil.copy(file, input_dir)
+    output_file = str(tmp_path / 'Parser.csv')
+    monkeypatch.setattr(LM, 'SNAPSHOT_DIR', str(tmp_path / 'snapshots'))
+    monkeypatch.setattr(GP, 'TARGET_FILES', str(input_dir / '*.txt'))
+    monkeypatch.setattr(GP, 'MASTER_DICTIONARY_FILE', str(tmp_path / 'dictionary.csv'))
+    monkeypatch.setattr(GP, 'OUTPUT_FILE', output_file)
+    monkeypatch.setattr(GP, 'MANIFEST_FILE', output_file + '.manifest')
+    monkeypatch.setattr(GP, 'HASH_MANIFEST_FILE', output_file + '.hashes')
+    monkeypatch.setattr(GP, 'CHUNK_BYTES', 1)  # one file per chunk
+    write_dictionary(GP.MASTER_DICTIONARY_FILE, {'LOSS', 'LOSSES'})
+    return sorted(glob.glob(GP.TARGET_FILES))
+
+
+def run(**kwargs):
+    GP.lm_engine = None  # every run loads the dictionary, as a new process would
+    GP.main(n_workers=1, **kwargs)
+    with open(GP.OUTPUT_FILE, newline='') as f:
+        return list(csv.reader(f))
+
+
+def full_run():
+    # Reference output: everything parsed from scratch, leaving the state files as they were
+    saved = {path: open(path, 'rb').read() for path in (GP.OUTPUT_FILE, GP.HASH_MANIFEST_FILE)
+             if os.path.exists(path)}
+    rows = run(resume=False)
+    for path, data in saved.items():
+        with open(path, 'wb') as f:
+            f.write(data)
+    return rows
+
+
+def interrupt_after(monkeypatch, n_chunks):
+    parse_files = GP.parse_files
+
+    def interrupted(file_list, n_workers=GP.N_WORKERS):
+        for i, rows in enumerate(parse_files(file_list, n_workers)):
+            if i == n_chunks:
+                raise KeyboardInterrupt
+            yield rows
+
+    monkeypatch.setattr(GP, 'parse_files', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        run()
+    monkeypatch.setattr(GP, 'parse_files', parse_files)
+
+
+def test_rerun_after_complete_run_parses_again(corpus, capsys):
+    run()
+    write_dictionary(GP.MASTER_DICTIONARY_FILE, {'LOSS', 'LOSSES', 'RISK', 'RISKS'})
+    rows = run()
+    assert '0 files already parsed | 4 files to parse' in capsys.readouterr().out
+    assert rows == full_run()
+
+
+def test_resume_after_interruption(corpus, capsys, monkeypatch):
+    interrupt_after(monkeypatch, 2)
+    rows = run()
+    assert '2 files already parsed | 2 files to parse' in capsys.readouterr().out
+    assert not os.path.exists(GP.MANIFEST_FILE)
+    assert rows == full_run()
+
+
+def test_incremental_picks_up_edited_file(corpus, capsys):
+    run()
+    with open(corpus[1], 'a') as f:
+        f.write('\nLOSS LOSS LOSS ADVERSE LITIGATION\n')
+    capsys.readouterr()
+    rows = run(incremental=True)
+    assert '3 files up to date | 1 files to parse' in capsys.readouterr().out
+    assert rows == full_run()
+
+
+def test_incremental_picks_up_dictionary_change(corpus, capsys):
+    run()
+    write_dictionary(GP.MASTER_DICTIONARY_FILE, {'LOSS', 'LOSSES', 'RISK', 'RISKS'})
+    capsys.readouterr()
+    rows = run(incremental=True)
+    assert '0 files up to date | 4 files to parse' in capsys.readouterr().out
+    assert rows == full_run()
+
+
+def test_incremental_after_resume_with_changed_dictionary(corpus, capsys, monkeypatch):
+    run()
+    interrupt_after(monkeypatch, 2)  # rows of the first two files: old dictionary
+    write_dictionary(GP.MASTER_DICTIONARY_FILE, {'LOSS', 'LOSSES', 'RISK', 'RISKS'})
+    run()  # resumes: the last two files are parsed with the new dictionary
+    capsys.readouterr()
+    rows = run(incremental=True)
+    assert '2 files up to date | 2 files to parse' in capsys.readouterr().out
+    assert rows == full_run()